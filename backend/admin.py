@@ -1,15 +1,29 @@
 # backend/admin.py
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 import psycopg
 from psycopg.rows import dict_row
-from fastapi import APIRouter, Depends, HTTPException, Request, Path
+from fastapi import APIRouter, Depends, HTTPException, Request, Path, Query
 from pydantic import BaseModel
 
-from db import get_db_connection  # helper that returns a psycopg.Connection
-
-router = APIRouter(tags=["Admin"])
+from db import get_db_connection, pool  # pooled, request‑scoped psycopg2 connection
+from db_async import async_pool_stats, get_async_connection
+from hashing import hasher
+from blobstore import proof_url
+from cache import CachedRoute, cached, response_cache
+from fastjson import ResponseFormat, json_response, shape
+from events import broker
+from bus import CHANNEL, bulk_message, bus
+from dedup import list_clusters
+from escalation import escalator, reset_watermark
+from outbox import mailer
+from principal import principals
+from ratelimit import limiter
+from images import image_pipeline
+from pagination import ComplaintFilters, Page, where_sql
+
+router = APIRouter(tags=["Admin"], route_class=CachedRoute)
 
 # ───────────────────────── SCHEMAS ──────────────────────────
 class AdminLogin(BaseModel):
@@ -42,30 +56,34 @@ class WardenUpdate(BaseModel):
 
 # ─────────────────────── AUTH ROUTES ───────────────────────
 @router.post("/auth/admin/login")
-def admin_login(
+async def admin_login(
     credentials: AdminLogin,
     request: Request,
-    conn=Depends(get_db_connection)            # ⬅ DB connection injected
+    conn=Depends(get_async_connection)         # ⬅ async DB connection injected
 ):
     """
     Verify the supplied e‑mail / password against the Admin table.
     On success store a session; otherwise 401.
     """
-    from psycopg2.extras import RealDictCursor
-
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            """
-            SELECT name, email
-            FROM   Admin
-            WHERE  email    = %s
-              AND  password = %s
-            """,
-            (credentials.email, credentials.password),
+    cur = await conn.execute(
+        """
+        SELECT aid, name, email, password
+        FROM   Admin
+        WHERE  email = %s
+        """,
+        (credentials.email,),
+    )
+    admin = await cur.fetchone()
+
+    # hashing pool, off the event loop; legacy plaintext rows are upgraded
+    ok, new_hash = await hasher.verify_and_update(credentials.password, admin["password"]) if admin else (False, None)
+    if ok and new_hash:
+        await conn.execute(
+            "UPDATE Admin SET Password = %s WHERE AID = %s AND Password = %s",
+            (new_hash, admin["aid"], admin["password"]),
         )
-        admin = cur.fetchone()
 
-    if admin:
+    if ok:
         request.session["admin"] = {
             "email": admin["email"],
             "name":  admin["name"],
@@ -93,23 +111,114 @@ def get_admin_profile(request: Request):
     return {"admin": admin}
 
 
+def _require_admin(request: Request):
+    """Helper (or dependency) to ensure the caller is an authenticated admin."""
+    admin = request.session.get("admin")
+    if not admin:
+        raise HTTPException(status_code=401, detail="Not logged in")
+    return admin
+
+
+# ───────────────────── DIAGNOSTICS ─────────────────────
+# pool sizing, queue depths and error counts: for admins only
+@router.get("/admin/stats/db-pool", dependencies=[Depends(_require_admin)])
+def db_pool_stats():
+    """Connection‑pool occupancy and checkout wait times (for sizing the pools)."""
+    return {"pool": pool.stats(), "async_pool": async_pool_stats()}
+
+
+@router.get("/admin/stats/hashing", dependencies=[Depends(_require_admin)])
+def hashing_stats():
+    """Password‑hashing pool: in‑flight work, rejections, queue wait / run latency."""
+    return {"hashing": hasher.stats()}
+
+
+@router.get("/admin/stats/images", dependencies=[Depends(_require_admin)])
+def image_stats():
+    """Proof‑image pipeline: queue, bytes saved by re‑encoding, throughput."""
+    return {"images": image_pipeline.stats()}
+
+
+@router.get("/admin/stats/cache", dependencies=[Depends(_require_admin)])
+def cache_stats():
+    """Response cache and SHID resolver: size, hit ratio, 304s served, evictions / invalidations."""
+    return {"cache": response_cache.stats(), "principals": principals.stats()}
+
+
+@router.get("/admin/stats/events", dependencies=[Depends(_require_admin)])
+def event_stats():
+    """Push channel: open subscribers, buffered events, slow clients dropped."""
+    return {"events": broker.stats()}
+
+
+@router.get("/admin/stats/bus", dependencies=[Depends(_require_admin)])
+def bus_stats():
+    """Change bus: listener connected, notifications received, reconnects, delivery lag / handler time."""
+    return {"bus": bus.stats()}
+
+
+@router.get("/admin/stats/outbox", dependencies=[Depends(_require_admin)])
+def outbox_stats(conn=Depends(get_db_connection)):
+    """E‑mail outbox: queue depth and oldest message, sends / retries / failures, SMTP connections."""
+    return {"outbox": mailer.stats(conn)}
+
+
+@router.get("/admin/stats/escalation", dependencies=[Depends(_require_admin)])
+def escalation_stats(conn=Depends(get_db_connection)):
+    """Overdue escalation: watermark and its lag, open escalations, passes / digests of this worker."""
+    return {"escalation": escalator.stats(conn)}
+
+
+@router.get("/admin/stats/ratelimit", dependencies=[Depends(_require_admin)])
+def ratelimit_stats():
+    """Sign‑in rate limiting: limits, store, requests let through / refused by IP or account."""
+    return {"ratelimit": limiter.stats()}
+
+
 # ───────────────────── ANALYTICS ROUTE ─────────────────────
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+# Complaint columns for list views — never the (legacy, huge) base64 ProofImage
+COMPLAINT_COLUMNS = """
+    c.CID, c.SID, c.Type, c.Created_at, c.Status, c.Description,
+    c.WithdrawCount, c.IsWithdrawn, c.ProofBlob, c.ProofThumb, c.ProofStatus, c.ClusterID
+"""
+
+
+def _with_proof_url(row):
+    # lists show the thumbnail; proof_full_url is the downscaled original
+    full, thumb = row.pop("proofblob"), row.pop("proofthumb")
+    if row["proofstatus"] == "invalid":
+        full = None  # not a decodable image — never show it
+    row["proof_url"] = proof_url(thumb or full)
+    row["proof_full_url"] = proof_url(full)
+    return row
+
+
+def _complaint_columns(cur):
+    # column names of a COMPLAINT_COLUMNS result after _with_proof_url
+    names = [d.name for d in cur.description if d.name not in ("proofblob", "proofthumb")]
+    return names + ["proof_url", "proof_full_url"]
+
+
+PENDING_COUNT_SQL = "SELECT COUNT(*) AS n FROM Complaint WHERE Status = 'Pending'"
+
 
 @router.get("/admin/analytics")
-def admin_analytics(conn=Depends(get_db_connection)):
+@cached("complaints", "students", "wardens", "hostels")
+def admin_analytics(format: ResponseFormat = "rows", conn=Depends(get_db_connection)):
+    """Everything at once; `format=columnar` sends each list as column arrays."""
     try:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute("SELECT * FROM Hostel ORDER BY HID")
-            hostels = cur.fetchall()
+            hostels = shape(cur.fetchall(), format, [d.name for d in cur.description])
 
             cur.execute("SELECT * FROM Room ORDER BY RID")
-            rooms = cur.fetchall()
+            rooms = shape(cur.fetchall(), format, [d.name for d in cur.description])
 
             cur.execute("SELECT * FROM Warden ORDER BY WID")
-            wardens = cur.fetchall()
+            wardens = shape(cur.fetchall(), format, [d.name for d in cur.description])
 
             cur.execute(
                 """
@@ -119,27 +228,25 @@ def admin_analytics(conn=Depends(get_db_connection)):
                 ORDER BY s.SID
                 """
             )
-            students = cur.fetchall()
+            students = shape(cur.fetchall(), format, [d.name for d in cur.description])
 
             cur.execute(
-                """
-                SELECT c.*, s.SHID, s.Name AS student_name
+                f"""
+                SELECT {COMPLAINT_COLUMNS}, s.SHID, s.Name AS student_name
                 FROM Complaint c
                 JOIN Student s ON s.SID = c.SID
                 ORDER BY c.CID DESC
                 """
             )
-            complaints = cur.fetchall()
+            complaints = shape([_with_proof_url(row) for row in cur.fetchall()], format, _complaint_columns(cur))
 
             cur.execute("SELECT COUNT(*) AS n FROM Student")
             student_count = cur.fetchone()["n"]
 
-            cur.execute(
-                "SELECT COUNT(*) AS n FROM Complaint WHERE Status = 'Pending'"
-            )
+            cur.execute(PENDING_COUNT_SQL)
             complaints_open = cur.fetchone()["n"]
 
-        return {
+        return json_response({
             "hostels": hostels,
             "rooms": rooms,
             "wardens": wardens,
@@ -150,27 +257,64 @@ def admin_analytics(conn=Depends(get_db_connection)):
                 "student_count": student_count,
                 "complaints_open": complaints_open,
             },
-        }
+        })
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # ───────────────────── STUDENT MANAGEMENT ─────────────────────
+@router.get("/admin/hostels")
+@cached("hostels")
+def list_hostels(conn=Depends(get_db_connection)):
+    """Every hostel's id and name, for filter drop‑downs."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("SELECT HID, Name FROM Hostel ORDER BY Name, HID")
+        return json_response({"hostels": cur.fetchall()})
+
+
+def student_list_query(hid, q, page):
+    """(sql, params) for one page of students by SID, optionally one hostel / a search."""
+    clauses, params = [], []
+    if hid is not None:
+        clauses.append("s.HID = %s")
+        params.append(hid)
+    if q and q.strip():
+        pattern = "%" + q.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        clauses.append("(s.Name ILIKE %s OR s.Mail ILIKE %s OR s.Phone LIKE %s)")
+        params += [pattern, pattern, pattern]
+    seek, seek_params = page.keyset(["s.SID"], descending=False)
+    if seek:
+        clauses.append(seek)
+        params += seek_params
+    sql = f"""
+        SELECT s.SID, s.Name, s.Phone, s.Mail, s.DOB, s.HID,
+               s.SHID, h.Name AS hostel_name
+        FROM   Student s
+        JOIN   Hostel  h ON s.HID = h.HID
+        {where_sql(clauses)}
+        ORDER  BY s.SID
+        LIMIT  %s
+    """
+    return sql, params + [page.fetch]
+
+
 @router.get("/admin/students")
-def get_all_students(conn=Depends(get_db_connection)):
+@cached("students", "hostels")
+def get_all_students(
+    hid: Optional[int] = None,
+    q: Optional[str] = Query(None, max_length=100, description="part of the name, e‑mail or phone"),
+    page: Page = Depends(),
+    format: ResponseFormat = "rows",
+    conn=Depends(get_db_connection),
+):
+    """Students by SID, one keyset page at a time (optionally one hostel / a search)."""
     try:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(
-                """
-                SELECT s.SID, s.Name, s.Phone, s.Mail, s.DOB, s.HID,
-                       s.SHID, h.Name AS hostel_name
-                FROM   Student s
-                JOIN   Hostel  h ON s.HID = h.HID
-                ORDER  BY s.SID
-                """
-            )
-            return {"students": cur.fetchall()}
+            cur.execute(*student_list_query(hid, q, page))
+            students, next_cursor = page.result(cur.fetchall(), lambda r: (r["sid"],))
+            columns = [d.name for d in cur.description]
+            return json_response({"students": shape(students, format, columns), "next_cursor": next_cursor})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -199,12 +343,16 @@ def update_student(sid: int, payload: StudentUpdate, conn=Depends(get_db_connect
         raise HTTPException(status_code=400, detail="No fields provided")
 
     values.append(sid)
-    query = f"UPDATE Student SET {', '.join(fields)} WHERE SID = %s"
+    query = f"UPDATE Student SET {', '.join(fields)} WHERE SID = %s RETURNING SHID"
 
     try:
         with conn.cursor() as cur:
             cur.execute(query, values)
+            updated = cur.fetchone()
         conn.commit()
+        if updated:
+            principals.invalidate(updated[0])
+            response_cache.invalidate("students", "complaints", f"student:{updated[0]}")
         return {"status": "success", "message": "Student updated"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -224,6 +372,8 @@ def delete_student(sid: int, conn=Depends(get_db_connection)):
             cur.execute("DELETE FROM Student WHERE SID = %s", (sid,))
 
         conn.commit()
+        principals.invalidate(shid)
+        response_cache.invalidate("students", "complaints", f"student:{shid}")
         return {"status": "success", "message": "Student deleted"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -232,20 +382,38 @@ def delete_student(sid: int, conn=Depends(get_db_connection)):
 # ───────────────────── WARDEN MANAGEMENT ─────────────────────
 
 @router.get("/admin/wardens")
-def get_all_wardens(conn=Depends(get_db_connection)):
-    """List all wardens (password hidden)."""
+@cached("wardens", "hostels")
+def get_all_wardens(
+    hid: Optional[int] = None,
+    page: Page = Depends(),
+    conn=Depends(get_db_connection),
+):
+    """List wardens by WID, keyset‑paginated (password hidden)."""
+    clauses, params = [], []
+    if hid is not None:
+        clauses.append("w.HID = %s")
+        params.append(hid)
+    seek, seek_params = page.keyset(["w.WID"], descending=False)
+    if seek:
+        clauses.append(seek)
+        params += seek_params
+
     try:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute(
-                """
+                f"""
                 SELECT w.WID, w.Name, w.Mail, w.Phone,
                        h.Name AS hostel_name, w.HID
                 FROM   Warden w
                 JOIN   Hostel h ON w.HID = h.HID
+                {where_sql(clauses)}
                 ORDER  BY w.WID
-                """
+                LIMIT  %s
+                """,
+                params + [page.fetch],
             )
-            return {"wardens": cur.fetchall()}
+            wardens, next_cursor = page.result(cur.fetchall(), lambda r: (r["wid"],))
+            return {"wardens": wardens, "next_cursor": next_cursor}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -260,6 +428,7 @@ def create_warden(payload: WardenCreate, conn=Depends(get_db_connection)):
     # 1️⃣ derive first‑name password -----------------------------------------
     first_name = payload.name.strip().split()[0].lower()
     default_pwd = f"{first_name}@123"
+    hashed_pwd = hasher.hash_sync(default_pwd)
 
     try:
         with conn.cursor() as cur:
@@ -273,12 +442,13 @@ def create_warden(payload: WardenCreate, conn=Depends(get_db_connection)):
                     payload.name,
                     payload.mail,
                     payload.phone,
-                    default_pwd,      # 2️⃣ store generated password
+                    hashed_pwd,       # 2️⃣ store the generated password, hashed
                     payload.hid,
                 ),
             )
             wid = cur.fetchone()[0]
         conn.commit()
+        response_cache.invalidate("wardens")
 
         # 3️⃣ return the password so the admin can share it
         return {
@@ -326,6 +496,7 @@ def update_warden(
         with conn.cursor() as cur:
             cur.execute(q, vals)
         conn.commit()
+        response_cache.invalidate("wardens")
         return {"status": "success", "message": "Warden updated"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -340,6 +511,7 @@ def delete_warden(wid: int, conn=Depends(get_db_connection)):
             if cur.rowcount == 0:
                 raise HTTPException(status_code=404, detail="Warden not found")
         conn.commit()
+        response_cache.invalidate("wardens")
         return {"status": "success", "message": "Warden deleted"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -354,35 +526,154 @@ class ComplaintStatusUpdate(BaseModel):
     status: str = Field(..., examples=["Resolved", "In‑Progress", "Rejected"])
 
 
+def complaint_list_query(filters, page):
+    """(sql, params) for one page of /admin/complaints, newest first."""
+    clauses, params = filters.where()
+    seek, seek_params = page.keyset(["c.Created_at", "c.CID"], casts=["::timestamp", ""])
+    if seek:
+        clauses.append(seek)
+        params += seek_params
+    # LATERAL … LIMIT 1: a hostel with two wardens must not duplicate rows
+    sql = f"""
+        SELECT
+            {COMPLAINT_COLUMNS},
+            CASE WHEN c.ProofBlob IS NULL THEN c.ProofImage END AS proofimage,
+            EXTRACT(EPOCH FROM (NOW() - c.Created_at))/86400 AS age_days,
+            s.Name       AS student_name,
+            s.SHID,
+            h.HID, h.Name AS hostel_name,
+            w.WID, w.Name AS warden_name
+        FROM   Complaint  c
+        JOIN   Student    s ON s.SID = c.SID
+        JOIN   Hostel     h ON h.HID = s.HID
+        LEFT JOIN LATERAL (
+            SELECT WID, Name FROM Warden WHERE HID = h.HID ORDER BY WID LIMIT 1
+        ) w ON TRUE
+        {where_sql(clauses)}
+        ORDER  BY c.Created_at DESC, c.CID DESC
+        LIMIT  %s
+    """
+    return sql, params + [page.fetch]
+
+
 @router.get("/admin/complaints")
-def list_complaints(conn=Depends(get_db_connection)):
+@cached("complaints", "students", "wardens", "hostels")
+def list_complaints(
+    filters: ComplaintFilters = Depends(),
+    page: Page = Depends(),
+    format: ResponseFormat = "rows",
+    conn=Depends(get_db_connection),
+):
     """
-    Return every complaint with hostel & warden context + age (days since created).
+    Complaints newest first with hostel & warden context + age (days since created).
+    Filter by status / hid / type / created_from / created_to; follow
+    `next_cursor` for the next page.  `format=columnar` returns column arrays.
     """
     try:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(
-                """
-                SELECT
-                    c.*,
-                    EXTRACT(EPOCH FROM (NOW() - c.Created_at))/86400 AS age_days,
-                    s.Name       AS student_name,
-                    s.SHID,
-                    h.HID, h.Name AS hostel_name,
-                    w.WID, w.Name AS warden_name
-                FROM   Complaint  c
-                JOIN   Student    s ON s.SID = c.SID
-                JOIN   Hostel     h ON h.HID = s.HID
-                JOIN   Warden     w ON w.HID = h.HID
-                ORDER  BY c.CID DESC
-                """
+            cur.execute(*complaint_list_query(filters, page))
+            complaints, next_cursor = page.result(
+                cur.fetchall(), lambda r: (r["created_at"], r["cid"])
             )
-            return {"complaints": cur.fetchall()}
+            return json_response({
+                "complaints": shape(
+                    [_with_proof_url(row) for row in complaints], format, _complaint_columns(cur)
+                ),
+                "next_cursor": next_cursor,
+            })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ts_headline marks matches in an HTML‑escaped copy of the description, so
+# the snippet can be inserted as HTML as it is
+SEARCH_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15"
+
+
+def complaint_search_query(q, sort, filters, page):
+    """(sql, params, key) for one page of /admin/complaints/search; key(row) is its sort key."""
+    clauses, params = filters.where()
+    if sort == "relevance":
+        seek, seek_params = page.keyset(["m.rank", "m.cid"], casts=["::real", ""])
+        order, key = "m.rank DESC, m.cid DESC", (lambda r: (r["rank"], r["cid"]))
+    else:
+        seek, seek_params = page.keyset(["m.created_at", "m.cid"], casts=["::timestamp", ""])
+        order, key = "m.created_at DESC, m.cid DESC", (lambda r: (r["created_at"], r["cid"]))
+    # the GIN index finds the matches; the headline is only built for the
+    # rows on this page
+    sql = f"""
+        SELECT m.*,
+               ts_headline('english',
+                           replace(replace(replace(m.description, '&', '&amp;'), '<', '&lt;'), '>', '&gt;'),
+                           websearch_to_tsquery('english', %s), %s) AS headline
+        FROM (
+            SELECT {COMPLAINT_COLUMNS},
+                   ts_rank_cd(c.SearchVector, websearch_to_tsquery('english', %s), 32) AS rank,
+                   s.Name AS student_name, s.SHID,
+                   h.HID, h.Name AS hostel_name
+            FROM   Complaint c
+            JOIN   Student   s ON s.SID = c.SID
+            JOIN   Hostel    h ON h.HID = s.HID
+            WHERE  c.SearchVector @@ websearch_to_tsquery('english', %s)
+            {"".join(f" AND {clause}" for clause in clauses)}
+        ) m
+        {where_sql([seek] if seek else [])}
+        ORDER  BY {order}
+        LIMIT  %s
+    """
+    return sql, [q, SEARCH_HEADLINE_OPTIONS, q, q] + params + seek_params + [page.fetch], key
+
+
+@router.get("/admin/complaints/search")
+@cached("complaints", "students", "hostels")
+def search_complaints(
+    q: str = Query(..., min_length=1, max_length=200,
+                   description='words, "a phrase", -excluded, this or that'),
+    sort: Literal["relevance", "newest"] = "relevance",
+    filters: ComplaintFilters = Depends(),
+    page: Page = Depends(),
+    conn=Depends(get_db_connection),
+):
+    """
+    Complaints whose type or description match `q` (web‑search syntax), best
+    match or newest first, each with a highlighted `headline`.  Same filters
+    and `next_cursor` paging as /admin/complaints.
+    """
+    sql, params, key = complaint_search_query(q, sort, filters, page)
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(sql, params)
+            complaints, next_cursor = page.result(cur.fetchall(), key)
+            return json_response({
+                "complaints": [_with_proof_url(row) for row in complaints],
+                "next_cursor": next_cursor,
+            })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/admin/complaints/clusters")
+@cached("complaints", "students", "hostels")
+def complaint_clusters(
+    filters: ComplaintFilters = Depends(),
+    open_only: bool = True,
+    limit: int = Query(100, ge=1, le=500),
+    conn=Depends(get_db_connection),
+):
+    """
+    Groups of near‑duplicate complaints (dedup.py), largest first.  List a
+    group with /admin/complaints?cluster_id=…; resolve it in one go with
+    PUT /admin/complaints/status {"status": …, "cluster_id": …}.
+    """
+    clauses, params = filters.where()
+    try:
+        return json_response({"clusters": list_clusters(conn, clauses, params, limit, open_only)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/admin/complaints/summary")
+@cached("complaints", "students", "hostels")
 def complaint_summary(conn=Depends(get_db_connection)):
     """
     Aggregate counts (total / pending / resolved / overdue) **per hostel**.
@@ -418,38 +709,140 @@ def complaint_summary(conn=Depends(get_db_connection)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def overdue_query(days, escalated=False):
+    """(sql, params) for /admin/complaints/overdue (see there)."""
+    if escalated:
+        source = """
+        FROM   ComplaintEscalation e
+        JOIN   Complaint c ON c.CID = e.CID
+        JOIN   Student   s ON s.SID = c.SID
+        JOIN   Hostel    h ON h.HID = s.HID
+        JOIN   Warden    w ON w.HID = h.HID
+        WHERE  c.Status = 'Pending'
+        ORDER  BY e.Due_at, c.CID
+        """
+        extra, params = "e.Due_at AS due_at, e.Hours AS sla_hours,", ()
+    else:
+        source = """
+        FROM   Complaint c
+        JOIN   Student   s ON s.SID = c.SID
+        JOIN   Hostel    h ON h.HID = s.HID
+        JOIN   Warden    w ON w.HID = h.HID
+        WHERE  c.Status = 'Pending'
+        AND    c.Created_at < NOW() - INTERVAL %s   -- sargable: uses idx_complaint_pending
+        ORDER  BY c.Created_at, c.CID
+        """
+        extra, params = "", (f"{days} day",)
+    sql = f"""
+        SELECT
+            c.CID,
+            c.Type,
+            c.Created_at,
+            {extra}
+            s.Name  AS student_name,
+            h.Name  AS hostel_name,
+            w.WID,
+            w.Name  AS warden_name,
+            EXTRACT(EPOCH FROM (NOW() - c.Created_at))/86400 AS age_days
+        {source}
+    """
+    return sql, params
+
+
 @router.get("/admin/complaints/overdue")
+@cached("complaints", "students", "wardens", "hostels", "escalations")
 def overdue_complaints(
-    days: int = DEFAULT_OVERDUE_DAYS, conn=Depends(get_db_connection)
+    days: int = Query(DEFAULT_OVERDUE_DAYS, ge=0),
+    escalated: bool = Query(False),
+    conn=Depends(get_db_connection),
 ):
     """
-    List *pending* complaints older than `days` (default = 3).
-    Also returns the linked warden so admin can warn / replace them.
+    *Pending* complaints older than `days` days (the same rule as the
+    summary's overdue count), oldest first, with the hostel's warden so
+    admin can warn / replace them.  `escalated=true` instead lists the ones
+    the escalation scheduler flagged against the SLA thresholds
+    (/admin/sla), earliest deadline first; `threshold_days` is then null.
+    """
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(*overdue_query(days, escalated))
+            return {"overdue": cur.fetchall(), "threshold_days": None if escalated else days}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ───────────────────── SLA THRESHOLDS ─────────────────────
+class SlaThresholdIn(BaseModel):
+    """Deadline for complaints of hostel `hid` and/or `type` (omit either for “any”)."""
+    hid: Optional[int] = None
+    type: Optional[str] = Field(None, max_length=100)
+    hours: int = Field(..., gt=0, examples=[48])
+
+
+@router.get("/admin/sla")
+def list_sla_thresholds(request: Request, conn=Depends(get_db_connection)):
+    """
+    Response deadlines used by the escalation scheduler.  A complaint gets
+    the most specific match: hostel + type, hostel, type, then the default
+    (no hostel, no type).
     """
+    _require_admin(request)
     try:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute(
                 """
-                SELECT
-                    c.CID,
-                    c.Type,
-                    c.Created_at,
-                    s.Name  AS student_name,
-                    h.Name  AS hostel_name,
-                    w.WID,
-                    w.Name  AS warden_name,
-                    EXTRACT(EPOCH FROM (NOW() - c.Created_at))/86400 AS age_days
-                FROM   Complaint c
-                JOIN   Student   s ON s.SID = c.SID
-                JOIN   Hostel    h ON h.HID = s.HID
-                JOIN   Warden    w ON w.HID = h.HID
-                WHERE  c.Status = 'Pending'
-                AND    NOW() - c.Created_at > INTERVAL %s
-                ORDER  BY age_days DESC
+                SELECT t.ID, t.HID, h.Name AS hostel_name, t.Type, t.Hours
+                FROM   SlaThreshold t LEFT JOIN Hostel h ON h.HID = t.HID
+                ORDER  BY t.HID NULLS FIRST, t.Type NULLS FIRST
+                """
+            )
+            return {"thresholds": cur.fetchall()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.put("/admin/sla")
+def set_sla_threshold(payload: SlaThresholdIn, request: Request, conn=Depends(get_db_connection)):
+    """Create or change the deadline of one hostel / type scope."""
+    _require_admin(request)  # resets the watermark: the next pass re‑checks (and mails) everything
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO SlaThreshold (HID, Type, Hours) VALUES (%s, %s, %s)
+                ON CONFLICT ((COALESCE(HID, 0)), (COALESCE(Type, '')))
+                DO UPDATE SET Hours = EXCLUDED.Hours
+                RETURNING ID
                 """,
-                (f"{days} day",),
+                (payload.hid, payload.type, payload.hours),
+            )
+            threshold_id = cur.fetchone()[0]
+            reset_watermark(cur)
+        conn.commit()
+        return {"status": "success", "id": threshold_id}
+    except psycopg2.errors.ForeignKeyViolation:
+        raise HTTPException(status_code=404, detail="Hostel not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/admin/sla/{threshold_id}")
+def delete_sla_threshold(threshold_id: int, request: Request, conn=Depends(get_db_connection)):
+    """Remove a hostel / type deadline; the default one can only be changed."""
+    _require_admin(request)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "DELETE FROM SlaThreshold WHERE ID = %s AND (HID IS NOT NULL OR Type IS NOT NULL)",
+                (threshold_id,),
             )
-            return {"overdue": cur.fetchall(), "threshold_days": days}
+            if cur.rowcount == 0:
+                raise HTTPException(status_code=404, detail="Threshold not found (or the default)")
+            reset_watermark(cur)
+        conn.commit()
+        return {"status": "success", "message": "Threshold deleted"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -465,13 +858,95 @@ def update_complaint_status(
     try:
         with conn.cursor() as cur:
             cur.execute(
-                "UPDATE Complaint SET Status = %s WHERE CID = %s RETURNING CID",
+                """
+                UPDATE Complaint c SET Status = %s
+                WHERE  c.CID = %s
+                RETURNING (SELECT SHID FROM Student WHERE SID = c.SID)
+                """,
                 (payload.status, cid),
             )
-            if cur.rowcount == 0:
+            updated = cur.fetchone()
+            if not updated:
                 raise HTTPException(status_code=404, detail="Complaint not found")
         conn.commit()
+        response_cache.invalidate("complaints", f"student:{updated[0]}")
         return {"status": "success", "cid": cid, "new_status": payload.status}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+MAX_BULK_CIDS = 10000
+
+
+class ComplaintBulkStatusUpdate(BaseModel):
+    """
+    New `status` for every complaint listed in `cids` and/or matching the
+    filters, e.g. {"status": "Resolved", "hid": 1, "type": "WiFi Problem",
+    "current_status": "Pending"} or a whole near‑duplicate group
+    {"status": "Resolved", "cluster_id": 42}.  At least one selector is required.
+    """
+    status: str = Field(..., examples=["Resolved"])
+    cids: Optional[List[int]] = Field(None, max_length=MAX_BULK_CIDS)
+    hid: Optional[int] = None
+    type: Optional[str] = None
+    current_status: Optional[str] = None
+    created_before: Optional[datetime] = None
+    cluster_id: Optional[int] = None
+
+
+def apply_bulk_status(conn, payload):
+    """
+    One set‑based UPDATE … RETURNING for the whole selection, in one
+    transaction, announced with a single summary notification.  Complaints
+    already in the target status are left alone.  Returns the changed CIDs.
+    """
+    filters = ComplaintFilters(status=payload.current_status, hid=payload.hid,
+                               type=payload.type, created_to=payload.created_before,
+                               cluster_id=payload.cluster_id)
+    clauses, params = filters.where(complaint="c", student="s")
+    if payload.cids is not None:
+        clauses.append("c.CID = ANY(%s)")
+        params.append(payload.cids)
+    if not clauses:
+        raise HTTPException(status_code=400, detail="Give cids or at least one filter")
+
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL app.bulk_changes = 'on'")
+        cur.execute(
+            f"""
+            UPDATE Complaint c SET Status = %s
+            FROM   Student s
+            WHERE  s.SID = c.SID AND c.Status IS DISTINCT FROM %s AND {" AND ".join(clauses)}
+            RETURNING c.CID, s.SHID, s.HID
+            """,
+            [payload.status, payload.status] + params,
+        )
+        rows = cur.fetchall()
+        cids = sorted(r[0] for r in rows)
+        shids = sorted({r[1] for r in rows})
+        if rows:
+            cur.execute("SELECT pg_notify(%s, %s)", (CHANNEL, bulk_message(
+                "complaint", drop_order=("cids", "shids"), status=payload.status, count=len(rows),
+                hids=sorted({r[2] for r in rows}), shids=shids, cids=cids)))
+    conn.commit()
+    if rows:
+        response_cache.invalidate("complaints", *(f"student:{shid}" for shid in shids))
+    return cids
+
+
+@router.put("/admin/complaints/status")
+def bulk_update_complaint_status(
+    payload: ComplaintBulkStatusUpdate, request: Request, conn=Depends(get_db_connection)
+):
+    """Set the status of many complaints at once (by id list and/or filter); admin only."""
+    _require_admin(request)
+    try:
+        cids = apply_bulk_status(conn, payload)
+        return {"status": "success", "new_status": payload.status, "updated": len(cids), "cids": cids}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -496,14 +971,6 @@ class AdminUpdate(BaseModel):
     password: Optional[str] = None
 
 
-def _require_admin(request: Request):
-    """Helper to ensure the caller is an authenticated admin."""
-    admin = request.session.get("admin")
-    if not admin:
-        raise HTTPException(status_code=401, detail="Not logged in")
-    return admin
-
-
 @router.post("/admin/admins", status_code=201)
 def add_admin(payload: AdminCreate, request: Request, conn=Depends(get_db_connection)):
     """
@@ -511,6 +978,7 @@ def add_admin(payload: AdminCreate, request: Request, conn=Depends(get_db_connec
     Only an authenticated admin may call this.
     """
     _require_admin(request)
+    hashed = hasher.hash_sync(payload.password)
 
     try:
         with conn.cursor() as cur:
@@ -520,7 +988,7 @@ def add_admin(payload: AdminCreate, request: Request, conn=Depends(get_db_connec
                 VALUES (%s, %s, %s)
                 RETURNING AID
                 """,
-                (payload.name, payload.email, payload.password),
+                (payload.name, payload.email, hashed),
             )
             new_id = cur.fetchone()[0]
         conn.commit()
@@ -547,7 +1015,7 @@ def update_my_admin(payload: AdminUpdate, request: Request, conn=Depends(get_db_
         vals.append(payload.email)
     if payload.password:
         fields.append("Password = %s")
-        vals.append(payload.password)
+        vals.append(hasher.hash_sync(payload.password))
 
     if not fields:
         raise HTTPException(status_code=400, detail="No fields provided")
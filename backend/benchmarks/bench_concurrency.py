@@ -0,0 +1,96 @@
+"""
+Concurrent‑request throughput against ONE uvicorn worker.
+
+Start the API with a single worker, then point this script at it:
+
+    uvicorn main:app --workers 1 --port 8000
+    python benchmarks/bench_concurrency.py --label after --shid GOD1ID001 --password pswd@GOD1ID001
+
+Run it once on the old build (blocking psycopg2 inside `async def`) with
+`--label before` and once on the current build with `--label after`; every
+run is appended to --out so the two can be compared side by side.
+
+The traffic is a mix of `/login` (async route: DB + bcrypt) and a cheap
+`/session-check`.  With a blocking async route the cheap requests queue
+behind every login; with the async data layer they don't.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+
+import httpx
+
+
+async def _worker(client, jobs, results, args):
+    while True:
+        try:
+            kind = jobs.pop()
+        except IndexError:
+            return
+        start = time.perf_counter()
+        if kind == "login":
+            res = await client.post("/login", json={"shid": args.shid, "pswd": args.password})
+        else:
+            res = await client.get("/session-check")
+        results.setdefault(kind, []).append((time.perf_counter() - start, res.status_code))
+
+
+def _summary(samples):
+    latencies = sorted(s[0] for s in samples)
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "count": len(latencies),
+        "errors": sum(1 for _, status in samples if status >= 500),
+        "p50_ms": round(q[49] * 1000, 2),
+        "p95_ms": round(q[94] * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+async def run(args):
+    # interleave so both kinds are in flight at the same time
+    jobs = []
+    for i in range(args.requests):
+        jobs.append("login" if i % args.login_every == 0 else "session")
+    jobs.reverse()
+
+    results = {}
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(_worker(client, jobs, results, args) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "label": args.label,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(args.requests / elapsed, 1),
+        "endpoints": {kind: _summary(samples) for kind, samples in sorted(results.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--shid", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--login-every", type=int, default=4, help="one login per N requests")
+    parser.add_argument("--out", default="bench_output.txt")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    with Path(args.out).open("a") as fh:
+        fh.write(json.dumps(report, sort_keys=True) + "\n")
+
+
+if __name__ == "__main__":
+    main()
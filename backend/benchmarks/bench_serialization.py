@@ -0,0 +1,117 @@
+"""
+Serialization time and payload size of a large complaint list.
+
+    python benchmarks/bench_serialization.py --rows 10000 100000
+
+No server or database needed: synthetic rows shaped like the rows
+/admin/complaints returns (RealDictCursor dicts with datetimes, a Decimal
+age, text) are rendered three ways —
+
+  * fastapi      the old path: jsonable_encoder, then JSONResponse
+  * fast-rows    FastJSONResponse (orjson when installed), same row shape
+  * fast-columnar  FastJSONResponse of `?format=columnar` column arrays
+
+and the best of --repeat runs is reported with the raw and gzip'd size.
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from fastjson import FastJSONResponse, columnar, orjson
+
+TYPES = ["Electrical", "Plumbing", "Furniture", "Cleaning", "Internet"]
+STATUSES = ["Pending", "In‑Progress", "Resolved", "Rejected"]
+
+
+def _rows(n):
+    rnd = random.Random(n)
+    now = datetime(2026, 1, 1)
+    return [
+        {
+            "cid": n - i,
+            "sid": rnd.randint(1, 20000),
+            "type": rnd.choice(TYPES),
+            "created_at": now - timedelta(minutes=i * 7),
+            "status": rnd.choice(STATUSES),
+            "description": "Fan in the room makes noise and stops after a few minutes",
+            "withdrawcount": 0,
+            "iswithdrawn": False,
+            "proofstatus": "ready",
+            "proofimage": None,
+            "age_days": Decimal(rnd.randint(0, 900_000)) / 1000,
+            "student_name": f"Student {i % 20000}",
+            "shid": f"KHA1ID{i % 20000:05d}",
+            "hid": rnd.randint(1, 8),
+            "hostel_name": "Kaveri",
+            "wid": 3,
+            "warden_name": "R. Rao",
+            "proof_url": f"/blobs/{rnd.getrandbits(128):032x}",
+            "proof_full_url": f"/blobs/{rnd.getrandbits(128):032x}",
+        }
+        for i in range(n)
+    ]
+
+
+RENDERERS = {
+    "fastapi": lambda rows: JSONResponse(jsonable_encoder({"complaints": rows})).body,
+    "fast-rows": lambda rows: FastJSONResponse({"complaints": rows}).body,
+    "fast-columnar": lambda rows: FastJSONResponse({"complaints": columnar(rows)}).body,
+}
+
+
+def _best(fn, rows, repeat):
+    best, body = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn(rows)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", type=str, default=None, help="also write the results as JSON")
+    args = parser.parse_args()
+
+    print(f"orjson: {'yes' if orjson is not None else 'no (stdlib json fallback)'}")
+    print(f"{'rows':>8} {'renderer':<14} {'ms':>9} {'speedup':>8} {'bytes':>12} {'gzip':>10}")
+    results = []
+    for n in args.rows:
+        rows = _rows(n)
+        baseline = None
+        for name, fn in RENDERERS.items():
+            seconds, body = _best(fn, rows, args.repeat)
+            baseline = baseline or seconds
+            result = {
+                "rows": n,
+                "renderer": name,
+                "ms": round(seconds * 1000, 1),
+                "speedup": round(baseline / seconds, 1),
+                "bytes": len(body),
+                "gzip_bytes": len(gzip.compress(body, 6)),
+            }
+            results.append(result)
+            print(f"{n:>8} {name:<14} {result['ms']:>9} {result['speedup']:>7}x "
+                  f"{result['bytes']:>12} {result['gzip_bytes']:>10}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Multi‑worker cache‑coherence check for the LISTEN/NOTIFY change bus.
+
+Starts several independent API processes (each one is what a uvicorn
+worker is: its own response cache and event broker), warms their caches,
+then changes a complaint — alternately through one of the workers and
+directly in the database, as psql would — and measures how long every
+worker keeps serving the cached copy.  A push subscriber on the last
+worker (the student's own event stream, /me/events, on a signed‑in session)
+must also receive the change.
+
+    python benchmarks/check_cache_coherence.py
+    python benchmarks/check_cache_coherence.py --workers 4 --rounds 10 --bound 0.5
+
+Exit status is 1 when any worker is still stale (or a push event is still
+missing) after --bound seconds.  It works on a throw‑away hostel, student and
+complaint, and a throw‑away admin account (for /admin/stats); all are deleted
+at the end.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+from passlib.hash import bcrypt
+
+BACKEND = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, BACKEND)
+
+from db import connect  # noqa: E402
+
+STATUSES = ("In Progress", "Pending")
+ADMIN = {"email": "admin@coherence.test", "password": "coherence@admin"}  # throw‑away, for /admin/stats
+STUDENT = {"shid": "COHERENCE1", "pswd": "coherence@student"}  # throw‑away, for /me/events
+
+
+def _start_workers(args):
+    procs = []
+    for i in range(args.workers):
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.base_port + i),
+             "--log-level", "warning"],
+            cwd=BACKEND,
+        ))
+    return procs
+
+
+async def _wait_ready(clients, timeout=30):
+    deadline = time.monotonic() + timeout
+    for client in clients:
+        while True:
+            try:
+                res = await client.get("/admin/stats/bus")
+                if res.status_code == 401:  # up: sign in once, the stats are for admins
+                    await client.post("/auth/admin/login", json=ADMIN)
+                    res = await client.get("/admin/stats/bus")
+                if res.status_code == 200 and res.json()["bus"]["connected"]:
+                    break
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise SystemExit(f"✖ worker {client.base_url} did not come up")
+            await asyncio.sleep(0.2)
+
+
+async def _warm(client, paths):
+    for path in paths:
+        for _ in range(5):
+            if (await client.get(path)).headers.get("x-cache") == "HIT":
+                break
+        else:
+            raise SystemExit(f"✖ {client.base_url}{path} never became a cache HIT")
+
+
+async def _time_until_stale_gone(client, path, started, bound):
+    """Seconds until `path` on this worker stops being served from the old entry."""
+    while True:
+        if (await client.get(path)).headers.get("x-cache") != "HIT":
+            return time.perf_counter() - started
+        if time.perf_counter() - started > bound * 4:
+            return None
+        await asyncio.sleep(0.005)
+
+
+async def _next_event(stream_lines, cid, started, bound):
+    event = None
+    try:
+        async with asyncio.timeout(bound * 4):
+            async for line in stream_lines:
+                if line.startswith("event: "):
+                    event = line[7:]
+                elif line.startswith("data: ") and event and event.startswith("complaint."):
+                    if json.loads(line[6:]).get("cid") == cid:
+                        return event, time.perf_counter() - started
+    except TimeoutError:
+        pass
+    return None, None
+
+
+async def run(args):
+    conn = connect()
+    shid = STUDENT["shid"]
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO Hostel (Name, Location, NumberOfRooms) "
+                    "VALUES ('Coherence check', '-', 1) RETURNING HID")
+        hid = cur.fetchone()[0]
+        cur.execute("INSERT INTO Student (Name, HID, SHID) VALUES ('Coherence Student', %s, %s) RETURNING SID",
+                    (hid, shid))
+        sid = cur.fetchone()[0]
+        cur.execute("INSERT INTO UserAuth (SHID, PSWD) VALUES (%s, %s)", (shid, bcrypt.hash(STUDENT["pswd"])))
+        cur.execute("INSERT INTO Complaint (SID, Type, Description, Status) "
+                    "VALUES (%s, 'Plumbing', 'coherence check', 'Pending') RETURNING CID", (sid,))
+        cid = cur.fetchone()[0]
+        cur.execute("INSERT INTO Admin (Email, Password, Name) VALUES (%s, %s, 'Coherence Admin')",
+                    (ADMIN["email"], bcrypt.hash(ADMIN["password"])))
+    conn.commit()
+    paths = ["/admin/complaints/summary", f"/dashboard/{shid}", f"/fetch_complaint/{shid}"]
+
+    procs = _start_workers(args)
+    clients = [httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.base_port + i}", timeout=10)
+               for i in range(args.workers)]
+    failures, delays, event_delays = 0, [], []
+    try:
+        await _wait_ready(clients)
+        listener = clients[-1]
+        (await listener.post("/login", json=STUDENT)).raise_for_status()  # the stream is per session
+        for n in range(args.rounds):
+            status = STATUSES[n % 2]
+            writer = (n // 2) % args.workers
+            via = "database" if n % 2 else f"worker {writer}"
+            for client in clients:
+                await _warm(client, paths)
+
+            async with listener.stream("GET", "/me/events") as stream:
+                lines = stream.aiter_lines()
+                await anext(lines)  # "retry:" — subscribed from here on
+                started = time.perf_counter()
+                if n % 2:
+                    with conn.cursor() as cur:
+                        cur.execute("UPDATE Complaint SET Status = %s WHERE CID = %s", (status, cid))
+                    conn.commit()
+                else:
+                    res = await clients[writer].put(
+                        f"/admin/complaint/{cid}/status", json={"status": status})
+                    res.raise_for_status()
+
+                results = await asyncio.gather(
+                    *(_time_until_stale_gone(c, p, started, args.bound) for c in clients for p in paths),
+                    _next_event(lines, cid, started, args.bound),
+                )
+            event, event_delay = results[-1]
+            worst = max((r for r in results[:-1] if r is not None), default=0.0)
+            stale = sum(1 for r in results[:-1] if r is None or r > args.bound)
+            ok = stale == 0 and event_delay is not None and event_delay <= args.bound
+            failures += not ok
+            delays.append(worst)
+            if event_delay is not None:
+                event_delays.append(event_delay)
+            print(f"{'✔' if ok else '✖'} round {n + 1}: write via {via:<9} → "
+                  f"all {len(clients)} workers fresh after {worst * 1000:.1f} ms"
+                  f"{f', {stale} still stale' if stale else ''}; "
+                  f"push {event or 'MISSING'}"
+                  f"{f' after {event_delay * 1000:.1f} ms' if event_delay is not None else ''}")
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM Complaint WHERE SID = %s", (sid,))
+            cur.execute("DELETE FROM UserAuth WHERE SHID = %s", (shid,))
+            cur.execute("DELETE FROM Student WHERE SID = %s", (sid,))
+            cur.execute("DELETE FROM Hostel WHERE HID = %s", (hid,))
+            cur.execute("DELETE FROM Admin WHERE Email = %s", (ADMIN["email"],))
+        conn.commit()
+        conn.close()
+        for client in clients:
+            await client.aclose()
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+
+    if delays:
+        print(f"\nworst invalidation delay {max(delays) * 1000:.1f} ms, "
+              f"worst push delay {max(event_delays or [0]) * 1000:.1f} ms (bound {args.bound * 1000:.0f} ms)")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--base-port", type=int, default=8020)
+    parser.add_argument("--rounds", type=int, default=6)
+    parser.add_argument("--bound", type=float, default=1.0, help="seconds a worker may stay stale")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Overdue escalation scheduler against the configured database.
+
+    python benchmarks/check_escalation.py
+
+Creates a throw‑away hostel with one warden, one student and four pending
+complaints, gives the hostel SLA thresholds (24 h, 36 h for Electrical), then
+
+  1. a full pass (watermark cleared by PUT /admin/sla) must escalate exactly
+     the two complaints past their own deadline and queue ONE digest for
+     the warden listing both,
+  2. the next pass must find nothing new, and take an index lookup, not a
+     rescan of every pending complaint,
+  3. after an hour "passes" (watermark moved back) the complaint that
+     crossed its deadline meanwhile is escalated on its own,
+  4. a pass skips while another worker holds the scheduler lock,
+  5. /admin/complaints/overdue, /admin/sla and /admin/stats/escalation agree.
+
+SMTP points at a closed local port: no digest leaves the box.  Everything
+the run added (escalations, queued mail, the test rows) is removed and the
+watermark restored afterwards.  Exit status is 1 if a check fails.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+DOMAIN = "escalation.test"
+
+
+def main():
+    os.environ.update({
+        "SMTP_HOST": "127.0.0.1", "SMTP_PORT": "1", "SMTP_SECURITY": "none", "SMTP_USER": "",
+        "ESCALATION_INTERVAL_SECONDS": "0",  # passes are run by hand below
+    })
+    from fastapi.testclient import TestClient
+    from passlib.hash import bcrypt
+
+    import main as app_module
+    from db import pool
+    from escalation import ESCALATION_LOCK_ID, JOB, escalator
+
+    failures = 0
+
+    def check(ok, label):
+        nonlocal failures
+        failures += not ok
+        print(f"{'✔' if ok else '✘'} {label}")
+
+    def query(sql, params=(), fetch=True):
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall() if fetch else None
+            conn.commit()
+        return rows
+
+    def timed_pass():
+        started = time.perf_counter()
+        escalated = escalator.run_once()
+        return escalated, (time.perf_counter() - started) * 1000
+
+    def escalated_here():
+        return {r[0] for r in query("SELECT CID FROM ComplaintEscalation WHERE HID = %s", (hid,))}
+
+    def digests():
+        return query("SELECT Subject, Body FROM EmailOutbox WHERE Recipient = %s ORDER BY ID", (warden_mail,))
+
+    (test_started,), = query("SELECT NOW()::timestamp")
+    saved = query("SELECT Watermark FROM SchedulerState WHERE Name = %s", (JOB,))
+    (hid,), = query("INSERT INTO Hostel (Name, Location, NumberOfRooms) "
+                    "VALUES ('SLA check hostel', 'nowhere', 1) RETURNING HID")
+    warden_mail = f"warden@{DOMAIN}"
+    query("INSERT INTO Warden (Name, Mail, HID) VALUES ('SLA Warden', %s, %s)", (warden_mail, hid), fetch=False)
+    admin_mail = f"admin@{DOMAIN}"
+    query("INSERT INTO Admin (Email, Password, Name) VALUES (%s, %s, 'SLA Admin')",
+          (admin_mail, bcrypt.hash("sla@admin")), fetch=False)
+    (sid,), = query("INSERT INTO Student (Name, Mail, HID, SHID) VALUES ('SLA Student', %s, %s, %s) RETURNING SID",
+                    (f"student@{DOMAIN}", hid, f"SLA{hid:06d}"))
+
+    def complaint(type_, hours_ago):
+        (cid,), = query("INSERT INTO Complaint (SID, Type, Description, Created_at) "
+                        "VALUES (%s, %s, 'sla check', NOW() - %s * INTERVAL '1 hour') RETURNING CID",
+                        (sid, type_, hours_ago))
+        return cid
+
+    late_plumbing = complaint("Plumbing", 30)        # 24 h → overdue
+    electrical_ok = complaint("Electrical", 30)      # 36 h wins over the hostel's 24 h
+    late_electrical = complaint("Electrical", 40)    # 36 h → overdue
+    fresh_plumbing = complaint("Plumbing", 10)
+
+    try:
+        with TestClient(app_module.app) as client:
+            check(client.put("/admin/sla", json={"hid": hid, "hours": 1}).status_code == 401,
+                  "PUT /admin/sla needs an admin session")
+            res = client.post("/auth/admin/login", json={"email": admin_mail, "password": "sla@admin"})
+            check(res.status_code == 200, "admin logs in")
+            for body in ({"hid": hid, "hours": 24}, {"hid": hid, "type": "Electrical", "hours": 36}):
+                res = client.put("/admin/sla", json=body)
+                check(res.status_code == 200, f"PUT /admin/sla {body} → {res.status_code}")
+
+            # 1. full pass
+            escalated, ms = timed_pass()
+            here = escalated_here()
+            check(here == {late_plumbing, late_electrical},
+                  f"full pass: {escalated} escalated in {ms:.1f} ms, this hostel {sorted(here)}")
+            mail = digests()
+            check(len(mail) == 1 and f"#{late_plumbing}" in mail[0][1] and f"#{late_electrical}" in mail[0][1],
+                  f"one digest for the warden: {mail[0][0] if mail else None!r}")
+
+            # 2. nothing new
+            escalated, ms = timed_pass()
+            check(escalated == 0 and len(digests()) == 1, f"next pass: {escalated} escalated in {ms:.1f} ms")
+            plan = "\n".join(r[0] for r in query("""
+                EXPLAIN SELECT CID FROM Complaint
+                WHERE  Status = 'Pending' AND Created_at > NOW() - INTERVAL '25 hour'
+                AND    Created_at <= NOW() - INTERVAL '24 hour'
+            """))
+            check("Index" in plan, "the watermark window is an index range scan")
+
+            # 3. an hour later
+            query("UPDATE SchedulerState SET Watermark = Watermark - INTERVAL '1 hour' WHERE Name = %s",
+                  (JOB,), fetch=False)
+            query("UPDATE Complaint SET Created_at = NOW() - INTERVAL '24 hour 30 minute' WHERE CID = %s",
+                  (fresh_plumbing,), fetch=False)
+            escalated, ms = timed_pass()
+            check(escalated_here() == {late_plumbing, late_electrical, fresh_plumbing} and len(digests()) == 2,
+                  f"an hour later: {escalated} escalated in {ms:.1f} ms, second digest queued")
+
+            # 4. another worker holds the pass
+            with pool.connection() as other:
+                with other.cursor() as cur:
+                    cur.execute("SELECT pg_advisory_xact_lock(%s)", (ESCALATION_LOCK_ID,))
+                    check(escalator.run_once() is None, "pass skipped while the lock is held elsewhere")
+                other.rollback()
+
+            # 5. routes
+            overdue = {r["cid"] for r in client.get("/admin/complaints/overdue?escalated=true").json()["overdue"]}
+            check({late_plumbing, late_electrical, fresh_plumbing} <= overdue and electrical_ok not in overdue,
+                  "/admin/complaints/overdue?escalated=true lists the escalated complaints")
+            days = client.get("/admin/complaints/overdue").json()["threshold_days"]
+            check(days == client.get("/admin/complaints/summary").json()["overdue_threshold_days"],
+                  f"the default overdue list and the summary both use {days} days")
+            thresholds = client.get("/admin/sla").json()["thresholds"]
+            check(sum(t["hid"] == hid for t in thresholds) == 2, f"/admin/sla: {len(thresholds)} thresholds")
+            default = next(t for t in thresholds if t["hid"] is None and t["type"] is None)
+            check(client.delete(f"/admin/sla/{default['id']}").status_code == 404, "the default can't be deleted")
+            stats = client.get("/admin/stats/escalation").json()["escalation"]
+            print(f"  stats: {stats}")
+            check(stats["worker"]["runs"] == 3 and stats["worker"]["skipped"] == 1, "stats count the passes")
+    finally:
+        query("DELETE FROM ComplaintEscalation WHERE Escalated_at >= %s", (test_started,), fetch=False)
+        query("DELETE FROM EmailOutbox WHERE Created_at >= %s", (test_started,), fetch=False)
+        query("DELETE FROM Complaint WHERE SID = %s", (sid,), fetch=False)
+        query("DELETE FROM Student WHERE SID = %s", (sid,), fetch=False)
+        query("DELETE FROM Hostel WHERE HID = %s", (hid,), fetch=False)  # cascades to warden and thresholds
+        query("DELETE FROM Admin WHERE Email = %s", (admin_mail,), fetch=False)
+        if saved:
+            query("UPDATE SchedulerState SET Watermark = %s WHERE Name = %s", (saved[0][0], JOB), fetch=False)
+        else:
+            query("DELETE FROM SchedulerState WHERE Name = %s", (JOB,), fetch=False)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
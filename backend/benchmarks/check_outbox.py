@@ -0,0 +1,212 @@
+"""
+E‑mail outbox against a local SMTP stand‑in (no real mail leaves the box).
+
+    python benchmarks/check_outbox.py
+    python benchmarks/check_outbox.py --messages 1000 --server-delay-ms 20 --fail-every 25
+
+Starts a minimal SMTP server on localhost that accepts any login, takes
+--login-delay-ms to log in (what TLS + AUTH against a real provider costs),
+--server-delay-ms per message, and answers every Nth message with a
+transient 451 (--fail-every).  Then
+
+  1. POST /auth/forgot-password (in‑process TestClient) must answer without
+     waiting for SMTP, and its mail must reach the stand‑in,
+  2. --messages queued at once must all arrive (retries included) over a
+     handful of SMTP connections; throughput is compared with the old
+     connection‑and‑login‑per‑message way.
+
+Exit status is 1 if a check fails.  Test rows are deleted afterwards.
+"""
+import argparse
+import os
+import smtplib
+import socketserver
+import sys
+import threading
+import time
+from email.message import EmailMessage
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+DOMAIN = "outbox.test"
+
+
+class StandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, login_delay, delay, fail_every):
+        super().__init__(("127.0.0.1", 0), _Session)
+        self.login_delay = login_delay
+        self.delay = delay
+        self.fail_every = fail_every
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.logins = 0
+        self.data_commands = 0
+        self.delivered = []  # recipients
+
+
+class _Session(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self._reply("220 stand-in ESMTP")
+        rcpts = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self._reply("250-stand-in\r\n250 AUTH PLAIN LOGIN")
+            elif verb == "AUTH":
+                time.sleep(server.login_delay)
+                with server.lock:
+                    server.logins += 1
+                self._reply("235 2.7.0 accepted")
+            elif verb == "MAIL":
+                rcpts = []
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                rcpts.append(command.split(":", 1)[1].strip(" <>"))
+                self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 go ahead")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                time.sleep(server.delay)
+                with server.lock:
+                    server.data_commands += 1
+                    fail = server.fail_every and server.data_commands % server.fail_every == 0
+                    if not fail:
+                        server.delivered.extend(rcpts)
+                self._reply("451 4.3.0 try again later" if fail else "250 queued")
+            elif verb in ("RSET", "NOOP"):
+                self._reply("250 OK")
+            elif verb == "QUIT":
+                self._reply("221 bye")
+                return
+            else:
+                self._reply("502 not implemented")
+
+
+def _wait(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+
+def _per_message_connections(port, count):
+    """The old way: connect and log in for every single message."""
+    started = time.perf_counter()
+    for i in range(count):
+        msg = EmailMessage()
+        msg["Subject"], msg["From"], msg["To"] = "old way", f"hms@{DOMAIN}", f"old{i}@{DOMAIN}"
+        msg.set_content("hello")
+        with smtplib.SMTP("127.0.0.1", port) as smtp:
+            smtp.login("hms", "secret")
+            try:
+                smtp.send_message(msg)
+            except smtplib.SMTPDataError:
+                pass
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--login-delay-ms", type=float, default=200)
+    parser.add_argument("--server-delay-ms", type=float, default=5)
+    parser.add_argument("--fail-every", type=int, default=20, help="0 = never")
+    parser.add_argument("--shid", default="KHA1ID001", help="student for the forgot-password check")
+    args = parser.parse_args()
+
+    server = StandIn(args.login_delay_ms / 1000, args.server_delay_ms / 1000, args.fail_every)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    os.environ.update({
+        "SMTP_HOST": "127.0.0.1", "SMTP_PORT": str(port), "SMTP_SECURITY": "none",
+        "SMTP_USER": "hms", "SMTP_PASSWORD": "secret", "MAIL_FROM": f"hms@{DOMAIN}",
+        "OUTBOX_BACKOFF_SECONDS": "0.2", "OUTBOX_POLL_SECONDS": "1",
+    })
+    from fastapi.testclient import TestClient
+    from passlib.hash import bcrypt
+
+    import main as app_module
+    from db import pool
+    from outbox import OUTBOX_BATCH, enqueue, mailer
+
+    failures = 0
+
+    def check(ok, label):
+        nonlocal failures
+        failures += not ok
+        print(f"{'✔' if ok else '✘'} {label}")
+
+    with pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT NOW()::timestamp")
+            test_started = cur.fetchone()[0]
+            cur.execute("INSERT INTO Admin (Email, Password, Name) VALUES (%s, %s, 'Outbox Admin')",
+                        (f"admin@{DOMAIN}", bcrypt.hash("outbox@admin")))
+        conn.commit()
+
+    with TestClient(app_module.app) as client:
+        # 1. the request no longer waits for SMTP
+        started = time.perf_counter()
+        res = client.post("/auth/forgot-password", json={"shid": args.shid})
+        elapsed = time.perf_counter() - started
+        check(res.status_code == 200, f"forgot-password answered {res.status_code} in {elapsed * 1000:.0f} ms")
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT Mail FROM Student WHERE SHID = %s", (args.shid,))
+                address = cur.fetchone()[0]
+        check(_wait(lambda: address in server.delivered, 10), f"reset mail delivered to {address}")
+
+        # 2. a burst of queued mail goes out over reused connections
+        with pool.connection() as conn:
+            for i in range(args.messages):
+                enqueue(conn, f"user{i}@{DOMAIN}", f"Digest {i}", "Your hostel digest.")
+            conn.commit()
+        started = time.perf_counter()
+        expected = {f"user{i}@{DOMAIN}" for i in range(args.messages)}
+        done = _wait(lambda: expected <= set(server.delivered), 60 + args.messages * args.server_delay_ms / 100)
+        elapsed = time.perf_counter() - started
+        delivered = len(expected & set(server.delivered))
+        check(done, f"{delivered}/{args.messages} queued messages delivered in {elapsed:.2f}s "
+                    f"({delivered / elapsed:.0f} msg/s)")
+        check(server.connections <= max(2, args.messages // OUTBOX_BATCH // 4),
+              f"{server.connections} SMTP connection(s) / {server.logins} login(s) for {args.messages + 1} messages")
+        client.post("/auth/admin/login", json={"email": f"admin@{DOMAIN}", "password": "outbox@admin"})
+        stats = client.get("/admin/stats/outbox").json()["outbox"]
+        print(f"  stats: {stats}")
+        check(stats["queue"]["pending"] == 0, "queue drained")
+        if args.fail_every:
+            check(stats["worker"]["retried"] > 0, f"{stats['worker']['retried']} transient failures retried")
+
+    old_rate = _per_message_connections(port, min(20, args.messages))
+    print(f"  old way (connect + login per message): {old_rate:.0f} msg/s")
+
+    mailer.stop()
+    with pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM EmailOutbox WHERE Created_at >= %s AND (Recipient LIKE %s OR Recipient = %s)",
+                        (test_started, f"%@{DOMAIN}", address))
+            cur.execute("DELETE FROM Admin WHERE Email = %s", (f"admin@{DOMAIN}",))
+        conn.commit()
+    server.shutdown()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
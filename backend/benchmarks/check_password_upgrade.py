@@ -0,0 +1,128 @@
+"""
+Password hashing policy against the configured database.
+
+    python benchmarks/check_password_upgrade.py [--rows 200]
+
+Creates throw‑away accounts, then checks that
+
+  1. a warden, an admin and a student whose passwords are stored in
+     plaintext — and a student with a bcrypt hash below HASH_ROUNDS — can
+     log in, and that each login leaves a current bcrypt hash behind,
+  2. a wrong password neither logs in nor rewrites anything,
+  3. `python hashing.py migrate` hashes --rows plaintext wardens on the bulk
+     pool in parallel (time printed), leaving bcrypt rows untouched.
+
+The test rows are deleted afterwards.  Exit status is 1 if a check fails.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+DOMAIN = "hashing.test"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200, help="plaintext wardens for the bulk migration")
+    args = parser.parse_args()
+    os.environ.update({"ESCALATION_INTERVAL_SECONDS": "0", "RATE_LIMIT_ENABLED": "0"})
+
+    from fastapi.testclient import TestClient
+    from passlib.hash import bcrypt
+
+    import main as app_module
+    from db import pool
+    from hashing import BULK_HASH_WORKERS, HASH_ROUNDS, migrate_plaintext
+
+    failures = 0
+
+    def check(ok, label):
+        nonlocal failures
+        failures += not ok
+        print(f"{'✔' if ok else '✘'} {label}")
+
+    def query(sql, params=(), fetch=True):
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall() if fetch else None
+            conn.commit()
+        return rows
+
+    def current(stored):
+        return stored.startswith("$2") and bcrypt.from_string(stored).rounds >= HASH_ROUNDS
+
+    (hid,), = query("INSERT INTO Hostel (Name, Location, NumberOfRooms) VALUES ('Hashing check', '-', 1) RETURNING HID")
+    shid_plain, shid_weak = f"HASHP{hid}", f"HASHW{hid}"
+    query("INSERT INTO Warden (Name, Mail, Password, HID) VALUES ('Plain Warden', %s, 'warden@plain', %s)",
+          (f"warden@{DOMAIN}", hid), fetch=False)
+    query("INSERT INTO Admin (Email, Password, Name) VALUES (%s, 'admin@plain', 'Plain Admin')",
+          (f"admin@{DOMAIN}",), fetch=False)
+    for shid in (shid_plain, shid_weak):
+        query("INSERT INTO Student (Name, HID, SHID) VALUES ('Hash Student', %s, %s)", (hid, shid), fetch=False)
+    query("INSERT INTO UserAuth (SHID, PSWD) VALUES (%s, 'pswd@plain'), (%s, %s)",
+          (shid_plain, shid_weak, bcrypt.using(rounds=max(4, HASH_ROUNDS - 2)).hash("pswd@weak")), fetch=False)
+
+    def stored(sql, key):
+        return query(sql, (key,))[0][0]
+
+    warden_pw = "SELECT Password FROM Warden WHERE Mail = %s"
+    admin_pw = "SELECT Password FROM Admin WHERE Email = %s"
+    student_pw = "SELECT PSWD FROM UserAuth WHERE SHID = %s"
+
+    try:
+        with TestClient(app_module.app) as client:
+            # 2. wrong passwords first: nothing changes
+            res = client.post("/auth/warden/login", json={"mail": f"warden@{DOMAIN}", "password": "nope"})
+            check(res.status_code == 401 and stored(warden_pw, f"warden@{DOMAIN}") == "warden@plain",
+                  "wrong warden password: 401, row untouched")
+            res = client.post("/auth/admin/login", json={"email": f"admin@{DOMAIN}", "password": "nope"})
+            check(res.status_code == 401, "wrong admin password: 401")
+            res = client.post("/login", json={"shid": shid_weak, "pswd": "nope"})
+            check(res.json()["status"] == "invalid", "wrong student password: invalid")
+
+            # 1. legacy rows log in and are upgraded
+            res = client.post("/auth/warden/login", json={"mail": f"warden@{DOMAIN}", "password": "warden@plain"})
+            check(res.status_code == 200 and current(stored(warden_pw, f"warden@{DOMAIN}")),
+                  "plaintext warden logs in and is rehashed")
+            res = client.post("/auth/admin/login", json={"email": f"admin@{DOMAIN}", "password": "admin@plain"})
+            check(res.status_code == 200 and current(stored(admin_pw, f"admin@{DOMAIN}")),
+                  "plaintext admin logs in and is rehashed")
+            for shid, password in ((shid_plain, "pswd@plain"), (shid_weak, "pswd@weak")):
+                res = client.post("/login", json={"shid": shid, "pswd": password})
+                check(res.json()["status"] == "success" and current(stored(student_pw, shid)),
+                      f"student {shid} logs in and is rehashed to {HASH_ROUNDS} rounds")
+            res = client.post("/auth/warden/login", json={"mail": f"warden@{DOMAIN}", "password": "warden@plain"})
+            check(res.status_code == 200, "the upgraded warden logs in again")
+            stats = client.get("/admin/stats/hashing").json()["hashing"]
+            check(stats["rehashed_on_login"] == 4, f"hashing stats: {stats['rehashed_on_login']} rehashed on login")
+
+            # 3. bulk migration (inside: the app's shutdown stops the hashing pools)
+            query("""
+                INSERT INTO Warden (Name, Mail, Password, HID)
+                SELECT 'Bulk Warden ' || g, 'bulk' || g || '@' || %s, 'bulk@' || g, %s
+                FROM generate_series(1, %s) g
+            """, (DOMAIN, hid, args.rows), fetch=False)
+            before = stored(warden_pw, f"warden@{DOMAIN}")
+            started = time.perf_counter()
+            with pool.connection() as conn:
+                done = migrate_plaintext(conn, ["warden"], log=lambda _line: None)
+            elapsed = time.perf_counter() - started
+            left = query("SELECT COUNT(*) FROM Warden WHERE HID = %s AND Password !~ '^\\$2'", (hid,))[0][0]
+            check(done["warden"] >= args.rows and left == 0,
+                  f"migrate: {done['warden']} wardens hashed in {elapsed:.1f}s on {BULK_HASH_WORKERS} bulk workers "
+                  f"({done['warden'] / elapsed:.0f}/s)")
+            check(stored(warden_pw, f"warden@{DOMAIN}") == before, "bcrypt rows left as they were")
+    finally:
+        query("DELETE FROM UserAuth WHERE SHID IN (%s, %s)", (shid_plain, shid_weak), fetch=False)
+        query("DELETE FROM Student WHERE HID = %s", (hid,), fetch=False)
+        query("DELETE FROM Admin WHERE Email = %s", (f"admin@{DOMAIN}",), fetch=False)
+        query("DELETE FROM Hostel WHERE HID = %s", (hid,), fetch=False)  # cascades to the wardens
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
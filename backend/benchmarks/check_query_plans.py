@@ -0,0 +1,172 @@
+"""
+Query‑plan regression check for the hot paths.
+
+Seeds a large dataset (db.seed_scale) inside a transaction, runs EXPLAIN on
+every hot query and fails if any of them reads a big table with a
+sequential scan — i.e. if an index it relies on went missing or a query
+stopped being able to use one.  Everything is rolled back at the end, so it
+is safe to point at a development database:
+
+    python benchmarks/check_query_plans.py
+    python benchmarks/check_query_plans.py --students 50000 --complaints 500000 -v
+
+Exit status is 1 when a plan regresses.  The SQL is the routes' own: their
+module constants and *_query() builders, fed the same ComplaintFilters /
+Page objects FastAPI would build from a query string.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import admin  # noqa: E402
+import dedup  # noqa: E402
+import main as routes  # noqa: E402
+import trends  # noqa: E402
+from db import connect, seed_scale  # noqa: E402
+from migrations import migrate  # noqa: E402
+from pagination import DEFAULT_LIMIT, ComplaintFilters, Page, encode_cursor  # noqa: E402
+from principal import LOOKUP_SQL  # noqa: E402
+
+# tables that grow with usage; Hostel / Warden / Room / Admin stay tiny and a
+# seq scan over them is the right plan
+LARGE_TABLES = {"complaint", "student", "userauth", "studentcomplaintstats", "complaintdaily",
+                "complaintbucket"}
+
+
+def _filters(**given):
+    """ComplaintFilters as FastAPI builds it from `?key=value&…`."""
+    values = dict.fromkeys(("status", "hid", "type", "created_from", "created_to", "cluster_id"))
+    return ComplaintFilters(**{**values, **given})
+
+
+def _page(after=None):
+    """Page 1, or the page after the row whose sort key is `after`."""
+    return Page(limit=DEFAULT_LIMIT, cursor=encode_cursor(after) if after else None)
+
+
+def _window(**given):
+    values = {"bucket": "day", "days": 30, "start": None, "end": None, "type": None}
+    return trends.TrendWindow(**{**values, **given})
+
+
+def hot_queries(x):
+    """(name, sql, params) for every hot query, parameterised from the sample row `x`."""
+    newest = (x["created_at"], x["cid"])
+    sig = dedup.signature(x["description"])
+    return [
+        ("login: credentials by SHID", routes.LOGIN_SQL, (x["shid"],)),
+        ("SHID → SID lookup", LOOKUP_SQL, (x["shid"],)),
+        ("GET /dashboard/{shid}", routes.DASHBOARD_SQL, (x["shid"],)),
+        ("GET /fetch_complaint/{shid} (page 1)",
+         *routes.student_complaints_query(x["sid"], _filters(), _page())),
+        ("GET /fetch_complaint/{shid} (next page)",
+         *routes.student_complaints_query(x["sid"], _filters(), _page(newest))),
+        ("POST /complaint/withdraw (row lock)", routes.WITHDRAW_LOCK_SQL, (x["cid"], x["sid"])),
+        ("GET /admin/complaints (page 1)", *admin.complaint_list_query(_filters(), _page())),
+        ("GET /admin/complaints (next page)", *admin.complaint_list_query(_filters(), _page(newest))),
+        ("GET /admin/complaints?status=Pending",
+         *admin.complaint_list_query(_filters(status="Pending"), _page())),
+        ("GET /admin/complaints?status=Pending&hid=…",
+         *admin.complaint_list_query(_filters(status="Pending", hid=x["hid"]), _page())),
+        ("GET /admin/complaints?type=…", *admin.complaint_list_query(_filters(type=x["type"]), _page())),
+        ("GET /admin/complaints?created_from=…",
+         *admin.complaint_list_query(_filters(created_from=datetime.now() - timedelta(days=2)), _page())),
+        ("GET /admin/complaints?cluster_id=…",
+         *admin.complaint_list_query(_filters(cluster_id=x["cid"]), _page())),
+        ("GET /admin/complaints/search?q=…",
+         *admin.complaint_search_query(x["q"], "relevance", _filters(), _page())[:2]),
+        ("GET /admin/complaints/search?q=… (next page)",
+         *admin.complaint_search_query(x["q"], "relevance", _filters(), _page((0.1, x["cid"])))[:2]),
+        ("GET /admin/complaints/search?q=…&sort=newest&hid=…",
+         *admin.complaint_search_query(x["q"], "newest", _filters(hid=x["hid"]), _page())[:2]),
+        ("POST /complaint/add: near-duplicate candidates",
+         "SELECT * FROM complaint_cluster_candidates(%s, %s, %s, %s)",
+         (x["cid"], sig, dedup.buckets(x["hid"], x["type"], sig), dedup.DEDUP_WINDOW_DAYS)),
+        ("admin: pending count", admin.PENDING_COUNT_SQL, ()),
+        ("GET /admin/complaints/overdue", *admin.overdue_query(admin.DEFAULT_OVERDUE_DAYS)),
+        ("GET /admin/complaints/overdue?escalated=true", *admin.overdue_query(None, escalated=True)),
+        ("GET /analytics/student/complaint-trend/{shid}",
+         *trends.series_query(_window(bucket="week", days=365), trends.STUDENT_SCOPE, (x["sid"],))),
+        ("GET /analytics/hostel/{hid}/complaint-trend",
+         *trends.series_query(_window(), trends.HOSTEL_SCOPE, (x["hid"],))),
+        ("GET /analytics/campus/complaint-trend", *trends.series_query(_window())),
+        ("GET /admin/students (page 1)", *admin.student_list_query(None, None, _page())),
+        ("GET /admin/students?hid=… (next page)",
+         *admin.student_list_query(x["hid"], None, _page((x["sid"],)))),
+    ]
+
+
+# unbounded reports return every matching row; once the big side is found
+# through an index, hashing the whole Student table is the cheaper join
+ALLOWED_SEQ_SCANS = {
+    "GET /admin/complaints/overdue": {"student"},
+    # ranking reads every match (found through the GIN index) before the top page
+    "GET /admin/complaints/search?q=…": {"student"},
+}
+
+
+def _seq_scans(plan, found, allowed=frozenset()):
+    relation = plan.get("Relation Name", "").lower()
+    if plan.get("Node Type") == "Seq Scan" and relation in LARGE_TABLES - allowed:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        _seq_scans(child, found, allowed)
+    return found
+
+
+def _sample(cur):
+    cur.execute("""
+        SELECT s.SHID, s.SID, s.HID, c.CID, c.Created_at, c.Type, c.Description
+        FROM   Complaint c JOIN Student s ON s.SID = c.SID
+        WHERE  s.SHID LIKE 'SCALE%'
+        ORDER  BY c.CID DESC LIMIT 1
+    """)
+    keys = ("shid", "sid", "hid", "cid", "created_at", "type", "description")
+    return {**dict(zip(keys, cur.fetchone())), "q": "broken window"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=20_000)
+    parser.add_argument("--complaints", type=int, default=200_000)
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    conn = connect()
+    migrate(conn, log=lambda _msg: None)
+    failures = 0
+    try:
+        with conn.cursor() as cur:
+            started = time.perf_counter()
+            seed_scale(cur, students=args.students, complaints=args.complaints)
+            print(f"seeded {args.students} students / {args.complaints} complaints "
+                  f"in {time.perf_counter() - started:.1f}s")
+            queries = hot_queries(_sample(cur))
+
+            for name, sql, params in queries:
+                cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+                plan = cur.fetchone()[0]
+                plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+                scans = _seq_scans(plan, [], ALLOWED_SEQ_SCANS.get(name, frozenset()))
+                failures += bool(scans)
+                mark = "✔" if not scans else "✘"
+                detail = f"  seq scan on {', '.join(scans)}" if scans else ""
+                print(f"{mark} {name}  (cost {plan['Total Cost']:.0f}){detail}")
+                if args.verbose or scans:
+                    cur.execute("EXPLAIN " + sql, params)
+                    print("\n".join("      " + row[0] for row in cur.fetchall()))
+    finally:
+        conn.rollback()
+        conn.close()
+
+    print(f"\n{len(queries) - failures}/{len(queries)} hot queries use indexes")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Sign‑in rate limiting against the configured database.
+
+    python benchmarks/check_ratelimit.py
+
+Runs the app in‑process (TestClient) with small limits — 10 attempts per
+account, 30 per IP — and checks that
+
+  1. password guessing on one real account (a throw‑away student with a
+     bcrypt password) gets 429 + Retry-After after the account's burst:
+     each wrong password of the burst is hashed, a 429 costs no bcrypt
+     (hasher count); the median 429 latency is printed,
+  2. other accounts from the same address still get through, until the
+     address itself runs out (X-Forwarded-For, the test client being a
+     trusted proxy, stands in for different clients),
+  3. forgot‑password has its own, tighter limits,
+  4. with RATE_LIMIT_STORE=postgres two workers (two limiters) share one
+     account budget instead of getting one each.
+
+Apart from that student only unknown accounts are tried, and no mail is
+queued.  The test rows and the shared buckets it made are deleted.  Exit
+status is 1 if a check fails.
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+PREFIX = "RLCHECK"
+
+
+def main():
+    os.environ.update({
+        "RATE_LIMIT_LOGIN_PER_ACCOUNT": "10/300",
+        "RATE_LIMIT_LOGIN_PER_IP": "30/60",
+        "RATE_LIMIT_RESET_PER_ACCOUNT": "3/3600",
+        "RATE_LIMIT_TRUSTED_PROXIES": "testclient",
+        "ESCALATION_INTERVAL_SECONDS": "0",
+    })
+    from fastapi.testclient import TestClient
+    from passlib.hash import bcrypt
+
+    import main as app_module
+    import ratelimit
+    from db import pool
+    from hashing import hasher
+
+    failures = 0
+
+    def check(ok, label):
+        nonlocal failures
+        failures += not ok
+        print(f"{'✔' if ok else '✘'} {label}")
+
+    def hashes():
+        return sum(op["count"] for op in hasher.stats()["operations"].values())
+
+    def login(shid, ip):
+        started = time.perf_counter()
+        res = client.post("/login", json={"shid": shid, "pswd": "wrong"}, headers={"X-Forwarded-For": ip})
+        return res, (time.perf_counter() - started) * 1000
+
+    def query(sql, params=()):
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall() if cur.description else None
+            conn.commit()
+        return rows
+
+    # the guessed account is real, so wrong passwords do reach bcrypt
+    victim = f"{PREFIX}-A"
+    (hid,), = query("INSERT INTO Hostel (Name, Location, NumberOfRooms) "
+                    "VALUES ('Rate limit check', '-', 1) RETURNING HID")
+    query("INSERT INTO Student (Name, HID, SHID) VALUES ('RL Student', %s, %s)", (hid, victim))
+    query("INSERT INTO UserAuth (SHID, PSWD) VALUES (%s, %s)",
+          (victim, bcrypt.using(rounds=4).hash("right")))  # cheap: only the number of hashes counts
+    admin_mail = f"{PREFIX.lower()}@admin.test"
+    query("INSERT INTO Admin (Email, Password, Name) VALUES (%s, %s, 'RL Admin')",
+          (admin_mail, bcrypt.using(rounds=4).hash("admin")))
+
+    try:
+        with TestClient(app_module.app) as client:
+            # 1. guessing one account: the burst is checked against its bcrypt hash …
+            before = hashes()
+            answers = [login(victim, "10.0.0.1")[0] for _ in range(10)]
+            check([r.json()["status"] for r in answers] == ["invalid"] * 10,
+                  "first 10 attempts reach the route: wrong password")
+            check(hashes() - before == 10, f"… each one hashed ({hashes() - before} bcrypt checks)")
+            before = hashes()
+            rejected = [login(victim, "10.0.0.1") for _ in range(50)]
+            res = rejected[0][0]
+            check(all(r.status_code == 429 for r, _ in rejected), "further attempts: 429")
+            check(int(res.headers.get("Retry-After", 0)) >= 1, f"Retry-After: {res.headers.get('Retry-After')}")
+            check(hashes() == before, "no hashing for rejected attempts")
+            ms = statistics.median(ms for _, ms in rejected)
+            print(f"  429 median {ms:.2f} ms (in‑process, TestClient overhead included)")
+
+            # 2. the same address, other accounts, then the address runs out
+            codes = [login(f"{PREFIX}-B{i}", "10.0.0.2")[0].status_code for i in range(30)]
+            check(codes.count(200) == 30, "30 different accounts from one address get through")
+            check(login(f"{PREFIX}-B99", "10.0.0.2")[0].status_code == 429, "the 31st from that address: 429")
+            check(login(f"{PREFIX}-B99", "10.0.0.3")[0].status_code == 200, "another address is not affected")
+
+            # 3. password reset
+            codes = [client.post("/auth/forgot-password", json={"shid": f"{PREFIX}-R"},
+                                 headers={"X-Forwarded-For": "10.0.0.4"}).status_code for _ in range(4)]
+            check(codes[:3] == [404] * 3 and codes[3] == 429, f"forgot-password: {codes}")
+
+            client.post("/auth/admin/login", json={"email": admin_mail, "password": "admin"},
+                        headers={"X-Forwarded-For": "10.0.0.5"})
+            stats = client.get("/admin/stats/ratelimit").json()["ratelimit"]
+            print(f"  stats: {stats}")
+
+            # 4. two workers sharing the postgres store
+            ratelimit.RATE_LIMIT_STORE = "postgres"
+            workers = [ratelimit.RateLimiter(), ratelimit.RateLimiter()]
+            rule = ratelimit.RULES[("POST", "/login")]
+            allowed = 0
+            for i in range(20):
+                wait = client.portal.call(workers[i % 2].check, rule, f"10.1.0.{i}", f"{PREFIX.lower()}-shared")
+                allowed += wait == 0
+            check(allowed == 10, f"two workers, one shared account budget: {allowed}/20 allowed")
+            check(sum(w.stats()["shared_errors"] for w in workers) == 0, "no shared store errors")
+    finally:
+        query("DELETE FROM UserAuth WHERE SHID = %s", (victim,))
+        query("DELETE FROM Admin WHERE Email = %s", (admin_mail,))
+        query("DELETE FROM Student WHERE HID = %s", (hid,))
+        query("DELETE FROM Hostel WHERE HID = %s", (hid,))
+        query("DELETE FROM RateLimitBucket WHERE Key LIKE %s", (f"%{PREFIX.lower()}%",))
+        query("DELETE FROM RateLimitBucket WHERE Key LIKE %s", ("login:ip:10.1.0.%",))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
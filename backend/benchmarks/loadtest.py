@@ -0,0 +1,427 @@
+"""
+Load test: our real traffic mix against a freshly booted server.
+
+    python benchmarks/loadtest.py --label 2026.10 --out loadtest-2026.10.json
+    python benchmarks/loadtest.py --scenario login-burst --concurrency 128 --duration 60
+    python benchmarks/loadtest.py --label 2026.11 --compare loadtest-2026.10.json --out loadtest-2026.11.json
+    python benchmarks/loadtest.py --url http://staging:8000 ...   # a server that is already running
+
+  1. database --db-name (created if missing, migrated) must hold the
+     db.seed_scale() dataset at --students / --complaints / --hostels; if it
+     doesn't, it is reset and seeded.  Every SCALE student and warden gets
+     the password LOADTEST_PASSWORD, hashed once at HASH_ROUNDS,
+  2. `uvicorn main:app --workers W` is booted against it, with rate limiting
+     and the escalation scheduler off (all virtual users share one address)
+     and mail pointed at a closed local port,
+  3. per scenario, --concurrency virtual users — each with its own cookie
+     jar, signed in as a random SCALE student or warden when its requests
+     need a session — send requests back to back (closed loop), choosing
+     endpoints by weight.  --warmup seconds are not recorded, then
+     --duration seconds are,
+  4. the report has requests, errors (status >= 400 or no answer),
+     throughput and p50 / p95 / p99 / max latency per scenario and endpoint,
+     as sorted, indented JSON so two reports diff line by line.  --compare
+     prints the p95 change per endpoint against an older report and exits
+     1 when one got slower by more than --max-regression percent.
+
+The load generator shares the machine with the server unless --url points
+elsewhere; compare reports taken on the same host and settings.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+import httpx
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+LOADTEST_PASSWORD = os.environ.get("LOADTEST_PASSWORD", "loadtest@123")
+SEARCHES = ["broken window", "wifi", "water leaking", "fan -ceiling", '"power socket"', "geyser or cooler"]
+DESCRIPTIONS = ["Window latch is broken", "WiFi drops every evening", "Water leaking from the ceiling",
+                "Ceiling fan is noisy", "Power socket sparks when used", "Geyser does not heat water"]
+COMPLAINT_TYPES = ["Water Leakage", "Electricity Issue", "WiFi Problem", "Cleanliness", "Furniture Broken"]
+
+
+# ───────────────────── TRAFFIC ─────────────────────
+class Endpoint(NamedTuple):
+    method: str
+    path: Callable            # virtual user → path (with query string)
+    role: Optional[str] = None  # session the request needs: student | warden
+    body: Optional[Callable] = None
+
+
+ENDPOINTS = {
+    # students (main.py)
+    "POST /login": Endpoint("POST", lambda vu: "/login",
+                            body=lambda vu: {"shid": vu.any_student()[0], "pswd": LOADTEST_PASSWORD}),
+    "GET /session-check": Endpoint("GET", lambda vu: "/session-check"),
+    "GET /me": Endpoint("GET", lambda vu: "/me", role="student"),
+    "GET /dashboard/{shid}": Endpoint("GET", lambda vu: f"/dashboard/{vu.student[0]}"),
+    "GET /fetch_complaint/{shid}": Endpoint("GET", lambda vu: f"/fetch_complaint/{vu.student[0]}"),
+    "GET /analytics/student/complaint-trend/{shid}":
+        Endpoint("GET", lambda vu: f"/analytics/student/complaint-trend/{vu.student[0]}"),
+    "POST /complaint/add": Endpoint("POST", lambda vu: "/complaint/add", body=lambda vu: {
+        "shid": vu.student[0],
+        "type": random.choice(COMPLAINT_TYPES),
+        "description": f"{random.choice(DESCRIPTIONS)} (room {random.randint(100, 400)}, load test)",
+        "proof_image": vu.proof,
+    }),
+    # wardens (wardan.py)
+    "POST /auth/warden/login": Endpoint("POST", lambda vu: "/auth/warden/login",
+                                        body=lambda vu: {"mail": vu.any_warden()[0], "password": LOADTEST_PASSWORD}),
+    "GET /warden/profile": Endpoint("GET", lambda vu: "/warden/profile", role="warden"),
+    "GET /warden/complaints/clusters": Endpoint("GET", lambda vu: "/warden/complaints/clusters", role="warden"),
+    "GET /analytics/hostel/{hid}/complaint-trend":
+        Endpoint("GET", lambda vu: f"/analytics/hostel/{vu.warden[1]}/complaint-trend"),
+    # admins (admin.py)
+    "GET /admin/analytics": Endpoint("GET", lambda vu: "/admin/analytics"),
+    "GET /admin/complaints": Endpoint("GET", lambda vu: "/admin/complaints"),
+    "GET /admin/complaints?status&hid": Endpoint(
+        "GET", lambda vu: f"/admin/complaints?status=Pending&hid={vu.warden[1]}"),
+    "GET /admin/complaints/search": Endpoint(
+        "GET", lambda vu: f"/admin/complaints/search?q={random.choice(SEARCHES)}"),
+    "GET /admin/complaints/summary": Endpoint("GET", lambda vu: "/admin/complaints/summary"),
+    "GET /admin/complaints/overdue": Endpoint("GET", lambda vu: "/admin/complaints/overdue"),
+    "GET /admin/students": Endpoint("GET", lambda vu: f"/admin/students?hid={vu.warden[1]}"),
+    "GET /analytics/campus/complaint-trend": Endpoint("GET", lambda vu: "/analytics/campus/complaint-trend"),
+}
+
+# endpoint → weight
+SCENARIOS = {
+    # 9 pm: everyone signs in and opens the dashboard
+    "login-burst": {
+        "POST /login": 50, "GET /dashboard/{shid}": 30, "GET /me": 10, "GET /session-check": 10,
+    },
+    # everyone refreshing their dashboard and complaint list
+    "dashboard-storm": {
+        "GET /dashboard/{shid}": 40, "GET /fetch_complaint/{shid}": 25, "GET /me": 10,
+        "GET /analytics/student/complaint-trend/{shid}": 15, "POST /complaint/add": 5, "GET /session-check": 5,
+    },
+    # admins hammering the analytics pages
+    "admin-analytics": {
+        "GET /admin/analytics": 30, "GET /admin/complaints": 15, "GET /admin/complaints?status&hid": 10,
+        "GET /admin/complaints/search": 10, "GET /admin/complaints/summary": 10,
+        "GET /admin/complaints/overdue": 5, "GET /admin/students": 10, "GET /analytics/campus/complaint-trend": 10,
+    },
+    "warden-rounds": {
+        "POST /auth/warden/login": 10, "GET /warden/profile": 20, "GET /warden/complaints/clusters": 35,
+        "GET /analytics/hostel/{hid}/complaint-trend": 35,
+    },
+    # an ordinary evening
+    "mix": {
+        "POST /login": 5, "GET /session-check": 5, "GET /me": 5, "GET /dashboard/{shid}": 25,
+        "GET /fetch_complaint/{shid}": 12, "GET /analytics/student/complaint-trend/{shid}": 5,
+        "POST /complaint/add": 3, "GET /warden/complaints/clusters": 5,
+        "GET /analytics/hostel/{hid}/complaint-trend": 5, "GET /warden/profile": 2,
+        "GET /admin/analytics": 6, "GET /admin/complaints": 6, "GET /admin/complaints/search": 4,
+        "GET /admin/complaints/summary": 4, "GET /admin/complaints/overdue": 2, "GET /admin/students": 3,
+        "GET /analytics/campus/complaint-trend": 3,
+    },
+}
+
+
+class VirtualUser:
+    def __init__(self, client, students, wardens, proof):
+        self.client = client
+        self._students, self._wardens = students, wardens
+        self.student = random.choice(students)  # (SHID, HID)
+        self.warden = random.choice(wardens)    # (Mail, HID)
+        self.proof = proof
+        self._sessions = set()
+
+    def any_student(self):
+        return random.choice(self._students)
+
+    def any_warden(self):
+        return random.choice(self._wardens)
+
+    async def ensure_session(self, role):
+        """Sign in once for requests that need a session (not recorded)."""
+        if role is None or role in self._sessions:
+            return
+        if role == "student":
+            res = await self.client.post("/login", json={"shid": self.student[0], "pswd": LOADTEST_PASSWORD})
+            ok = res.status_code == 200 and res.json().get("status") == "success"
+        else:
+            res = await self.client.post("/auth/warden/login",
+                                         json={"mail": self.warden[0], "password": LOADTEST_PASSWORD})
+            ok = res.status_code == 200
+        if not ok:
+            raise RuntimeError(f"{role} sign‑in failed ({res.status_code}): {res.text[:200]}")
+        self._sessions.add(role)
+
+
+async def _user(vu, names, weights, samples, record_after, stop_at):
+    while True:
+        name = random.choices(names, weights)[0]
+        endpoint = ENDPOINTS[name]
+        await vu.ensure_session(endpoint.role)
+        started = time.perf_counter()
+        if started >= stop_at:
+            return
+        try:
+            body = endpoint.body(vu) if endpoint.body else None
+            res = await vu.client.request(endpoint.method, endpoint.path(vu), json=body)
+            status = res.status_code
+        except httpx.HTTPError:
+            status = None
+        if started >= record_after:
+            samples.setdefault(name, []).append((time.perf_counter() - started, status))
+
+
+def _summary(samples, seconds):
+    latencies = sorted(latency for latency, status in samples if status is not None)
+    errors = sum(1 for _, status in samples if status is None or status >= 400)
+    if len(latencies) > 1:
+        q = statistics.quantiles(latencies, n=100, method="inclusive")
+    else:
+        q = (latencies or [0.0]) * 99
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / seconds, 1),
+        "p50_ms": round(q[49] * 1000, 1),
+        "p95_ms": round(q[94] * 1000, 1),
+        "p99_ms": round(q[98] * 1000, 1),
+        "max_ms": round((latencies[-1] if latencies else 0.0) * 1000, 1),
+    }
+
+
+async def run_scenario(name, args, students, wardens, proof):
+    weights = SCENARIOS[name]
+    names, values = list(weights), list(weights.values())
+    samples = {}
+    limits = httpx.Limits(max_connections=4, max_keepalive_connections=4)
+    clients = [httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) for _ in range(args.concurrency)]
+    try:
+        users = [VirtualUser(client, students, wardens, proof) for client in clients]
+        now = time.perf_counter()
+        record_after, stop_at = now + args.warmup, now + args.warmup + args.duration
+        await asyncio.gather(*(_user(vu, names, values, samples, record_after, stop_at) for vu in users))
+    finally:
+        await asyncio.gather(*(client.aclose() for client in clients))
+
+    everything = [sample for endpoint in samples.values() for sample in endpoint]
+    return {
+        **_summary(everything, args.duration),
+        "weights": weights,
+        "endpoints": {endpoint: _summary(s, args.duration) for endpoint, s in samples.items()},
+    }
+
+
+# ───────────────────── DATABASE & SERVER ─────────────────────
+def prepare_database(args, log=print):
+    """Create, migrate and (re)seed the load‑test database; returns (students, wardens, scale)."""
+    import psycopg2
+
+    from db import DB_CONFIG
+
+    admin = psycopg2.connect(**{**DB_CONFIG, "database": "postgres"})
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (args.db_name,))
+        if cur.fetchone() is None:
+            cur.execute(f"CREATE DATABASE \"{args.db_name}\" ENCODING 'UTF8' TEMPLATE template0")
+            log(f"✔ created database {args.db_name}")
+    admin.close()
+
+    from db import RESET_SQL, connect, seed_scale
+    from dedup import backfill
+    from hashing import HASH_ROUNDS, pwd_context
+    from migrations import migrate
+
+    conn = connect()
+    migrate(conn, log=lambda _line: None)
+    with conn.cursor() as cur:
+        cur.execute("SELECT (SELECT COUNT(*) FROM Student), (SELECT COUNT(*) FROM Complaint), "
+                    "(SELECT COUNT(*) FROM Hostel)")
+        scale = dict(zip(("students", "complaints", "hostels"), cur.fetchone()))
+    wanted = {"students": args.students, "complaints": args.complaints, "hostels": args.hostels}
+    if scale != wanted or args.reseed:
+        log(f"… seeding {wanted} (found {scale})")
+        started = time.perf_counter()
+        with conn.cursor() as cur:
+            cur.execute(RESET_SQL)
+        conn.commit()
+        migrate(conn, log=lambda _line: None)
+        with conn.cursor() as cur:
+            seed_scale(cur, args.students, args.complaints, args.hostels,
+                       password_hash=pwd_context.hash(LOADTEST_PASSWORD))
+        conn.commit()
+        backfill(conn, log=lambda _line: None)  # near‑duplicate clusters for the warden pages
+        scale = wanted
+        log(f"✔ seeded in {time.perf_counter() - started:.0f}s (HASH_ROUNDS={HASH_ROUNDS})")
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT SHID, HID FROM Student WHERE SHID LIKE 'SCALE%%' ORDER BY random() LIMIT 5000")
+        students = cur.fetchall()
+        cur.execute("SELECT Mail, HID FROM Warden WHERE Mail LIKE 'scale.warden%%'")
+        wardens = cur.fetchall()
+    conn.close()
+    return students, wardens, scale
+
+
+def boot_server(args, log=print):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = {
+        **os.environ,
+        "DB_NAME": args.db_name,
+        "RATE_LIMIT_ENABLED": "0",
+        "ESCALATION_INTERVAL_SECONDS": "0",
+        "SMTP_HOST": "127.0.0.1", "SMTP_PORT": "1", "SMTP_SECURITY": "none", "SMTP_USER": "",
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=BACKEND, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            sys.exit(f"server exited with status {proc.returncode}")
+        try:
+            if httpx.get(f"{url}/session-check", timeout=2).status_code == 200:
+                log(f"✔ server up at {url} ({args.workers} worker(s), pid {proc.pid})")
+                return proc, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    proc.terminate()
+    sys.exit("server did not come up within 60 s")
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+# ───────────────────── REPORT ─────────────────────
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report):
+    print(f"\n{'scenario / endpoint':<52} {'req':>7} {'err':>5} {'rps':>7} "
+          f"{'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for name, scenario in report["scenarios"].items():
+        rows = [(name, scenario)] + [(f"  {e}", s) for e, s in sorted(scenario["endpoints"].items())]
+        for label, s in rows:
+            print(f"{label:<52} {s['requests']:>7} {s['errors']:>5} {s['rps']:>7} "
+                  f"{s['p50_ms']:>8} {s['p95_ms']:>8} {s['p99_ms']:>8} {s['max_ms']:>8}")
+
+
+def compare(old, new, max_regression):
+    """Print p95 / throughput changes; returns the endpoints that regressed."""
+    regressed = []
+    print(f"\nagainst {old.get('label')} ({old.get('commit')}):")
+    print(f"{'scenario / endpoint':<52} {'p95 old':>9} {'p95 new':>9} {'change':>8} {'rps change':>11}")
+    for name, scenario in new["scenarios"].items():
+        before = old.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        pairs = [(name, before, scenario)] + [
+            (f"  {e}", before["endpoints"][e], s) for e, s in sorted(scenario["endpoints"].items())
+            if e in before["endpoints"]
+        ]
+        for label, b, n in pairs:
+            change = (n["p95_ms"] - b["p95_ms"]) / b["p95_ms"] * 100 if b["p95_ms"] else 0.0
+            rps = (n["rps"] - b["rps"]) / b["rps"] * 100 if b["rps"] else 0.0
+            slower = change > max_regression and n["p95_ms"] - b["p95_ms"] > 1.0  # 1 ms noise floor
+            if slower:
+                regressed.append(label.strip())
+            print(f"{label:<52} {b['p95_ms']:>9} {n['p95_ms']:>9} {change:>+7.0f}% {rps:>+10.0f}%"
+                  f"{'  ✘' if slower else ''}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=32, help="virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="recorded seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=5, help="unrecorded seconds before that")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers to boot")
+    parser.add_argument("--url", default=None, help="test this running server instead of booting one")
+    parser.add_argument("--db-name", default=os.environ.get("LOADTEST_DB_NAME", "hms_loadtest"))
+    parser.add_argument("--students", type=int, default=20_000)
+    parser.add_argument("--complaints", type=int, default=200_000)
+    parser.add_argument("--hostels", type=int, default=20)
+    parser.add_argument("--reseed", action="store_true", help="reseed even if the scale matches")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the traffic")
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--out", default="loadtest.json")
+    parser.add_argument("--compare", default=None, help="an older report to compare with")
+    parser.add_argument("--max-regression", type=float, default=25, help="allowed p95 increase, percent")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    if args.url is None:
+        os.environ["DB_NAME"] = args.db_name
+    students, wardens, scale = prepare_database(args)
+    from db import SAMPLE_PROOF_PNG
+    from hashing import HASH_ROUNDS
+
+    proof = base64.b64encode(SAMPLE_PROOF_PNG).decode()
+    proc = None
+    if args.url is None:
+        proc, args.url = boot_server(args)
+    try:
+        scenarios = {}
+        for name in args.scenario:
+            print(f"… {name}: {args.concurrency} users, {args.warmup:g}s warm‑up + {args.duration:g}s")
+            scenarios[name] = asyncio.run(run_scenario(name, args, students, wardens, proof))
+    finally:
+        if proc is not None:
+            stop_server(proc)
+
+    report = {
+        "label": args.label,
+        "commit": _commit(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "concurrency": args.concurrency, "duration_s": args.duration, "warmup_s": args.warmup,
+            "workers": args.workers if proc is not None else None, "hash_rounds": HASH_ROUNDS,
+            "seed": args.seed, "url": args.url if proc is None else "booted",
+        },
+        "dataset": scale,
+        "host": {"cpus": os.cpu_count(), "python": platform.python_version(), "platform": platform.platform()},
+        "scenarios": scenarios,
+    }
+    Path(args.out).write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+    print_report(report)
+    print(f"\n✔ report written to {args.out}")
+
+    if args.compare:
+        regressed = compare(json.loads(Path(args.compare).read_text()), report, args.max_regression)
+        if regressed:
+            print(f"✘ p95 regressed by more than {args.max_regression:g}%: {', '.join(regressed)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+# blobstore.py — content‑addressed storage for complaint proof images
+#
+# Each blob lives on local disk at  <BLOB_ROOT>/ab/cd/<sha256>  and is written
+# exactly once: identical uploads hash to the same name, so they dedupe for
+# free.  Complaint rows only keep the 64‑char digest (Complaint.ProofBlob).
+#
+#   python blobstore.py migrate   # move legacy base64 ProofImage rows to disk
+#   python blobstore.py gc        # delete blobs no complaint references
+import base64
+import binascii
+import hashlib
+import os
+import re
+import sys
+import tempfile
+import time
+
+BLOB_ROOT = os.environ.get("BLOB_ROOT", os.path.join(os.path.dirname(__file__), "blobs"))
+# resumable upload sessions (see uploads.py) keep their partial files here
+UPLOAD_DIR = os.path.join(BLOB_ROOT, ".uploads")
+# blobs younger than this are never GC'd: their complaint row may not be committed yet
+GC_GRACE_SECONDS = int(os.environ.get("BLOB_GC_GRACE_SECONDS", "3600"))
+# abandoned upload sessions / temp files older than this are removed by GC
+STALE_UPLOAD_SECONDS = int(os.environ.get("UPLOAD_SESSION_TTL", str(24 * 3600)))
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+def sniff_content_type(head):
+    """Guess the image type from its first bytes (never trust the client's label)."""
+    for magic, mime in _SIGNATURES:
+        if head.startswith(magic):
+            return mime
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def decode_base64_image(value):
+    """Accept raw base64 or a full `data:image/...;base64,` URL and return bytes."""
+    if value.startswith("data:"):
+        value = value.split(",", 1)[-1]
+    try:
+        return base64.b64decode(value.strip(), validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError("proof_image is not valid base64")
+
+
+def is_digest(value):
+    return bool(value) and _DIGEST_RE.match(value) is not None
+
+
+class BlobStore:
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, digest):
+        if not is_digest(digest):
+            raise ValueError("invalid blob id")
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def commit_file(self, tmp_path, digest):
+        """
+        Atomically move a finished file (from temp_file(), or anywhere under
+        BLOB_ROOT) into place as `digest`, or drop it if we already have it.
+        The caller vouches that `digest` is the file's sha256.
+        """
+        final = self.path(digest)
+        if self._touch(digest):
+            os.unlink(tmp_path)
+            return digest
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        os.replace(tmp_path, final)
+        return digest
+
+    def temp_file(self):
+        """An open, not auto‑deleted temp file on the blob volume, for commit_file()."""
+        os.makedirs(self.root, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=self.root, prefix=".tmp-", delete=False)
+
+    def _touch(self, digest):
+        """Re‑uploading an existing blob refreshes its mtime so GC won't race it."""
+        try:
+            os.utime(self.path(digest))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def put(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        if self._touch(digest):
+            return digest
+        with self.temp_file() as tmp:
+            tmp.write(data)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        return self.commit_file(tmp.name, digest)
+
+    def delete(self, digest):
+        try:
+            os.unlink(self.path(digest))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def iter_blobs(self):
+        """Yield (digest, mtime) for every stored blob."""
+        if not os.path.isdir(self.root):
+            return
+        for dirpath, _dirs, files in os.walk(self.root):
+            for name in files:
+                if is_digest(name):
+                    yield name, os.path.getmtime(os.path.join(dirpath, name))
+
+
+store = BlobStore(BLOB_ROOT)
+
+
+def proof_url(digest):
+    return f"/complaint/proof/{digest}" if digest else None
+
+
+# ───────────────────── MAINTENANCE ─────────────────────
+def migrate_proof_images(conn, batch_size=200):
+    """
+    Move base64 Complaint.ProofImage values into the blob store, one batch
+    per transaction so a long migration never holds locks for long.
+    Returns (rows_moved, rows_skipped).
+    """
+    moved = skipped = 0
+    last_cid = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT CID, ProofImage
+                FROM   Complaint
+                WHERE  CID > %s AND ProofImage IS NOT NULL AND ProofBlob IS NULL
+                ORDER  BY CID
+                LIMIT  %s
+                """,
+                (last_cid, batch_size),
+            )
+            rows = cur.fetchall()
+            if not rows:
+                break
+
+            updates = []
+            for cid, proof in rows:
+                last_cid = cid
+                try:
+                    updates.append((store.put(decode_base64_image(proof)), cid))
+                except ValueError:
+                    skipped += 1  # leave undecodable legacy rows untouched
+
+            cur.executemany(
+                "UPDATE Complaint SET ProofBlob = %s, ProofImage = NULL WHERE CID = %s",
+                updates,
+            )
+        conn.commit()
+        moved += len(updates)
+    return moved, skipped
+
+
+def collect_garbage(conn, grace_seconds=GC_GRACE_SECONDS):
+    """Delete blobs no complaint points at.  Returns the number removed."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT ProofBlob  FROM Complaint WHERE ProofBlob  IS NOT NULL
+            UNION
+            SELECT ProofThumb FROM Complaint WHERE ProofThumb IS NOT NULL
+        """)
+        referenced = {row[0] for row in cur.fetchall()}
+    conn.rollback()
+
+    cutoff = time.time() - grace_seconds
+    removed = 0
+    for digest, mtime in list(store.iter_blobs()):
+        if digest not in referenced and mtime < cutoff:
+            removed += store.delete(digest)
+
+    # temp files of crashed writes and abandoned resumable uploads
+    stale = time.time() - STALE_UPLOAD_SECONDS
+    for directory in (store.root, UPLOAD_DIR):
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path) and not is_digest(name) and os.path.getmtime(path) < stale:
+                os.unlink(path)
+    return removed
+
+
+def main(argv):
+    from db import connect
+    from migrations import migrate
+
+    command = argv[1] if len(argv) > 1 else "migrate"
+    conn = connect()
+    try:
+        if command == "migrate":
+            migrate(conn)
+            moved, skipped = migrate_proof_images(conn)
+            print(f"✔ moved {moved} proof images to {store.root} ({skipped} undecodable rows skipped)")
+            print(f"✔ removed {collect_garbage(conn)} orphaned blobs")
+        elif command == "gc":
+            print(f"✔ removed {collect_garbage(conn)} orphaned blobs")
+        else:
+            print("usage: python blobstore.py [migrate|gc]")
+            return 2
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,194 @@
+# bus.py — cross‑worker change bus on Postgres LISTEN/NOTIFY
+#
+# The response cache (cache.py) and the push broker (events.py) live inside
+# one worker process.  With several uvicorn workers a write handled by
+# worker A would leave B's cache stale and B's subscribers uninformed.
+#
+# Triggers on Complaint, Student, Warden and Hostel (migration 007) send a
+# small JSON message on channel `hostel_changes` when their transaction
+# commits.  Every worker keeps ONE dedicated autocommit connection LISTENing
+# on it; each message is turned into
+#   * cache invalidations (the same tags the write paths use), and
+#   * a push event for complaint changes, relayed to this worker's
+#     subscribers — including the worker that made the write, so each
+#     event reaches every subscriber exactly once.
+# The SHID resolver (principal.py) is kept current the same way; other
+# in‑process caches register with `bus.on(table, handler)`.
+#
+# If the listening connection drops, notifications sent meanwhile are lost,
+# so after reconnecting the whole response cache is cleared and subscribers
+# get a `reset` to refetch once.
+import asyncio
+import json
+import os
+import time
+
+import psycopg
+
+from cache import response_cache
+from db_async import CONNINFO
+from events import broker, publish_complaint_event
+from principal import principals
+
+CHANNEL = "hostel_changes"
+BUS_RECONNECT_MAX_SECONDS = float(os.environ.get("BUS_RECONNECT_MAX_SECONDS", "30"))
+NOTIFY_MAX_BYTES = 7900  # Postgres rejects payloads of 8000 bytes or more
+
+_COMPLAINT_EVENTS = {"insert": "complaint.created", "delete": "complaint.deleted"}
+
+
+def bulk_message(table, drop_order=(), **fields):
+    """
+    Payload of the one summary notification a bulk statement sends in place
+    of its per‑row ones (it runs with `SET LOCAL app.bulk_changes = 'on'`).
+    Fields named in `drop_order` are left out, in that order, until the
+    message fits; receivers treat a missing list as "could be anything".
+    """
+    message = {"table": table, "op": "bulk", **fields}
+    payload = json.dumps(message, default=str, separators=(",", ":"))
+    for field in drop_order:
+        if len(payload.encode()) <= NOTIFY_MAX_BYTES:
+            break
+        message.pop(field, None)
+        payload = json.dumps(message, default=str, separators=(",", ":"))
+    return payload
+
+
+def complaint_event_type(message):
+    if message["op"] != "update":
+        return _COMPLAINT_EVENTS[message["op"]]
+    if message.get("status") == message.get("old_status"):
+        return None  # e.g. the proof thumbnail landed — nothing to announce
+    return "complaint.withdrawn" if message.get("status") == "Withdrawn" else "complaint.status"
+
+
+def _bulk_complaints(message):
+    shids = message.get("shids")
+    if shids is None:
+        response_cache.clear()
+    else:
+        response_cache.invalidate("complaints", *(f"student:{shid}" for shid in shids))
+    if "status" not in message:
+        return  # e.g. the dedup backfill: nothing students or wardens need to hear
+
+    data = {"status": message.get("status"), "count": message.get("count"), "bulk": True}
+    broker.publish("complaint.status", {**data, "cids": message.get("cids")},
+                   ["admin", *(f"hostel:{hid}" for hid in message.get("hids") or ())])
+    if shids is None:
+        broker.reset("student:")
+    else:  # students only learn that something of theirs changed, not other students' ids
+        broker.publish("complaint.status", data, [f"student:{shid}" for shid in shids])
+
+
+def _invalidate_complaint(message):
+    if message["op"] == "bulk":
+        return _bulk_complaints(message)
+    tags = ["complaints"]
+    for key in ("shid", "old_shid"):
+        if message.get(key):
+            tags.append(f"student:{message[key]}")
+    response_cache.invalidate(*tags)
+
+    event_type = complaint_event_type(message)
+    if event_type:
+        publish_complaint_event(
+            event_type, message.get("cid"), message.get("shid"), message.get("hid"),
+            status=message.get("status"), complaint_type=message.get("type"),
+        )
+
+
+def _invalidate_student(message):
+    if message["op"] == "bulk":  # e.g. a CSV import: one message for many rows
+        principals.clear()
+        response_cache.clear()
+        return
+    shids = [message[key] for key in ("shid", "old_shid") if message.get(key)]
+    principals.invalidate(*shids)
+    response_cache.invalidate("students", "complaints", *(f"student:{shid}" for shid in shids))
+
+
+class ChangeBus:
+    def __init__(self, conninfo, channel):
+        self.conninfo = conninfo
+        self.channel = channel
+        self._handlers = {
+            "complaint": [_invalidate_complaint],
+            "student": [_invalidate_student],
+            "warden": [lambda _m: response_cache.invalidate("wardens")],
+            "hostel": [lambda _m: response_cache.invalidate("hostels")],
+            "escalation": [lambda _m: response_cache.invalidate("escalations")],
+        }
+        self._task = None
+        self._connected = False
+        # last_lag_ms: row change (trigger's `ts`, DB clock) → received here; last_dispatch_ms:
+        # time spent in the handlers for that message
+        self._stats = {"received": 0, "errors": 0, "reconnects": 0,
+                       "last_lag_ms": None, "last_dispatch_ms": 0.0}
+
+    def on(self, table, handler):
+        """Call `handler(message)` for every change notification on `table`."""
+        self._handlers.setdefault(table, []).append(handler)
+
+    def dispatch(self, message):
+        for handler in self._handlers.get(message.get("table"), ()):
+            try:
+                handler(message)
+            except Exception as e:
+                self._stats["errors"] += 1
+                print("❌ Change bus handler failed:", e)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        delay, first = 0.5, True
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {self.channel}")
+                    self._connected = True
+                    if not first:
+                        # anything sent while we were away is lost: start clean
+                        self._stats["reconnects"] += 1
+                        response_cache.clear()
+                        principals.clear()
+                        broker.reset()
+                    first, delay = False, 0.5
+                    async for notify in conn.notifies():
+                        self._receive(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Change bus disconnected ({e}); retrying in {delay:.1f}s")
+            self._connected = False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, BUS_RECONNECT_MAX_SECONDS)
+
+    def _receive(self, payload):
+        started = time.perf_counter()
+        self._stats["received"] += 1
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            self._stats["errors"] += 1
+            return
+        if "ts" in message:  # trigger messages (migration 014); bulk / wake‑up ones have none
+            self._stats["last_lag_ms"] = round((time.time() - float(message["ts"])) * 1000, 3)
+        self.dispatch(message)
+        self._stats["last_dispatch_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+    def stats(self):
+        return {"channel": self.channel, "connected": self._connected, **self._stats}
+
+
+bus = ChangeBus(CONNINFO, CHANNEL)
@@ -0,0 +1,195 @@
+# cache.py — in‑process response cache for read‑heavy GET routes
+#
+# The admin SPA refetches the complaint list, summary and overdue report
+# after every single status change; most of those refetches return exactly
+# what the previous one did.  Routes opt in with `@cached(tags…)`:
+#
+#   * the first GET renders normally; its body is stored under
+#     (path, sorted query string) with a TTL, LRU‑bounded by CACHE_MAX_ENTRIES,
+#   * every cached response carries an ETag, so a browser revalidating with
+#     If-None-Match gets an empty 304,
+#   * write paths call `response_cache.invalidate(tag, …)` after committing;
+#     every entry carrying one of those tags is dropped.  Tags may reference
+#     path parameters — `"student:{shid}"` — so a write for one student leaves
+#     everybody else's dashboard cached.
+#
+# Writes made by other workers or psql reach this process through the change
+# bus (bus.py); the TTL is only the safety net if that listener is down.
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from fastapi.routing import APIRoute
+from starlette.responses import Response
+
+CACHE_TTL = float(os.environ.get("CACHE_TTL", "30"))
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "2048"))
+
+
+def make_etag(body):
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+class _Entry:
+    __slots__ = ("body", "media_type", "etag", "tags", "expires")
+
+    def __init__(self, body, media_type, tags, expires):
+        self.body = body
+        self.media_type = media_type
+        self.etag = make_etag(body)
+        self.tags = tags
+        self.expires = expires
+
+
+class ResponseCache:
+    """Thread‑safe TTL + LRU map from request key to rendered body, indexed by tag."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_tag = {}
+        self._versions = {}  # tag → bumped on every invalidation
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0,
+                       "evictions": 0, "expired": 0, "invalidated": 0, "stale_skipped": 0}
+
+    def _drop(self, key):
+        # caller holds self._lock
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry.expires < time.monotonic():
+                self._drop(key)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry
+
+    def versions(self, tags):
+        """Snapshot tag versions before rendering; pass it back to put()."""
+        with self._lock:
+            return tuple(self._versions.get(tag, 0) for tag in tags)
+
+    def put(self, key, body, media_type, tags, versions, ttl=None):
+        """
+        Store a rendered body unless one of its tags was invalidated while it
+        was being rendered (it may already be stale).  Returns the entry.
+        """
+        entry = _Entry(body, media_type, tuple(tags), time.monotonic() + (ttl or self.ttl))
+        with self._lock:
+            if tuple(self._versions.get(tag, 0) for tag in entry.tags) != versions:
+                self._stats["stale_skipped"] += 1
+                return entry
+            self._drop(key)
+            self._entries[key] = entry
+            for tag in entry.tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+        return entry
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+                for key in list(self._by_tag.get(tag, ())):
+                    self._drop(key)
+                    self._stats["invalidated"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_tag.clear()
+            for tag in self._versions:
+                self._versions[tag] += 1
+
+    def note_not_modified(self):
+        with self._lock:
+            self._stats["not_modified"] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                **self._stats,
+                "hit_ratio": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+
+response_cache = ResponseCache(CACHE_MAX_ENTRIES, CACHE_TTL)
+
+
+def cached(*tags, ttl=None):
+    """Mark a GET endpoint as cacheable; the router must use CachedRoute."""
+    def mark(endpoint):
+        endpoint.__response_cache__ = (tags, ttl)
+        return endpoint
+    return mark
+
+
+def _not_modified(request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {value.strip().removeprefix("W/") for value in header.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+class CachedRoute(APIRoute):
+    """APIRoute that serves `@cached` endpoints from response_cache."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        spec = getattr(self.endpoint, "__response_cache__", None)
+        if spec is None:
+            return handler
+        tag_templates, ttl = spec
+
+        async def cached_handler(request):
+            if request.method != "GET":
+                return await handler(request)
+
+            # encoded, so ?q=a%26type%3Db (one q) and ?q=a&type=b stay two entries
+            key = request.url.path + "?" + urlencode(sorted(request.query_params.multi_items()))
+            entry = response_cache.get(key)
+            status = "HIT"
+            if entry is None:
+                status = "MISS"
+                tags = [t.format(**request.path_params) for t in tag_templates]
+                versions = response_cache.versions(tags)
+                response = await handler(request)
+                body = getattr(response, "body", None)
+                if response.status_code != 200 or body is None or "set-cookie" in response.headers:
+                    return response
+                entry = response_cache.put(key, body, response.media_type, tags, versions, ttl)
+
+            headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "X-Cache": status}
+            if _not_modified(request, entry.etag):
+                response_cache.note_not_modified()
+                return Response(status_code=304, headers=headers)
+            return Response(entry.body, media_type=entry.media_type, headers=headers)
+
+        return cached_handler
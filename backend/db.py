@@ -1,98 +1,248 @@
 # db.py — FINAL VERSION
+import base64
+import os
 import random
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import psycopg2
+from psycopg2 import extensions
 
+from blobstore import store
 
-def get_db_connection():
-    return psycopg2.connect(
-        database="HostelDB",
-        user="postgres",
-        password="Khan@123",
-        host="localhost",
-        port="5433",
-    )
 
+DB_CONFIG = {
+    "database": os.environ.get("DB_NAME", "HostelDB"),
+    "user": os.environ.get("DB_USER", "postgres"),
+    "password": os.environ.get("DB_PASSWORD", "Khan@123"),
+    "host": os.environ.get("DB_HOST", "localhost"),
+    "port": os.environ.get("DB_PORT", "5433"),
+}
 
-TABLE_SQL = [
-    "DROP TABLE IF EXISTS Complaint, UserAuth, Student, Room, Warden, Hostel, Admin  CASCADE",
+# pool sizing — tune with the numbers from ConnectionPool.stats()
+POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", "2"))
+POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "20"))
+POOL_ACQUIRE_TIMEOUT = float(os.environ.get("DB_POOL_ACQUIRE_TIMEOUT", "5"))
+# connections idle for longer than this get a `SELECT 1` before being handed out
+POOL_CHECK_IDLE_AFTER = float(os.environ.get("DB_POOL_CHECK_IDLE_AFTER", "10"))
 
-    """
-    CREATE TABLE Hostel (
-        HID SERIAL PRIMARY KEY,
-        Name VARCHAR(100),
-        Location VARCHAR(100),
-        NumberOfRooms INT
-    )
-    """,
 
-    """
-    CREATE TABLE Warden (
-        WID SERIAL PRIMARY KEY,
-        Name VARCHAR(100),
-        Mail VARCHAR(100),
-        Phone VARCHAR(20),
-        Password VARCHAR(100),
-        HID INT REFERENCES Hostel(HID) ON DELETE CASCADE
-    )
-    """,
+def connect():
+    """Open a raw, unpooled connection (scripts / seeding only)."""
+    return psycopg2.connect(**DB_CONFIG)
 
-    """
-    CREATE TABLE Room (
-        RID SERIAL PRIMARY KEY,
-        RoomNumber VARCHAR(20),
-        Capacity INT,
-        HID INT REFERENCES Hostel(HID)
-    )
-    """,
 
-    """
-    CREATE TABLE Student (
-        SID SERIAL PRIMARY KEY,
-        Name VARCHAR(100),
-        Phone VARCHAR(20),
-        Mail VARCHAR(100),
-        DOB DATE,
-        HID INT REFERENCES Hostel(HID),
-        SHID VARCHAR(50) UNIQUE
-    )
-    """,
+class PoolTimeout(Exception):
+    """No connection became free within the acquire timeout."""
 
-    """
-    CREATE TABLE UserAuth (
-        UID SERIAL PRIMARY KEY,
-        SHID VARCHAR(50) REFERENCES Student(SHID),
-        PSWD VARCHAR(100)
-    )
-    """,
 
+class ConnectionPool:
     """
-    CREATE TABLE Complaint (
-        CID SERIAL PRIMARY KEY,
-        SID INT REFERENCES Student(SID),
-        Type VARCHAR(100),
-        Created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        Status VARCHAR(50) DEFAULT 'Pending',
-        Description TEXT,
-        ProofImage TEXT,
-        WithdrawCount INT DEFAULT 0,
-        IsWithdrawn BOOLEAN DEFAULT FALSE
-    )
-    """,
+    Thread‑safe psycopg2 pool with a bounded size, an acquire timeout and a
+    liveness check on checkout.  Sync route handlers run in FastAPI's thread
+    pool, so every checkout/return goes through one Condition.
+    """
+
+    def __init__(self, min_size, max_size, acquire_timeout, check_idle_after, **conn_kwargs):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("invalid pool size")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.check_idle_after = check_idle_after
+        self._conn_kwargs = conn_kwargs
+
+        self._cond = threading.Condition()
+        self._idle = deque()          # (conn, returned_at)
+        self._in_use = set()
+        self._opening = 0             # connects in progress (counted against max_size)
+        self._waiting = 0
+        self._filled = False
+
+        # counters for stats()
+        self._acquired = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    # ── internals ──────────────────────────────────────────
+    def _size(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _open(self):
+        return psycopg2.connect(**self._conn_kwargs)
+
+    def _fill(self):
+        """Open the first `min_size` connections lazily (import must not need a DB)."""
+        while len(self._idle) < self.min_size:
+            self._idle.append((self._open(), time.monotonic()))
+        self._filled = True
+
+    def _healthy(self, conn, returned_at):
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.check_idle_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        self._discarded += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    # ── public API ─────────────────────────────────────────
+    def getconn(self):
+        start = time.monotonic()
+        deadline = start + self.acquire_timeout
+
+        while True:
+            with self._cond:
+                if not self._filled:
+                    self._fill()
+
+                self._waiting += 1
+                try:
+                    while not self._idle and self._size() >= self.max_size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._timeouts += 1
+                            raise PoolTimeout(
+                                f"no database connection free after {self.acquire_timeout}s"
+                            )
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    self._in_use.add(conn)
+                else:
+                    conn, returned_at = None, None
+                    self._opening += 1
+
+            # network I/O happens outside the lock
+            if conn is None:
+                try:
+                    conn = self._open()
+                finally:
+                    with self._cond:
+                        self._opening -= 1
+                        if conn is not None:
+                            self._in_use.add(conn)
+                        self._cond.notify()
+            elif not self._healthy(conn, returned_at):
+                with self._cond:
+                    self._in_use.discard(conn)
+                    self._discard(conn)
+                    self._cond.notify()
+                continue
+
+            waited = time.monotonic() - start
+            with self._cond:
+                self._acquired += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            return conn
+
+    def putconn(self, conn):
+        # never hand out a connection that is mid‑transaction or broken
+        if not conn.closed:
+            status = conn.get_transaction_status()
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    conn.close()
+        if not conn.closed and conn.autocommit:
+            conn.autocommit = False
+
+        with self._cond:
+            self._in_use.discard(conn)
+            if conn.closed or len(self._idle) >= self.max_size:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        with self._cond:
+            while self._idle:
+                self._idle.pop()[0].close()
+            self._filled = False
+
+    def stats(self):
+        with self._cond:
+            acquired = self._acquired
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "opening": self._opening,
+                "waiting": self._waiting,
+                "acquired": acquired,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "wait_avg_ms": round(self._wait_total / acquired * 1000, 3) if acquired else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+            }
+
+
+pool = ConnectionPool(
+    POOL_MIN_SIZE,
+    POOL_MAX_SIZE,
+    POOL_ACQUIRE_TIMEOUT,
+    POOL_CHECK_IDLE_AFTER,
+    **DB_CONFIG,
+)
+
+
+def get_db_connection():
     """
-    CREATE TABLE Admin (
-        AID         SERIAL PRIMARY KEY,
-        Email       VARCHAR(150) UNIQUE NOT NULL,
-        Password    VARCHAR(100)        NOT NULL,
-        Name        VARCHAR(100),
-        Created_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
+    FastAPI dependency: borrow a pooled connection for the request and always
+    give it back (rolled back if the handler didn't commit).
     """
-]
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
+
+
+# The schema itself lives in migrations.py.  Resetting is opt‑in only:
+#   python db.py            # migrate, seed demo data into an empty database
+#   python db.py upgrade    # migrate only
+#   python db.py --reset    # ⚠ drop every table, then migrate + seed
+RESET_SQL = (
+    "DROP TABLE IF EXISTS schema_migrations, RateLimitBucket, SchedulerState, ComplaintEscalation, SlaThreshold, EmailOutbox, "
+    "ComplaintBucket, ComplaintDaily, StudentComplaintStats, Complaint, "
+    "UserAuth, Student, Room, Warden, Hostel, Admin CASCADE"
+)
+
 
 # ────────────────────────────────────────────────────────────────
 # helper to create the Admin table *and* seed two default admins
-# call this just after the other TABLE_SQL statements run
+# call this just after the migrations have run
 # ────────────────────────────────────────────────────────────────
 def create_admin_table_and_seed(cursor):
     # 2️⃣  insert two default admin rows
@@ -104,6 +254,12 @@ def create_admin_table_and_seed(cursor):
     """)
 
 
+# 1×1 transparent PNG used as the demo proof image
+SAMPLE_PROOF_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+
 def seed_boys_hostel_demo_data(cursor):
     # Hostels
     hostels = [
@@ -192,31 +348,132 @@ def seed_boys_hostel_demo_data(cursor):
 
     complaint_types = ["Water Leakage", "Electricity Issue", "WiFi Problem", "Cleanliness", "Furniture Broken"]
     complaints = []
+    proof = store.put(SAMPLE_PROOF_PNG)  # every demo complaint shares one deduplicated blob
 
     for sid in selected_sids:
         comp_type = random.choice(complaint_types)
         description = f"{comp_type} needs urgent attention."
-        proof = "data:image/png;base64,sampleproofstring"
         complaints.append((sid, comp_type, description, proof))
 
     cursor.executemany(
-        "INSERT INTO Complaint (SID, Type, Description, ProofImage) VALUES (%s, %s, %s, %s)",
+        "INSERT INTO Complaint (SID, Type, Description, ProofBlob) VALUES (%s, %s, %s, %s)",
         complaints,
     )
 
 
+def seed_scale(cursor, students=20_000, complaints=200_000, hostels=20, password_hash=None):
+    """
+    Bulk‑generate a realistic volume of rows entirely inside Postgres
+    (generate_series), for query‑plan checks and load tests.  SHIDs are
+    `SCALE<n>`; every UserAuth row gets `password_hash` (hash it once).
+    Statuses skew the way a real campus does: mostly resolved, the few
+    pending ones recent.
+    """
+    cursor.execute("""
+        INSERT INTO Hostel (Name, Location, NumberOfRooms)
+        SELECT 'Scale Hostel ' || g, 'Block ' || g, 100
+        FROM   generate_series(1, %s) g
+        RETURNING HID
+    """, (hostels,))
+    hostel_ids = [row[0] for row in cursor.fetchall()]
+
+    cursor.execute("""
+        INSERT INTO Warden (Name, Mail, Phone, Password, HID)
+        SELECT 'Scale Warden ' || i, 'scale.warden' || i || '@example.com',
+               '98' || lpad(i::text, 8, '0'), %s, hid
+        FROM   unnest(%s::int[]) WITH ORDINALITY AS h(hid, i)
+    """, (password_hash or "", hostel_ids))
+
+    cursor.execute("SELECT COALESCE(MAX(SID), 0) FROM Student")
+    first_sid = cursor.fetchone()[0] + 1  # new SIDs (and SCALE numbers) start above this
+    cursor.execute("""
+        INSERT INTO Student (Name, Phone, Mail, DOB, HID, SHID)
+        SELECT 'Scale Student ' || g,
+               '97' || lpad(g::text, 8, '0'),
+               'scale' || g || '@example.com',
+               DATE '2000-01-01' + (g %% 1800),
+               (%s::int[])[1 + g %% array_length(%s::int[], 1)],
+               'SCALE' || g
+        FROM   generate_series(%s, %s) g
+    """, (hostel_ids, hostel_ids, first_sid, first_sid + students - 1))
+
+    cursor.execute("""
+        INSERT INTO UserAuth (SHID, PSWD)
+        SELECT SHID, %s FROM Student WHERE SHID LIKE 'SCALE%%' AND SID >= %s
+    """, (password_hash or "", first_sid))
+
+    cursor.execute("""
+        INSERT INTO Complaint (SID, Type, Created_at, Status, Description, IsWithdrawn, WithdrawCount)
+        SELECT sid,
+               (ARRAY['Water Leakage', 'Electricity Issue', 'WiFi Problem',
+                      'Cleanliness', 'Furniture Broken'])[1 + g %% 5],
+               NOW() - (g %% 365) * INTERVAL '1 day' - (g %% 1440) * INTERVAL '1 minute',
+               status,
+               -- varied wording so full‑text search has realistic selectivity
+               (ARRAY['Tap in the bathroom keeps leaking', 'Ceiling fan stopped working',
+                      'WiFi router disconnects every evening', 'Corridor not cleaned for days',
+                      'Study table leg is broken', 'Power socket sparks when used',
+                      'Water cooler on the floor is empty', 'Window latch is broken',
+                      'Geyser takes an hour to heat water', 'Mess food was stale'])[1 + (g * 31) %% 10]
+               || ' (room ' || (100 + g %% 300) || ', #' || g || ')',
+               status = 'Withdrawn',
+               (status = 'Withdrawn')::int
+        FROM (
+            SELECT g,
+                   ids[1 + (g * 7919) %% array_length(ids, 1)] AS sid,
+                   -- open complaints are young: pending only within the last 10 days
+                   CASE WHEN g %% 365 < 10 AND g %% 100 < 15 THEN 'Pending'
+                        WHEN g %% 100 < 5 THEN 'Withdrawn'
+                        ELSE 'Resolved' END AS status
+            FROM generate_series(1, %s) g,
+                 (SELECT array_agg(SID) AS ids FROM Student WHERE SID >= %s) s
+        ) x
+    """, (complaints, first_sid))
+
+    for table in ("Hostel", "Warden", "Student", "UserAuth", "Complaint",
+                  "StudentComplaintStats", "ComplaintDaily"):
+        cursor.execute(f"ANALYZE {table}")
+    return {"hostels": hostels, "students": students, "complaints": complaints}
+
+
 def main():
-    conn = get_db_connection()
-    conn.autocommit = True
+    from hashing import migrate_plaintext
+    from migrations import migrate
+
+    args = sys.argv[1:]
+    conn = connect()
+
+    if args == ["upgrade"]:
+        migrate(conn)
+        conn.close()
+        print("✔ Schema upgraded in place")
+        return
+
+    if args == ["--reset"]:
+        with conn.cursor() as cursor:
+            cursor.execute(RESET_SQL)
+        conn.commit()
+        print("⚠ Dropped all tables")
+    elif args:
+        conn.close()
+        sys.exit("usage: python db.py [upgrade | --reset]")
+
+    migrate(conn)
+
     cursor = conn.cursor()
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM Hostel)")
+    if cursor.fetchone()[0]:
+        cursor.close()
+        conn.close()
+        print("✔ Database already has data — skipped demo seed (use --reset to start over)")
+        return
 
-    for statement in TABLE_SQL:
-        cursor.execute(statement)
     create_admin_table_and_seed(cursor)
     seed_boys_hostel_demo_data(cursor)
 
     conn.commit()
     cursor.close()
+    migrate_plaintext(conn)  # the demo passwords above are stored hashed
     conn.close()
     print("✔ All data inserted: Hostels, Wardens, Rooms, Students, Auth, Complaints")
 
@@ -0,0 +1,68 @@
+# db_async.py — asyncio data layer (psycopg 3 + psycopg_pool)
+#
+# `async def` routes must never touch psycopg2: a blocking query inside a
+# coroutine freezes the event loop for every request the worker is serving.
+# They take a connection from `get_async_connection` instead and `await` it.
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout as AsyncPoolTimeout
+
+from db import (
+    DB_CONFIG,
+    POOL_ACQUIRE_TIMEOUT,
+    POOL_MAX_SIZE,
+    POOL_MIN_SIZE,
+)
+
+CONNINFO = make_conninfo(
+    dbname=DB_CONFIG["database"],
+    user=DB_CONFIG["user"],
+    password=DB_CONFIG["password"],
+    host=DB_CONFIG["host"],
+    port=DB_CONFIG["port"],
+)
+
+# opened / closed by the app's startup & shutdown hooks
+async_pool = AsyncConnectionPool(
+    CONNINFO,
+    min_size=POOL_MIN_SIZE,
+    max_size=POOL_MAX_SIZE,
+    timeout=POOL_ACQUIRE_TIMEOUT,
+    kwargs={"row_factory": dict_row},
+    check=AsyncConnectionPool.check_connection,
+    open=False,
+)
+
+
+async def open_async_pool():
+    await async_pool.open()
+
+
+async def close_async_pool():
+    await async_pool.close()
+
+
+async def get_async_connection():
+    """
+    FastAPI dependency for `async def` routes.  Rows come back as dicts.
+    The connection is committed when the request succeeds, rolled back on
+    error and always returned to the pool.
+    """
+    async with async_pool.connection() as conn:
+        yield conn
+
+
+def async_pool_stats():
+    stats = async_pool.get_stats()
+    return {
+        "min_size": async_pool.min_size,
+        "max_size": async_pool.max_size,
+        "size": stats.get("pool_size", 0),
+        "idle": stats.get("pool_available", 0),
+        "in_use": stats.get("pool_size", 0) - stats.get("pool_available", 0),
+        "waiting": stats.get("requests_waiting", 0),
+        "acquired": stats.get("requests_num", 0),
+        "timeouts": stats.get("requests_errors", 0),
+        "wait_total_ms": stats.get("requests_wait_ms", 0),
+    }
+
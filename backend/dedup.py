@@ -0,0 +1,214 @@
+# dedup.py — near‑duplicate complaint clusters (MinHash + LSH)
+#
+# When a hostel's water pump fails, dozens of students file the same
+# "Water Leakage" complaint.  Each new complaint is put in the cluster of an
+# open look‑alike, so a warden can see — and resolve — the group at once.
+#
+#   * a complaint's description becomes a set of words; its MinHash
+#     signature (DEDUP_BANDS × DEDUP_ROWS small hashes, Complaint.MinHash)
+#     estimates the Jaccard similarity of two such sets by the fraction of
+#     equal positions,
+#   * the signature is cut into DEDUP_BANDS bands; each band, salted with the
+#     hostel and type, hashes to one bucket (ComplaintBucket).  Two similar
+#     complaints share at least one bucket with high probability, two
+#     different ones almost never, so candidates come from an index lookup of
+#     DEDUP_BANDS keys — no pairwise comparison with the hostel's history,
+#   * candidates are open complaints of the same hostel and type from the
+#     last DEDUP_WINDOW_DAYS days; the most similar one at or above
+#     DEDUP_THRESHOLD gives its cluster (Complaint.ClusterID, the CID of the
+#     cluster's first complaint).  This runs in the inserting transaction,
+#     serialised per hostel × type, via complaint_cluster_assign() (migration
+#     009), so both the sync and async write paths need one round trip.
+#
+#   python dedup.py backfill [--days N] [--rebuild]   # index existing complaints
+#
+# Changing DEDUP_BANDS / DEDUP_ROWS changes every bucket: run with --rebuild.
+import argparse
+import hashlib
+import os
+import random
+import re
+import sys
+import zlib
+
+from psycopg2.extras import RealDictCursor, execute_values
+
+from bus import CHANNEL, bulk_message
+
+DEDUP_BANDS = int(os.environ.get("DEDUP_BANDS", "16"))
+DEDUP_ROWS = int(os.environ.get("DEDUP_ROWS", "4"))
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", "0.6"))
+DEDUP_WINDOW_DAYS = int(os.environ.get("DEDUP_WINDOW_DAYS", "7"))
+
+# words that say nothing about *what* is broken
+STOP_WORDS = frozenset("""
+    a an and are as at be been but by for from has have in is it its my of on or our please
+    since so that the there this to very was we were with not no any all also after again
+""".split())
+
+_PRIME = (1 << 61) - 1
+_rnd = random.Random(20240917)  # fixed: signatures must agree across processes and restarts
+_PERMUTATIONS = [(_rnd.randrange(1, _PRIME), _rnd.randrange(0, _PRIME))
+                 for _ in range(DEDUP_BANDS * DEDUP_ROWS)]
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokens(text):
+    return {w for w in _WORD.findall((text or "").lower()) if len(w) > 1 and w not in STOP_WORDS}
+
+
+def signature(text):
+    """MinHash of the description's words (positive int4s), or None when it has none."""
+    hashes = [zlib.crc32(word.encode()) for word in tokens(text)]
+    if not hashes:
+        return None
+    return [min((a * h + b) % _PRIME for h in hashes) & 0x7FFFFFFF for a, b in _PERMUTATIONS]
+
+
+def _key64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def scope_key(hid, type_):
+    """Advisory‑lock key of one hostel × type."""
+    return _key64(f"{hid}|{type_}")
+
+
+def buckets(hid, type_, sig):
+    """One bucket key per band, salted with the hostel and type."""
+    return [
+        _key64(f"{hid}|{type_}|{band}|{sig[band * DEDUP_ROWS:(band + 1) * DEDUP_ROWS]}")
+        for band in range(DEDUP_BANDS)
+    ]
+
+
+_ASSIGN = "SELECT complaint_cluster_assign(%s::int, %s::bigint, %s::bigint[], %s::real, %s::int) AS cluster"
+
+
+def _assign_params(cid, hid, type_, sig):
+    return (cid, scope_key(hid, type_), buckets(hid, type_, sig), DEDUP_THRESHOLD, DEDUP_WINDOW_DAYS)
+
+
+def assign_cluster(cur, cid, hid, type_, sig):
+    """
+    Index a just‑inserted complaint (its MinHash already stored) and put it
+    in a cluster; returns the ClusterID or None.  Call inside the insert's
+    transaction, on a psycopg2 cursor.
+    """
+    if sig is None or hid is None:
+        return None
+    cur.execute(_ASSIGN, _assign_params(cid, hid, type_, sig))
+    return cur.fetchone()[0]
+
+
+async def aassign_cluster(conn, cid, hid, type_, sig):
+    """Same as assign_cluster, on an async (dict‑row) connection."""
+    if sig is None or hid is None:
+        return None
+    cur = await conn.execute(_ASSIGN, _assign_params(cid, hid, type_, sig))
+    return (await cur.fetchone())["cluster"]
+
+
+# ───────────────────── QUERIES ─────────────────────
+CLOSED_STATUSES = ("Resolved", "Rejected", "Withdrawn")
+
+
+def list_clusters(conn, clauses, params, limit, open_only=True):
+    """
+    Clusters with two or more complaints matching `clauses` (aliases c / s),
+    largest and most recent first; `open_only` skips closed complaints.
+    """
+    if open_only:
+        clauses = clauses + ["NOT COALESCE(c.IsWithdrawn, FALSE)", "c.Status NOT IN %s"]
+        params = params + [CLOSED_STATUSES]
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(
+            f"""
+            SELECT c.ClusterID                                  AS cluster_id,
+                   MIN(s.HID)                                   AS hid,
+                   MIN(h.Name)                                  AS hostel_name,
+                   MIN(c.Type)                                  AS type,
+                   COUNT(*)                                     AS size,
+                   COUNT(*) FILTER (WHERE c.Status = 'Pending') AS pending,
+                   MIN(c.Created_at)                            AS first_at,
+                   MAX(c.Created_at)                            AS last_at,
+                   (ARRAY_AGG(c.Description ORDER BY c.CID))[1] AS description,
+                   ARRAY_AGG(c.CID ORDER BY c.CID)              AS cids
+            FROM   Complaint c
+            JOIN   Student   s ON s.SID = c.SID
+            JOIN   Hostel    h ON h.HID = s.HID
+            WHERE  c.ClusterID IS NOT NULL {"".join(f" AND {clause}" for clause in clauses)}
+            GROUP  BY c.ClusterID
+            HAVING COUNT(*) > 1
+            ORDER  BY size DESC, last_at DESC
+            LIMIT  %s
+            """,
+            params + [limit],
+        )
+        return cur.fetchall()
+
+
+# ───────────────────── BACKFILL ─────────────────────
+def backfill(conn, days=DEDUP_WINDOW_DAYS, rebuild=False, batch=500, log=print):
+    """
+    Sign and cluster the complaints of the last `days` days that have no
+    MinHash yet (every one with `rebuild`), oldest first so clusters are
+    named after their first complaint.  One transaction; one notification.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL app.bulk_changes = 'on'")
+        window = "c.Created_at >= NOW() - %s * INTERVAL '1 day'"
+        if rebuild:
+            cur.execute(f"""
+                DELETE FROM ComplaintBucket b USING Complaint c
+                WHERE  c.CID = b.CID AND {window}
+            """, (days,))
+            cur.execute(f"UPDATE Complaint c SET MinHash = NULL, ClusterID = NULL WHERE {window}", (days,))
+
+        cur.execute(f"""
+            SELECT c.CID, s.HID, c.Type, c.Description
+            FROM   Complaint c JOIN Student s ON s.SID = c.SID
+            WHERE  c.MinHash IS NULL AND {window}
+            ORDER  BY c.Created_at, c.CID
+        """, (days,))
+        pending = cur.fetchall()
+
+        indexed = clustered = 0
+        for start in range(0, len(pending), batch):
+            rows = [(cid, hid, type_, signature(text)) for cid, hid, type_, text in pending[start:start + batch]]
+            rows = [row for row in rows if row[3] is not None and row[1] is not None]
+            execute_values(cur, """
+                UPDATE Complaint c SET MinHash = v.sig
+                FROM (VALUES %s) AS v (cid, sig) WHERE c.CID = v.cid
+            """, [(cid, sig) for cid, _, _, sig in rows], template="(%s, %s::int[])")
+            for cid, hid, type_, sig in rows:
+                clustered += assign_cluster(cur, cid, hid, type_, sig) is not None
+            indexed += len(rows)
+            log(f"… {indexed}/{len(pending)} indexed")
+
+        cur.execute("SELECT pg_notify(%s, %s)", (CHANNEL, bulk_message("complaint", count=indexed)))
+    conn.commit()
+    return indexed, clustered
+
+
+def main(argv):
+    from db import connect
+
+    parser = argparse.ArgumentParser(prog="python dedup.py")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fill = sub.add_parser("backfill", help="index complaints that have no MinHash yet")
+    fill.add_argument("--days", type=int, default=DEDUP_WINDOW_DAYS)
+    fill.add_argument("--rebuild", action="store_true", help="re-index every complaint in the window")
+    args = parser.parse_args(argv[1:])
+
+    conn = connect()
+    try:
+        indexed, clustered = backfill(conn, days=args.days, rebuild=args.rebuild)
+        print(f"✔ indexed {indexed} complaints, {clustered} joined a cluster")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
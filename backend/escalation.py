@@ -0,0 +1,258 @@
+# escalation.py — overdue complaints, found incrementally, mailed as digests
+#
+# A complaint is overdue once it has been Pending longer than its SLA: the
+# SlaThreshold row that matches it most specifically (hostel + type, then
+# hostel, then type, then the catch‑all default).  Instead of dashboards
+# polling /admin/complaints/overdue, each worker's `escalator` thread runs
+# a pass every ESCALATION_INTERVAL_SECONDS that
+#   * takes a transaction advisory lock — with several workers one of them
+#     runs the pass, the others skip it,
+#   * only looks at complaints that crossed their deadline since the last
+#     pass (the watermark in SchedulerState): for each distinct threshold h,
+#     a range scan of idx_complaint_pending over
+#     Created_at ∈ (watermark − h, now − h], kept where h is the
+#     complaint's own threshold,
+#   * records them in ComplaintEscalation (never escalated twice) and queues
+#     ONE digest per warden of each affected hostel through the outbox,
+#     in the same transaction that moves the watermark: a pass that fails
+#     leaves nothing half done and is simply repeated.
+#
+# Changing a threshold clears the watermark, so the next pass re‑checks
+# every pending complaint once (escalated ones are skipped).
+#
+#   python escalation.py run    # one pass, e.g. from cron
+#
+# ESCALATION_INTERVAL_SECONDS=0 keeps the thread off (cron runs the passes).
+# Hostels without a warden to mail go to ESCALATION_ADMIN_MAIL, if set.
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from psycopg2.extras import RealDictCursor, execute_values
+
+from bus import CHANNEL
+from db import pool
+from outbox import enqueue
+
+ESCALATION_INTERVAL_SECONDS = float(os.environ.get("ESCALATION_INTERVAL_SECONDS", "300"))
+ESCALATION_DIGEST_LINES = int(os.environ.get("ESCALATION_DIGEST_LINES", "50"))
+ESCALATION_ADMIN_MAIL = os.environ.get("ESCALATION_ADMIN_MAIL", "")
+ESCALATION_LOCK_ID = 7_340_902
+
+JOB = "escalation"
+_CHANGED = '{"table":"escalation","op":"insert"}'  # bus message: drop cached overdue lists
+
+# candidates first: per distinct threshold one range scan of the pending
+# complaints (OFFSET 0 keeps the planner from flattening that into a scan
+# of all of them), then each complaint's own threshold decides
+_NEWLY_OVERDUE = """
+    WITH crossed AS MATERIALIZED (
+        SELECT c.CID, c.SID, c.Type, c.Created_at, t.Hours
+        FROM   (SELECT DISTINCT Hours FROM SlaThreshold) t
+        CROSS JOIN LATERAL (
+            SELECT CID, SID, Type, Created_at FROM Complaint
+            WHERE  Status = 'Pending'
+            AND    Created_at >  COALESCE(%(since)s::timestamp, '-infinity') - t.Hours * INTERVAL '1 hour'
+            AND    Created_at <= %(until)s::timestamp - t.Hours * INTERVAL '1 hour'
+            OFFSET 0
+        ) c
+    )
+    SELECT c.CID, c.Type, c.Created_at, s.SHID, s.Name AS student_name,
+           s.HID, h.Name AS hostel_name, c.Hours,
+           c.Created_at + c.Hours * INTERVAL '1 hour' AS due_at
+    FROM   crossed c
+    JOIN   Student s ON s.SID = c.SID
+    LEFT JOIN Hostel h ON h.HID = s.HID
+    WHERE  c.Hours = (
+               SELECT x.Hours FROM SlaThreshold x
+               WHERE  (x.HID = s.HID OR x.HID IS NULL) AND (x.Type = c.Type OR x.Type IS NULL)
+               ORDER  BY x.HID IS NULL, x.Type IS NULL
+               LIMIT  1)
+    AND    NOT EXISTS (SELECT 1 FROM ComplaintEscalation e WHERE e.CID = c.CID)
+    ORDER  BY s.HID, due_at, c.CID
+"""
+
+
+def reset_watermark(cur):
+    """Make the next pass re‑check every pending complaint (thresholds changed)."""
+    cur.execute("UPDATE SchedulerState SET Watermark = NULL, Updated_at = NOW() WHERE Name = %s", (JOB,))
+
+
+def _digest(name, hostel, rows, now):
+    listed = rows[:ESCALATION_DIGEST_LINES]
+    lines = [
+        f"{len(rows)} complaint(s) in {hostel} passed their response deadline while still pending:",
+        "",
+    ]
+    for r in listed:
+        waited = (now - r["created_at"]).total_seconds() / 86400
+        lines.append(
+            f"  #{r['cid']}  {r['type']} — {r['student_name']} ({r['shid']}), "
+            f"filed {r['created_at']:%d %b %H:%M}, waiting {waited:.1f} days (deadline {r['hours']} h)"
+        )
+    if len(rows) > len(listed):
+        lines.append(f"  … and {len(rows) - len(listed)} more, see Overdue complaints in the dashboard.")
+    return f"""
+Dear {name},
+
+{chr(10).join(lines)}
+
+Please pick them up or update their status.
+
+Regards,
+Hostel Management System Team
+"""
+
+
+class Escalator:
+    """The scheduler thread and its counters for /admin/stats/escalation."""
+
+    def __init__(self):
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {"runs": 0, "skipped": 0, "errors": 0, "escalated": 0, "digests": 0,
+                       "last_run_at": None, "last_run_ms": None, "last_escalated": 0}
+
+    # ── lifecycle ─────────────────────────────────────────
+    def start(self):
+        if self._thread is None and ESCALATION_INTERVAL_SECONDS > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="escalation", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(ESCALATION_INTERVAL_SECONDS):
+            try:
+                self.run_once()
+            except Exception as e:  # database away: try again next time
+                self._count("errors")
+                print("❌ Escalation pass failed:", e)
+
+    # ── one pass ──────────────────────────────────────────
+    def run_once(self):
+        """
+        Escalate what went overdue since the last pass; returns the number of
+        complaints escalated, or None when another worker holds the pass.
+        """
+        started = time.perf_counter()
+        with pool.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("SELECT pg_try_advisory_xact_lock(%s) AS locked, NOW()::timestamp AS now",
+                            (ESCALATION_LOCK_ID,))
+                row = cur.fetchone()
+                if not row["locked"]:
+                    conn.rollback()
+                    self._count("skipped")
+                    return None
+                now = row["now"]
+                cur.execute("SELECT Watermark FROM SchedulerState WHERE Name = %s", (JOB,))
+                state = cur.fetchone()
+                cur.execute(_NEWLY_OVERDUE, {"since": state["watermark"] if state else None, "until": now})
+                overdue = cur.fetchall()
+
+                digests = 0
+                if overdue:
+                    by_hostel = defaultdict(list)
+                    for r in overdue:
+                        by_hostel[r["hid"]].append(r)
+                    cur.execute(
+                        "SELECT HID, Name, Mail FROM Warden "
+                        "WHERE HID = ANY(%s) AND COALESCE(Mail, '') <> '' ORDER BY HID, WID",
+                        ([hid for hid in by_hostel if hid is not None],),
+                    )
+                    wardens = defaultdict(list)
+                    for w in cur.fetchall():
+                        wardens[w["hid"]].append((w["name"] or "Warden", w["mail"]))
+
+                    sent_to = {}
+                    for hid, rows in by_hostel.items():
+                        hostel = rows[0]["hostel_name"] or "an unassigned hostel"
+                        recipients = wardens.get(hid) or (
+                            [("Administrator", ESCALATION_ADMIN_MAIL)] if ESCALATION_ADMIN_MAIL else []
+                        )
+                        for name, mail in recipients:
+                            enqueue(conn, mail, f"⏰ {len(rows)} overdue complaint(s) – {hostel}",
+                                    _digest(name, hostel, rows, now))
+                        sent_to[hid] = len(recipients)
+                        digests += len(recipients)
+
+                    execute_values(cur, """
+                        INSERT INTO ComplaintEscalation (CID, HID, Hours, Due_at, Escalated_at, Digests)
+                        VALUES %s ON CONFLICT (CID) DO NOTHING
+                    """, [(r["cid"], r["hid"], r["hours"], r["due_at"], now, sent_to[r["hid"]]) for r in overdue])
+                    cur.execute("SELECT pg_notify(%s, %s)", (CHANNEL, _CHANGED))
+
+                cur.execute("""
+                    INSERT INTO SchedulerState (Name, Watermark, Updated_at) VALUES (%s, %s, NOW())
+                    ON CONFLICT (Name) DO UPDATE SET Watermark = EXCLUDED.Watermark, Updated_at = NOW()
+                """, (JOB, now))
+            conn.commit()
+
+        with self._lock:
+            self._stats["runs"] += 1
+            self._stats["escalated"] += len(overdue)
+            self._stats["digests"] += digests
+            self._stats["last_escalated"] = len(overdue)
+            self._stats["last_run_at"] = now
+            self._stats["last_run_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return len(overdue)
+
+    # ── stats ─────────────────────────────────────────────
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self, conn):
+        """Watermark and open escalations (all workers, from the tables) plus this worker's counters."""
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT (SELECT Watermark FROM SchedulerState WHERE Name = %s) AS watermark,
+                       EXTRACT(EPOCH FROM NOW() - (SELECT Watermark FROM SchedulerState WHERE Name = %s))
+                           AS lag_seconds,
+                       COUNT(*) FILTER (WHERE c.Status = 'Pending')                  AS open,
+                       COUNT(*) FILTER (WHERE c.Status = 'Pending' AND e.Digests = 0) AS open_unmailed,
+                       COUNT(*)                                                      AS total
+                FROM   ComplaintEscalation e JOIN Complaint c ON c.CID = e.CID
+            """, (JOB, JOB))
+            table = cur.fetchone()
+        conn.commit()
+
+        with self._lock:
+            worker = dict(self._stats)
+        lag = table.pop("lag_seconds")
+        return {
+            "escalations": {**table, "lag_seconds": round(float(lag), 1) if lag is not None else None},
+            "worker": {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "interval_seconds": ESCALATION_INTERVAL_SECONDS,
+                **worker,
+            },
+        }
+
+
+escalator = Escalator()
+
+
+def main(argv):
+    if argv[1:] != ["run"]:
+        print("usage: python escalation.py run")
+        return 2
+    escalated = escalator.run_once()
+    if escalated is None:
+        print("… another worker is running the escalation pass")
+    else:
+        print(f"✔ escalated {escalated} complaints")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
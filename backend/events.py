@@ -0,0 +1,234 @@
+# events.py — server‑sent complaint events (instead of refetch‑after‑write)
+#
+# Every committed complaint change — from any worker, or psql — arrives via
+# the change bus (bus.py) and is published as a compact event:
+#
+#   {"type": "complaint.created" | "complaint.withdrawn" | "complaint.status"
+#            | "complaint.deleted",
+#    "cid": 42, "shid": "GOD1ID001", "hid": 1, "status": "Pending", ...}
+#
+# to up to three scopes — `student:<shid>`, `hostel:<hid>` and `admin`.
+# Clients hold an EventSource open on the matching /events/… route:
+#
+#   * an idle subscriber is one coroutine waiting on a small queue, so a
+#     worker carries thousands of them; a comment line every
+#     EVENT_HEARTBEAT_SECONDS keeps proxies from timing the stream out,
+#   * every event has an id `<boot>-<n>`; the last EVENT_BUFFER_SIZE events
+#     stay in a ring buffer, so a reconnecting EventSource (which sends
+#     Last-Event-ID by itself) receives what it missed.  If that id is from
+#     another process or already gone from the buffer the client gets a
+#     `reset` event and should refetch once,
+#   * a subscriber that stops reading is dropped when its queue fills, rather
+#     than letting memory grow.
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from principal import Principal, current_student
+
+EVENT_BUFFER_SIZE = int(os.environ.get("EVENT_BUFFER_SIZE", "1000"))
+EVENT_QUEUE_SIZE = int(os.environ.get("EVENT_QUEUE_SIZE", "100"))
+EVENT_HEARTBEAT_SECONDS = float(os.environ.get("EVENT_HEARTBEAT_SECONDS", "20"))
+
+_RESET = object()  # queued to a subscriber that fell too far behind
+
+
+class EventBroker:
+    def __init__(self, buffer_size, queue_size):
+        self.boot = uuid.uuid4().hex[:8]
+        self.queue_size = queue_size
+        self._ids = itertools.count(1)
+        self._buffer = deque(maxlen=buffer_size)  # (seq, scopes, frame)
+        self._subscribers = {}                     # scope → set of queues
+        self._loop = None
+        self._loop_thread = None
+        self._stats = {"published": 0, "delivered": 0, "dropped_subscribers": 0}
+
+    def start(self, loop):
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+
+    # ── publishing ────────────────────────────────────────
+    def publish(self, event_type, data, scopes):
+        """Safe to call from any thread; a no‑op before startup."""
+        if self._loop is None:
+            return
+        if threading.get_ident() == self._loop_thread:
+            self._publish(event_type, data, scopes)
+        else:
+            self._loop.call_soon_threadsafe(self._publish, event_type, data, scopes)
+
+    def _publish(self, event_type, data, scopes):
+        seq = next(self._ids)
+        payload = {"type": event_type, **data, "at": time.time()}
+        frame = (
+            f"id: {self.boot}-{seq}\n"
+            f"event: {event_type}\n"
+            f"data: {json.dumps(payload, default=str, separators=(',', ':'))}\n\n"
+        )
+        scopes = tuple(scopes)
+        self._buffer.append((seq, scopes, frame))
+        self._stats["published"] += 1
+
+        targets = set()
+        for scope in scopes:
+            targets.update(self._subscribers.get(scope, ()))
+        for queue in targets:
+            try:
+                queue.put_nowait(frame)
+                self._stats["delivered"] += 1
+            except asyncio.QueueFull:
+                self._evict(queue)
+
+    def _evict(self, queue):
+        for subscribers in self._subscribers.values():
+            subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(_RESET)
+        self._stats["dropped_subscribers"] += 1
+
+    def reset(self, scope_prefix=""):
+        """Tell every subscriber of matching scopes to refetch (events may have been lost)."""
+        queues = set()
+        for scope, subscribers in self._subscribers.items():
+            if scope.startswith(scope_prefix):
+                queues.update(subscribers)
+        for queue in queues:
+            self._evict(queue)
+
+    # ── subscribing (event loop only) ─────────────────────
+    def subscribe(self, scope):
+        queue = asyncio.Queue(self.queue_size)
+        self._subscribers.setdefault(scope, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, scope, queue):
+        subscribers = self._subscribers.get(scope)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[scope]
+
+    def missed(self, scope, last_event_id):
+        """
+        Frames for `scope` newer than `last_event_id`, or None when the gap
+        can't be filled (other process, or older than the buffer).
+        """
+        boot, _, seq = (last_event_id or "").partition("-")
+        if boot != self.boot or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if self._buffer and self._buffer[0][0] > seq + 1:
+            return None
+        return [frame for s, scopes, frame in self._buffer if s > seq and scope in scopes]
+
+    def stats(self):
+        return {
+            "boot": self.boot,
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "scopes": len(self._subscribers),
+            "buffered": len(self._buffer),
+            **self._stats,
+        }
+
+
+broker = EventBroker(EVENT_BUFFER_SIZE, EVENT_QUEUE_SIZE)
+
+
+def publish_complaint_event(event_type, cid, shid, hid, **fields):
+    """Tell the student, their hostel's wardens and the admins about a change."""
+    scopes = ["admin"]
+    if shid:
+        scopes.append(f"student:{shid}")
+    if hid is not None:
+        scopes.append(f"hostel:{hid}")
+    broker.publish(event_type, {"cid": cid, "shid": shid, "hid": hid, **fields}, scopes)
+
+
+# ───────────────────── ROUTES ─────────────────────
+router = APIRouter(tags=["Events"])
+
+
+def _reset_frame():
+    return f"event: reset\ndata: {{\"boot\":\"{broker.boot}\"}}\n\n"
+
+
+def _stream(request, scope):
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    async def frames():
+        # subscribed here, not when the response is built: a client gone before
+        # the body is sent never starts this generator, so `finally` wouldn't run
+        queue = broker.subscribe(scope)  # before replaying, so nothing falls in between
+        try:
+            yield f"retry: 3000\n: connected to {scope}\n\n"
+            if last_event_id:
+                missed = broker.missed(scope, last_event_id)
+                if missed is None:
+                    yield _reset_frame()
+                else:
+                    for frame in missed:
+                        yield frame
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if frame is _RESET:
+                    yield _reset_frame()
+                    return
+                yield frame
+        finally:
+            broker.unsubscribe(scope, queue)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/events/student/{shid}")
+async def student_events(shid: str, request: Request):
+    """
+    Status changes of one student's complaints — only for that student's
+    own session (a SHID is no secret).  Prefer /me/events.
+    """
+    user = request.session.get("user")
+    if not user:
+        raise HTTPException(status_code=401, detail="Not logged in")
+    if user != shid:
+        raise HTTPException(status_code=403, detail="Not your events")
+    return _stream(request, f"student:{shid}")
+
+
+@router.get("/me/events")
+async def my_events(request: Request, student: Principal = Depends(current_student)):
+    """The logged‑in student's complaint events (session instead of a SHID in the URL)."""
+    return _stream(request, f"student:{student.shid}")
+
+
+@router.get("/events/warden")
+async def warden_events(request: Request):
+    """Every complaint event in the logged‑in warden's hostel."""
+    warden = request.session.get("warden")
+    if not warden:
+        raise HTTPException(status_code=401, detail="Not logged in")
+    return _stream(request, f"hostel:{warden['hid']}")
+
+
+@router.get("/events/admin")
+async def admin_events(request: Request):
+    """Every complaint event on campus."""
+    if not request.session.get("admin"):
+        raise HTTPException(status_code=401, detail="Not logged in")
+    return _stream(request, "admin")
@@ -0,0 +1,228 @@
+# export.py — constant‑memory exports of complaints and students for audits
+#
+#   GET /admin/export/complaints?format=csv|ndjson|parquet&status=…&hid=…
+#   GET /admin/export/students?format=…&hid=…
+#
+# The list endpoints build a whole JSON document with fetchall(); pulling the
+# full history through them bloats a worker to gigabytes.  Exports instead
+#   * read through a server‑side (named) cursor, EXPORT_BATCH_ROWS rows per
+#     round trip, from one consistent snapshot,
+#   * encode each batch and hand it to the client before fetching the next,
+# so a worker holds one batch at a time whatever the table size.  The
+# connection is borrowed inside the response body generator and returned
+# when the stream ends or the client goes away.
+#
+# Parquet needs pyarrow (optional); each batch becomes one row group.
+import csv
+import io
+import json
+import os
+from datetime import date
+from typing import Literal, Optional
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from blobstore import proof_url
+from db import pool
+from pagination import ComplaintFilters, where_sql
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # parquet export is optional
+    pa = pq = None
+
+EXPORT_BATCH_ROWS = int(os.environ.get("EXPORT_BATCH_ROWS", "5000"))
+
+Format = Literal["csv", "ndjson", "parquet"]
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+router = APIRouter(tags=["Admin"])
+
+
+class Export:
+    """A query plus the name and Arrow type of each output column."""
+
+    def __init__(self, name, sql, columns, row=None):
+        self.name = name
+        self.sql = sql
+        self.columns = columns      # [(name, arrow type name)]
+        self.row = row or tuple     # raw row → output row
+
+    def arrow_schema(self):
+        types = {"int": pa.int64(), "text": pa.string(), "bool": pa.bool_(),
+                 "date": pa.date32(), "timestamp": pa.timestamp("us")}
+        return pa.schema([(name, types[kind]) for name, kind in self.columns])
+
+
+def _complaint_row(r):
+    # last two columns are ProofBlob / ProofStatus → one proof URL
+    *values, blob, proof_status = r
+    return (*values, None if proof_status == "invalid" else proof_url(blob))
+
+
+COMPLAINTS = Export(
+    "complaints",
+    """
+    SELECT c.CID, c.Created_at, c.Status, c.Type, c.Description,
+           COALESCE(c.WithdrawCount, 0), COALESCE(c.IsWithdrawn, FALSE),
+           s.SHID, s.Name, h.HID, h.Name, c.ProofBlob, c.ProofStatus
+    FROM   Complaint c
+    JOIN   Student   s ON s.SID = c.SID
+    JOIN   Hostel    h ON h.HID = s.HID
+    {where}
+    ORDER  BY c.Created_at, c.CID
+    """,
+    [("cid", "int"), ("created_at", "timestamp"), ("status", "text"), ("type", "text"),
+     ("description", "text"), ("withdraw_count", "int"), ("is_withdrawn", "bool"),
+     ("shid", "text"), ("student_name", "text"), ("hid", "int"), ("hostel_name", "text"),
+     ("proof_url", "text")],
+    _complaint_row,
+)
+
+STUDENTS = Export(
+    "students",
+    """
+    SELECT s.SID, s.SHID, s.Name, s.Phone, s.Mail, s.DOB, s.HID, h.Name
+    FROM   Student s
+    LEFT JOIN Hostel h ON h.HID = s.HID
+    {where}
+    ORDER  BY s.SID
+    """,
+    [("sid", "int"), ("shid", "text"), ("name", "text"), ("phone", "text"), ("mail", "text"),
+     ("dob", "date"), ("hid", "int"), ("hostel_name", "text")],
+)
+
+
+# ───────────────────── READING ─────────────────────
+def _batches(export, clauses, params):
+    """Rows in EXPORT_BATCH_ROWS‑sized lists from a named cursor; owns its connection."""
+    with pool.connection() as conn:
+        # a named cursor lives server side: each fetchmany is one FETCH of a batch
+        with conn.cursor(name=f"export_{export.name}") as cur:
+            cur.execute(export.sql.format(where=where_sql(clauses)), params)
+            while True:
+                rows = cur.fetchmany(EXPORT_BATCH_ROWS)
+                if not rows:
+                    break
+                yield [export.row(r) for r in rows]
+    # the pool rolls the read‑only transaction back, also when the client hung up
+
+
+# ───────────────────── ENCODING ─────────────────────
+def _csv(export, batches):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([name for name, _ in export.columns])
+    yield buf.getvalue().encode()
+    for batch in batches:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(batch)
+        yield buf.getvalue().encode()
+
+
+def _ndjson(export, batches):
+    names = [name for name, _ in export.columns]
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(names, row)), default=_json_default, separators=(",", ":")) + "\n"
+            for row in batch
+        ).encode()
+
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, date) else str(value)
+
+
+class _Drain(io.RawIOBase):
+    """Write‑only sink whose contents are taken out after every row group."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _parquet(export, batches):
+    schema = export.arrow_schema()
+    names = [name for name, _ in export.columns]
+    sink = _Drain()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema) as writer:
+        for batch in batches:
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=field.type) for col, field in zip(columns, schema)], names=names))
+            yield sink.take()
+    yield sink.take()  # footer
+
+
+ENCODERS = {"csv": _csv, "ndjson": _ndjson, "parquet": _parquet}
+
+
+async def _off_loop(chunks):
+    """Drive a blocking generator from the threadpool; closing this closes it."""
+    try:
+        while (chunk := await run_in_threadpool(next, chunks, None)) is not None:
+            yield chunk
+    finally:
+        await run_in_threadpool(chunks.close)
+
+
+class _ExportResponse(StreamingResponse):
+    """
+    A StreamingResponse that always closes its body generator.  Starlette
+    just stops iterating when the client hangs up, which would leave the
+    export's connection checked out until the garbage collector finds it.
+    """
+
+    async def stream_response(self, send):
+        try:
+            await super().stream_response(send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+
+def _stream(request, export, fmt, clauses, params):
+    if not request.session.get("admin"):
+        raise HTTPException(status_code=401, detail="Not logged in")
+    if fmt == "parquet" and pa is None:
+        raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed on the server")
+    filename = f"{export.name}-{date.today():%Y%m%d}.{fmt}"
+    return _ExportResponse(
+        _off_loop(ENCODERS[fmt](export, _batches(export, clauses, params))),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# ───────────────────── ROUTES ─────────────────────
+@router.get("/admin/export/complaints")
+def export_complaints(request: Request, format: Format = "csv", filters: ComplaintFilters = Depends()):
+    """Every complaint matching the list filters, oldest first."""
+    clauses, params = filters.where()
+    return _stream(request, COMPLAINTS, format, clauses, params)
+
+
+@router.get("/admin/export/students")
+def export_students(request: Request, format: Format = "csv", hid: Optional[int] = None):
+    """Every student (optionally one hostel), by SID."""
+    clauses, params = (["s.HID = %s"], [hid]) if hid is not None else ([], [])
+    return _stream(request, STUDENTS, format, clauses, params)
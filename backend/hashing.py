@@ -0,0 +1,298 @@
+# hashing.py — password hashing on a dedicated, bounded worker pool
+#
+# bcrypt costs 100+ ms of CPU per call.  Running it inline ties up a request
+# thread (or the event loop) for that long, so a login storm starves every
+# other route.  All hashing goes through `hasher` instead:
+#   * at most HASH_WORKERS hashes run at once (the C bcrypt backend releases
+#     the GIL, so threads give real parallelism),
+#   * at most HASH_QUEUE_DEPTH more may wait; beyond that we fail fast with
+#     HasherBusy (→ 503) instead of piling up requests,
+#   * queue wait and run time are recorded per operation.
+# Bulk work (admin CSV import) runs on a separate pool of BULK_HASH_WORKERS
+# threads, so an import of thousands of passwords never takes login slots.
+#
+# One policy (`pwd_context`) for students, wardens and admins: new hashes
+# are bcrypt with HASH_ROUNDS rounds.  Plaintext rows (seeded or created
+# before this) and bcrypt hashes with fewer rounds still verify, and
+# `verify_and_update` hands back their replacement, which the login routes
+# store — so raising HASH_ROUNDS upgrades accounts as they sign in.
+#
+#   python hashing.py calibrate [--target-ms 250]   # pick HASH_ROUNDS on this hardware
+#   python hashing.py migrate [--tables admin warden student]   # hash plaintext rows now
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+from passlib.hash import bcrypt
+
+HASH_ROUNDS = int(os.environ.get("HASH_ROUNDS", "12"))  # each step doubles the cost
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+HASH_QUEUE_DEPTH = int(os.environ.get("HASH_QUEUE_DEPTH", "32"))
+BULK_HASH_WORKERS = int(os.environ.get("BULK_HASH_WORKERS", str(os.cpu_count() or 2)))
+_SAMPLES = 1000  # latency samples kept per operation
+
+# plaintext is only there to recognise legacy rows; anything it (or an
+# under‑strength bcrypt hash) verifies is rehashed
+pwd_context = CryptContext(
+    schemes=["bcrypt", "plaintext"],
+    deprecated=["plaintext"],
+    bcrypt__default_rounds=HASH_ROUNDS,
+    bcrypt__min_rounds=HASH_ROUNDS,
+)
+
+
+def _verify(password, stored):
+    return bool(stored) and _checked(pwd_context.verify, password, stored)
+
+
+def _verify_and_update(password, stored):
+    """(matches, replacement hash or None); an empty or malformed stored value never matches."""
+    if not stored:
+        return False, None
+    return _checked(pwd_context.verify_and_update, password, stored) or (False, None)
+
+
+def _checked(fn, password, stored):
+    try:
+        return fn(password, stored)
+    except ValueError:  # truncated / corrupt hash
+        return False
+
+
+class HasherBusy(Exception):
+    """The hashing queue is full; the caller should retry later."""
+
+
+class PasswordHasher:
+    def __init__(self, workers, queue_depth, bulk_workers):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.bulk_workers = bulk_workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+        self._bulk_executor = ThreadPoolExecutor(max_workers=bulk_workers, thread_name_prefix="pwhash-bulk")
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rehashed = 0
+        self._ops = {}
+
+    def _op(self, name):
+        # caller holds self._lock
+        return self._ops.setdefault(
+            name,
+            {"count": 0, "rejected": 0, "errors": 0,
+             "wait": deque(maxlen=_SAMPLES), "run": deque(maxlen=_SAMPLES)},
+        )
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def submit(self, op, fn, *args):
+        """Queue `fn(*args)` under the name `op`; returns a concurrent Future."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._op(op)["rejected"] += 1
+            raise HasherBusy(f"password hashing queue full ({self.queue_depth} waiting)")
+
+        with self._lock:
+            self._in_flight += 1
+        future = self._executor.submit(self._timed(op, fn, args))
+        future.add_done_callback(self._release)
+        return future
+
+    def _timed(self, op, fn, args):
+        enqueued = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            ok = False
+            try:
+                result = fn(*args)
+                ok = True
+                return result
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    stats = self._op(op)
+                    stats["count"] += 1
+                    stats["errors"] += not ok
+                    stats["wait"].append(started - enqueued)
+                    stats["run"].append(finished - started)
+
+        return job
+
+    # ── async routes ──────────────────────────────────────
+    async def hash(self, password):
+        return await asyncio.wrap_future(self.submit("hash", pwd_context.hash, password))
+
+    async def verify(self, password, hashed):
+        return await asyncio.wrap_future(self.submit("verify", _verify, password, hashed))
+
+    async def verify_and_update(self, password, hashed):
+        """(matches, new hash to store or None) — see the module comment."""
+        return self._upgraded(await asyncio.wrap_future(
+            self.submit("verify", _verify_and_update, password, hashed)
+        ))
+
+    # ── sync routes (already on a threadpool thread) ──────
+    def hash_sync(self, password):
+        return self.submit("hash", pwd_context.hash, password).result()
+
+    def verify_sync(self, password, hashed):
+        return self.submit("verify", _verify, password, hashed).result()
+
+    def verify_and_update_sync(self, password, hashed):
+        return self._upgraded(self.submit("verify", _verify_and_update, password, hashed).result())
+
+    def _upgraded(self, result):
+        if result[1] is not None:
+            with self._lock:
+                self._rehashed += 1
+        return result
+
+    # ── bulk (admin import, migration) ────────────────────
+    def hash_many(self, passwords):
+        """Start hashing every password on the bulk pool; returns concurrent Futures in order."""
+        return [self._bulk_executor.submit(self._timed("bulk_hash", pwd_context.hash, (p,))) for p in passwords]
+
+    def stats(self):
+        def summary(samples):
+            if not samples:
+                return {"p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+            ordered = sorted(samples)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            return {
+                "p50_ms": round(statistics.median(ordered) * 1000, 2),
+                "p95_ms": round(p95 * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+            }
+
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "bulk_workers": self.bulk_workers,
+                "queue_depth": self.queue_depth,
+                "in_flight": self._in_flight,
+                "rounds": HASH_ROUNDS,
+                "rehashed_on_login": self._rehashed,
+                "operations": {
+                    name: {
+                        "count": op["count"],
+                        "rejected": op["rejected"],
+                        "errors": op["errors"],
+                        "queue_wait": summary(op["wait"]),
+                        "run": summary(op["run"]),
+                    }
+                    for name, op in self._ops.items()
+                },
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._bulk_executor.shutdown(wait=False, cancel_futures=True)
+
+
+hasher = PasswordHasher(HASH_WORKERS, HASH_QUEUE_DEPTH, BULK_HASH_WORKERS)
+
+
+# ───────────────────── CALIBRATION ─────────────────────
+def calibrate(target_ms, rounds=range(10, 17), log=print):
+    """
+    Time one bcrypt hash per cost on this machine and return the highest
+    whose hash fits in `target_ms` (at least the first tried).
+    """
+    log(f"{'rounds':>6} {'hash ms':>9} {'logins/s':>9}  (HASH_WORKERS={HASH_WORKERS})")
+    best = rounds[0]
+    for r in rounds:
+        handler = bcrypt.using(rounds=r)
+        samples = []
+        for _ in range(3):
+            started = time.perf_counter()
+            handler.hash("calibration password")
+            samples.append(time.perf_counter() - started)
+        ms = min(samples) * 1000
+        log(f"{r:>6} {ms:>9.0f} {HASH_WORKERS * 1000 / ms:>9.1f}")
+        if ms > target_ms:
+            break  # every further round doubles it
+        best = r
+    return best
+
+
+# ───────────────────── PLAINTEXT MIGRATION ─────────────────────
+LEGACY_TARGETS = {  # name → (table, key, password column)
+    "admin": ("Admin", "AID", "Password"),
+    "warden": ("Warden", "WID", "Password"),
+    "student": ("UserAuth", "UID", "PSWD"),
+}
+
+
+def migrate_plaintext(conn, tables=tuple(LEGACY_TARGETS), log=print):
+    """
+    Replace every plaintext password in `tables` by its bcrypt hash, hashed
+    in parallel on the bulk pool; one transaction per table.  A row whose
+    password changed meanwhile is left alone.  Returns {name: rows hashed}.
+    """
+    from psycopg2.extras import execute_values
+
+    done = {}
+    for name in tables:
+        table, key, column = LEGACY_TARGETS[name]
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT {key}, {column} FROM {table}
+                WHERE  COALESCE({column}, '') <> '' AND {column} !~ '^\\$2[aby]\\$'
+            """)
+            rows = cur.fetchall()
+            started = time.perf_counter()
+            futures = hasher.hash_many([password for _, password in rows])
+            hashed = [(k, password, future.result()) for (k, password), future in zip(rows, futures)]
+            updated = execute_values(cur, f"""
+                UPDATE {table} t SET {column} = v.hash
+                FROM   (VALUES %s) AS v (id, old, hash)
+                WHERE  t.{key} = v.id AND t.{column} = v.old
+                RETURNING t.{key}
+            """, hashed, fetch=True) if hashed else []
+        conn.commit()
+        done[name] = len(updated)
+        log(f"✔ {table}: {len(updated)} plaintext passwords hashed in {time.perf_counter() - started:.1f}s")
+    return done
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="python hashing.py")
+    sub = parser.add_subparsers(dest="command", required=True)
+    cal = sub.add_parser("calibrate", help="time bcrypt costs here and suggest HASH_ROUNDS")
+    cal.add_argument("--target-ms", type=float, default=250, help="hash time one login may cost")
+    mig = sub.add_parser("migrate", help="hash the plaintext passwords still in the database")
+    mig.add_argument("--tables", nargs="+", choices=list(LEGACY_TARGETS), default=list(LEGACY_TARGETS))
+    args = parser.parse_args(argv[1:])
+
+    try:
+        if args.command == "calibrate":
+            rounds = calibrate(args.target_ms)
+            print(f"→ HASH_ROUNDS={rounds}  (now {HASH_ROUNDS}; raising it rehashes accounts as they log in)")
+            return 0
+
+        from db import connect
+
+        conn = connect()
+        try:
+            migrate_plaintext(conn, args.tables)
+        finally:
+            conn.close()
+        return 0
+    finally:
+        hasher.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
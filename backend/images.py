@@ -0,0 +1,225 @@
+# images.py — background processing of complaint proof images
+#
+# Uploads are stored as‑is first (blobstore.py) so /complaint/add returns
+# immediately.  Each new complaint is then queued here, off the request path:
+#   1. detect the real image type by decoding it (the client's label and the
+#      file name mean nothing) — undecodable uploads are marked `invalid`,
+#   2. re‑encode to WebP capped at IMAGE_MAX_DIMENSION px,
+#   3. render a IMAGE_THUMB_DIMENSION px thumbnail for list views,
+#   4. point Complaint.ProofBlob / ProofThumb at the results.
+# The original blob becomes unreferenced and is removed by `blobstore.py gc`.
+# At most IMAGE_QUEUE_DEPTH images wait for a worker; past that an upload
+# burst is not queued in memory — its proofs stay `pending` for backfill.
+#
+#   python images.py backfill   # process complaints stored before this existed
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from blobstore import store
+from cache import response_cache
+from db import pool
+
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", "2"))
+IMAGE_QUEUE_DEPTH = int(os.environ.get("IMAGE_QUEUE_DEPTH", "64"))
+IMAGE_MAX_DIMENSION = int(os.environ.get("IMAGE_MAX_DIMENSION", "1600"))
+IMAGE_THUMB_DIMENSION = int(os.environ.get("IMAGE_THUMB_DIMENSION", "320"))
+IMAGE_QUALITY = int(os.environ.get("IMAGE_QUALITY", "80"))
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP", "GIF", "BMP", "TIFF", "MPO"}
+
+# refuse decompression bombs (a tiny file that decodes to gigapixels)
+Image.MAX_IMAGE_PIXELS = 50_000_000
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def _encode(image, quality):
+    out = io.BytesIO()
+    image.save(out, format="WEBP", quality=quality, method=4)
+    return out.getvalue()
+
+
+def process_image(data):
+    """
+    Decode, normalise and re‑encode one image.
+    Returns (detected_format, full_bytes, thumb_bytes); `full_bytes` is None
+    when re‑encoding would not make the original any smaller.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            detected = image.format
+            if detected not in ALLOWED_FORMATS:
+                raise InvalidImage(f"unsupported image type {detected}")
+            image.load()
+            image = ImageOps.exif_transpose(image)  # phone photos are often rotated
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e))
+
+    image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    full = image.copy()
+    full.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION), Image.LANCZOS)
+    full_bytes = _encode(full, IMAGE_QUALITY)
+    if len(full_bytes) >= len(data) and full.size == image.size and detected in ("JPEG", "PNG", "WEBP"):
+        full_bytes = None  # already small and browser‑safe — keep the original
+
+    thumb = full  # full is already encoded; shrink it in place
+    thumb.thumbnail((IMAGE_THUMB_DIMENSION, IMAGE_THUMB_DIMENSION), Image.LANCZOS)
+    return detected, full_bytes, _encode(thumb, IMAGE_QUALITY - 10)
+
+
+class ImagePipeline:
+    """
+    Bounded thread pool (Pillow releases the GIL while decoding, resizing and
+    encoding) with a bounded queue in front, plus counters for
+    /admin/stats/images.
+    """
+
+    def __init__(self, workers, queue_depth):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="images")
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._stats = {
+            "processed": 0, "invalid": 0, "failed": 0, "deferred": 0,
+            "bytes_in": 0, "bytes_out": 0, "busy_seconds": 0.0,
+        }
+
+    def submit(self, cid, digest, block=False):
+        """
+        Queue one complaint's image; returns a Future, or None when the queue
+        is full (the proof stays `pending` and `images.py backfill` picks it
+        up).  `block=True` waits for a slot instead — for backfill itself.
+        """
+        if not self._slots.acquire(blocking=block):
+            with self._lock:
+                self._stats["deferred"] += 1
+            return None
+        with self._lock:
+            self._queued += 1
+        try:
+            return self._executor.submit(self._run, cid, digest)
+        except BaseException:  # shut down
+            with self._lock:
+                self._queued -= 1
+            self._slots.release()
+            raise
+
+    def _run(self, cid, digest):
+        started = time.perf_counter()
+        outcome, bytes_in, bytes_out = "failed", 0, 0
+        try:
+            with open(store.path(digest), "rb") as fh:
+                data = fh.read()
+            bytes_in = len(data)
+
+            try:
+                _detected, full_bytes, thumb_bytes = process_image(data)
+            except InvalidImage:
+                self._save(cid, digest, digest, None, "invalid")
+                outcome = "invalid"
+                return
+
+            full = store.put(full_bytes) if full_bytes else digest
+            thumb = store.put(thumb_bytes)
+            self._save(cid, digest, full, thumb, "ready")
+            bytes_out = len(full_bytes) if full_bytes else bytes_in
+            outcome = "processed"
+        except Exception as e:
+            print(f"❌ Image processing failed for complaint {cid}:", e)
+        finally:
+            self._slots.release()
+            with self._lock:
+                self._queued -= 1
+                self._stats[outcome] += 1
+                self._stats["busy_seconds"] += time.perf_counter() - started
+                if outcome == "processed":
+                    self._stats["bytes_in"] += bytes_in
+                    self._stats["bytes_out"] += bytes_out
+
+    @staticmethod
+    def _save(cid, original, full, thumb, status):
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                # only if nobody replaced the image meanwhile
+                cur.execute(
+                    """
+                    UPDATE Complaint c
+                    SET    ProofBlob = %s, ProofThumb = %s, ProofStatus = %s
+                    WHERE  CID = %s AND ProofBlob = %s
+                    RETURNING (SELECT SHID FROM Student WHERE SID = c.SID)
+                    """,
+                    (full, thumb, status, cid, original),
+                )
+                updated = cur.fetchone()
+            conn.commit()
+        if updated:  # lists now show the thumbnail
+            response_cache.invalidate("complaints", f"student:{updated[0]}")
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+            queued = self._queued
+        busy = s.pop("busy_seconds")
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "queued": queued,
+            **s,
+            "bytes_saved": s["bytes_in"] - s["bytes_out"],
+            "avg_ms": round(busy / s["processed"] * 1000, 1) if s["processed"] else 0.0,
+            # per busy worker‑second, i.e. what one worker sustains
+            "images_per_second": round(s["processed"] / busy, 2) if busy else 0.0,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+image_pipeline = ImagePipeline(IMAGE_WORKERS, IMAGE_QUEUE_DEPTH)
+
+
+def backfill(batch_size=100):
+    """
+    Queue every complaint whose image was never processed (including those a
+    full queue deferred), waiting for queue slots rather than overflowing;
+    waits for completion.
+    """
+    last_cid, futures = 0, []
+    while True:
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT CID, ProofBlob FROM Complaint
+                    WHERE  CID > %s AND ProofBlob IS NOT NULL AND ProofThumb IS NULL
+                      AND  COALESCE(ProofStatus, 'pending') = 'pending'
+                    ORDER  BY CID LIMIT %s
+                    """,
+                    (last_cid, batch_size),
+                )
+                rows = cur.fetchall()
+        if not rows:
+            break
+        for cid, digest in rows:
+            last_cid = cid
+            futures.append(image_pipeline.submit(cid, digest, block=True))
+    for future in futures:
+        future.result()
+    return image_pipeline.stats()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["backfill"]:
+        sys.exit("usage: python images.py backfill")
+    print(backfill())
@@ -1,23 +1,106 @@
 # main.py
-from fastapi import FastAPI, HTTPException
+import asyncio
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.responses import FileResponse, JSONResponse, Response
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
+from starlette.concurrency import run_in_threadpool
 from wardan import router as warden_router
 from admin import router as admin_router
-from db import get_db_connection  # ✅ make sure get_db_connection is importable
+from trends import router as trends_router
+from student_import import router as student_import_router
+from export import router as export_router
+from db import PoolTimeout, get_db_connection, pool  # ✅ pooled, request‑scoped connections
+from hashing import HasherBusy, hasher  # ✅ bcrypt on a bounded worker pool
+from blobstore import decode_base64_image, is_digest, proof_url, sniff_content_type, store
+from images import image_pipeline  # ✅ validate / downscale / thumbnail in the background
+from pagination import ComplaintFilters, Page
+from cache import CachedRoute, cached, response_cache  # ✅ ETag'd GET cache, invalidated by writes
+from fastjson import FastJSONResponse  # ✅ one‑pass orjson rendering
+from events import broker, router as events_router  # ✅ SSE push
+from principal import Principal, aresolve_student, current_student, resolve_student  # ✅ cached SHID → SID/HID
+from bus import bus  # ✅ LISTEN/NOTIFY: other workers' writes reach this cache & subscribers
+from dedup import aassign_cluster, assign_cluster, signature  # ✅ near‑duplicate clusters
+from outbox import enqueue, mailer  # ✅ mail is queued, sent by a background thread
+from escalation import escalator  # ✅ overdue complaints → per‑warden digests, incrementally
+from ratelimit import RateLimitMiddleware  # ✅ token buckets in front of the sign‑in routes
+from uploads import MAX_FORM_FIELD_BYTES, MAX_PROOF_IMAGE_BYTES, StreamingForm, UploadError, sessions
+from db_async import (  # ✅ awaitable connections for async def routes
+    AsyncPoolTimeout,
+    async_pool,
+    close_async_pool,
+    get_async_connection,
+    open_async_pool,
+)
 
 
 
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
+app.router.route_class = CachedRoute  # lets @cached routes below be served from response_cache
 app.add_middleware(SessionMiddleware, secret_key="your-very-secret-key")
+# added after the session middleware = runs before it: a 429 costs no session, pool or
+# hash.  CORSMiddleware (registered further down) wraps both, so a 429 still carries
+# the CORS headers and the browser can read its Retry-After.
+app.add_middleware(RateLimitMiddleware)
+
+
+# ✅ Pool exhausted → tell the client to back off instead of a bare 500
+@app.exception_handler(PoolTimeout)
+@app.exception_handler(AsyncPoolTimeout)
+async def pool_timeout_handler(request, exc):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
+# ✅ Hashing queue full (login storm) → fail fast, other routes keep flowing
+@app.exception_handler(HasherBusy)
+async def hasher_busy_handler(request, exc):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign‑ins right now, please retry"},
+        headers={"Retry-After": "2"},
+    )
+
+
+# ✅ Upload problems (too large, bad offset, …) carry their own status code
+@app.exception_handler(UploadError)
+async def upload_error_handler(request, exc):
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+
+
+@app.on_event("startup")
+async def open_db_pools():
+    broker.start(asyncio.get_running_loop())
+    await open_async_pool()
+    await bus.start()
+    mailer.start()
+    escalator.start()
+
+
+@app.on_event("shutdown")
+async def close_db_pools():
+    escalator.stop()
+    mailer.stop()
+    await bus.stop()
+    await close_async_pool()
+    pool.closeall()
+    hasher.shutdown()
+    image_pipeline.shutdown()
 
 # 👇 Mount the warden routes
 app.include_router(warden_router)
 
 # 👇 Mount the admin routes
 app.include_router(admin_router)
+app.include_router(trends_router)
+app.include_router(student_import_router)
+app.include_router(export_router)
+app.include_router(events_router)
 
 # # CORS setup
 # app.add_middleware(
@@ -34,13 +117,11 @@ app.include_router(admin_router)
 class UserAuthInput(BaseModel):
     shid: str
     pswd: str
-from passlib.hash import bcrypt
 
 @app.post("/userauth")
-def create_user_auth(data: UserAuthInput):
+def create_user_auth(data: UserAuthInput, conn=Depends(get_db_connection)):
+    cursor = conn.cursor()
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
 
         # ✅ Check Student exists
         cursor.execute("SELECT SHID FROM Student WHERE SHID = %s", (data.shid,))
@@ -53,7 +134,7 @@ def create_user_auth(data: UserAuthInput):
             return {"status": "exists", "message": "⚠️ SHID already registered."}
 
         # ✅ Hash the password
-        hashed_password = bcrypt.hash(data.pswd)
+        hashed_password = hasher.hash_sync(data.pswd)
 
         # ✅ Insert hashed password
         cursor.execute(
@@ -63,49 +144,56 @@ def create_user_auth(data: UserAuthInput):
         conn.commit()
         return {"status": "success", "message": "✅ User registered successfully."}
 
+    except HasherBusy:
+        raise
+
     except Exception as e:
         print("❌ Exception occurred:", str(e))
         return {"status": "error", "message": f"❌ Internal Server Error: {str(e)}"}
 
     finally:
         cursor.close()
-        conn.close()
 
 from fastapi import FastAPI, Request, Form
 class UserLoginInput(BaseModel):
     shid: str
     pswd: str
 
+# The SQL of the hot student paths lives in module constants / *_query()
+# builders so benchmarks/check_query_plans.py EXPLAINs exactly what runs.
+LOGIN_SQL = "SELECT SHID, PSWD FROM UserAuth WHERE SHID = %s"
+
+
 @app.post("/login")
-async def login(data: UserLoginInput, request: Request):
+async def login(data: UserLoginInput, request: Request, conn=Depends(get_async_connection)):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
         # ✅ Fetch hashed password from DB
-        cursor.execute("SELECT SHID, PSWD FROM UserAuth WHERE SHID = %s", (data.shid,))
-        result = cursor.fetchone()
+        cur = await conn.execute(LOGIN_SQL, (data.shid,))
+        result = await cur.fetchone()
 
         if result is None:
             return {"status": "not_found", "message": "❌ SHID not registered."}
 
-        db_shid, hashed_pswd = result
-
-        # ✅ Compare hash with entered password
-        if not bcrypt.verify(data.pswd, hashed_pswd):
+        # ✅ Compare hash with entered password (CPU‑bound → hashing pool)
+        ok, new_hash = await hasher.verify_and_update(data.pswd, result["pswd"])
+        if not ok:
             return {"status": "invalid", "message": "❌ Incorrect password."}
+        if new_hash:  # plaintext / weaker legacy hash → store the current kind
+            await conn.execute(
+                "UPDATE UserAuth SET PSWD = %s WHERE SHID = %s AND PSWD = %s",
+                (new_hash, result["shid"], result["pswd"]),
+            )
 
-        request.session["user"] = db_shid
+        request.session["user"] = result["shid"]
         return {"status": "success", "message": "✅ Login successful."}
 
+    except HasherBusy:
+        raise
+
     except Exception as e:
         print("❌ Login error:", str(e))
         return {"status": "error", "message": f"❌ Server error: {str(e)}"}
 
-    finally:
-        cursor.close()
-        conn.close()
-
 
 @app.get("/logout")
 async def logout(request: Request):
@@ -120,89 +208,98 @@ async def session_check(request: Request):
     return {"logged_in": False}
 
 
+@app.get("/me")
+async def me(student: Principal = Depends(current_student)):
+    """The logged‑in student, resolved from the session (no SHID in the URL)."""
+    return student._asdict()
+
+
+def _complaints_changed(shid):
+    """Drop cached views a complaint write for `shid` makes stale (call after commit)."""
+    response_cache.invalidate("complaints", f"student:{shid}")
+
+
+# ✅ one round trip: profile, hostel, warden, counters and the last 5
+# complaints.  Counts come from StudentComplaintStats (kept current by a
+# trigger on Complaint), so they never scan the complaint history.
+DASHBOARD_SQL = """
+    SELECT S.SID, S.Name, S.Phone, S.Mail, S.DOB, S.SHID,
+           H.HID, H.Name AS HostelName, H.Location,
+           W.Name AS WardenName, W.Mail AS WardenMail, W.Phone AS WardenPhone,
+           COALESCE(CS.Total, 0), COALESCE(CS.Pending, 0),
+           COALESCE(CS.Resolved, 0), COALESCE(CS.Withdrawn, 0),
+           COALESCE((
+               SELECT json_agg(json_build_object(
+                          'type', R.Type,
+                          'status', R.Status,
+                          'description', R.Description,
+                          'created_at', R.Created_at
+                      ) ORDER BY R.Created_at DESC, R.CID DESC)
+               FROM (
+                   SELECT CID, Type, Status, Description, Created_at
+                   FROM   Complaint
+                   WHERE  SID = S.SID
+                   ORDER  BY Created_at DESC, CID DESC
+                   LIMIT  5
+               ) R
+           ), '[]'::json) AS Recent
+    FROM Student S
+    JOIN Hostel H ON S.HID = H.HID
+    LEFT JOIN LATERAL (
+        SELECT Name, Mail, Phone FROM Warden
+        WHERE  HID = H.HID
+        ORDER  BY WID
+        LIMIT  1
+    ) W ON TRUE
+    LEFT JOIN StudentComplaintStats CS ON CS.SID = S.SID
+    WHERE S.SHID = %s
+"""
+
+
 @app.get("/dashboard/{shid}")
-def get_student_dashboard(shid: str):
+@cached("student:{shid}", "wardens", "hostels")
+def get_student_dashboard(shid: str, conn=Depends(get_db_connection)):
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
+        cursor.execute(DASHBOARD_SQL, (shid,))
+        row = cursor.fetchone()
+        cursor.close()
 
-        # Fetch Student Info
-        cursor.execute("""
-            SELECT S.SID, S.Name, S.Phone, S.Mail, S.DOB, S.SHID,
-                   H.HID, H.Name AS HostelName, H.Location,
-                   W.Name AS WardenName, W.Mail AS WardenMail, W.Phone AS WardenPhone
-            FROM Student S
-            JOIN Hostel H ON S.HID = H.HID
-            LEFT JOIN Warden W ON H.HID = W.HID
-            WHERE S.SHID = %s
-        """, (shid,))
-        student_row = cursor.fetchone()
-
-        if not student_row:
+        if not row:
             raise HTTPException(status_code=404, detail="Student not found")
 
         student_info = {
-            "sid": student_row[0],
-            "name": student_row[1],
-            "phone": student_row[2],
-            "mail": student_row[3],
-            "dob": student_row[4],
-            "shid": student_row[5],
+            "sid": row[0],
+            "name": row[1],
+            "phone": row[2],
+            "mail": row[3],
+            "dob": row[4],
+            "shid": row[5],
             "hostel": {
-                "hid": student_row[6],
-                "name": student_row[7],
-                "location": student_row[8]
+                "hid": row[6],
+                "name": row[7],
+                "location": row[8]
             },
             "warden": {
-                "name": student_row[9],
-                "mail": student_row[10],
-                "phone": student_row[11]
+                "name": row[9],
+                "mail": row[10],
+                "phone": row[11]
             }
         }
 
-        # Complaint Stats
-        cursor.execute("SELECT COUNT(*) FROM Complaint WHERE SID = %s", (student_info["sid"],))
-        total_complaints = cursor.fetchone()[0]
-
-        cursor.execute("SELECT COUNT(*) FROM Complaint WHERE SID = %s AND Status = 'Pending'", (student_info["sid"],))
-        pending = cursor.fetchone()[0]
-
-        cursor.execute("SELECT COUNT(*) FROM Complaint WHERE SID = %s AND Status = 'Resolved'", (student_info["sid"],))
-        resolved = cursor.fetchone()[0]
-
-        # Last 5 complaints
-        cursor.execute("""
-            SELECT Type, Status, Description, Created_at
-            FROM Complaint
-            WHERE SID = %s
-            ORDER BY Created_at DESC
-            LIMIT 5
-        """, (student_info["sid"],))
-        recent_complaints = cursor.fetchall()
-
-        recent = [
-            {
-                "type": row[0],
-                "status": row[1],
-                "description": row[2],
-                "created_at": row[3]
-            }
-            for row in recent_complaints
-        ]
-
-        cursor.close()
-        conn.close()
-
         return {
             "student": student_info,
             "complaints": {
-                "total": total_complaints,
-                "pending": pending,
-                "resolved": resolved,
-                "recent": recent
+                "total": row[12],
+                "pending": row[13],
+                "resolved": row[14],
+                "withdrawn": row[15],
+                "recent": row[16]
             }
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print("❌ Dashboard Error:", str(e))
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -214,199 +311,200 @@ class ComplaintRequest(BaseModel):
     proof_image: str  # base64 (without prefix)
 
 @app.post("/complaint/add")
-def add_complaint(complaint: ComplaintRequest):
+def add_complaint(complaint: ComplaintRequest, conn=Depends(get_db_connection)):
     try:
-        conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute("SELECT SID FROM Student WHERE SHID = %s", (complaint.shid,))
-        student = cursor.fetchone()
-
-        if not student:
-            raise HTTPException(status_code=404, detail="Student not found")
+        student = resolve_student(conn, complaint.shid)
 
-        sid = student[0]
+        # ✅ Image goes to the blob store; the row only keeps its sha256
+        try:
+            proof_blob = store.put(decode_base64_image(complaint.proof_image))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
+        minhash = signature(complaint.description)
         cursor.execute("""
-            INSERT INTO Complaint (SID, Type, Description, Status, ProofImage)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (sid, complaint.type, complaint.description, "Pending", complaint.proof_image))
+            INSERT INTO Complaint (SID, Type, Description, Status, ProofBlob, MinHash)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            RETURNING CID
+        """, (student.sid, complaint.type, complaint.description, "Pending", proof_blob, minhash))
+        cid = cursor.fetchone()[0]
+        assign_cluster(cursor, cid, student.hid, complaint.type, minhash)
 
         conn.commit()
         cursor.close()
-        conn.close()
+        _complaints_changed(complaint.shid)
+        image_pipeline.submit(cid, proof_blob)
 
         return {"status": "success", "message": "Complaint added successfully"}
 
+    except HTTPException:
+        raise
+
     except Exception as e:
         print("❌ Error:", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@app.get("/analytics/student/complaint-trend/{shid}")
-def complaint_trend(shid: str, days: int = 7):
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-
-    cur.execute("SELECT SID FROM Student WHERE SHID = %s", (shid,))
-    student = cur.fetchone()
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
-
-    sid = student["sid"]
-
-    cur.execute("""
-        SELECT 
-            TO_CHAR(d::date, 'YYYY-MM-DD') AS day,
-            COUNT(c.cid) AS total,
-            COUNT(CASE WHEN c.iswithdrawn THEN 1 END) AS withdrawn
-        FROM generate_series(
-            CURRENT_DATE - %s + 1,
-            CURRENT_DATE,
-            '1 day'
-        ) AS d
-        LEFT JOIN complaint c ON DATE_TRUNC('day', c.created_at) = d::date AND c.sid = %s
-        GROUP BY day ORDER BY day
-    """, (days, sid))
-
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+# ───────────── Streaming / resumable proof uploads ─────────────
+# These routes borrow a DB connection only for their short queries, never for
+# the (possibly minutes‑long) body transfer over hostel Wi‑Fi.
+async def _insert_complaint(conn, shid, student, type_, description, proof_blob):
+    minhash = signature(description)
+    async with conn.transaction():
+        cur = await conn.execute("""
+            INSERT INTO Complaint (SID, Type, Description, Status, ProofBlob, MinHash)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            RETURNING CID
+        """, (student.sid, type_, description, "Pending", proof_blob, minhash))
+        cid = (await cur.fetchone())["cid"]
+        await aassign_cluster(conn, cid, student.hid, type_, minhash)
+    _complaints_changed(shid)
+    image_pipeline.submit(cid, proof_blob)
+    return cid
+
+
+@app.post("/complaint/add/multipart")
+async def add_complaint_multipart(request: Request):
+    """
+    multipart/form-data variant of /complaint/add: fields `shid`, `type`,
+    `description` (sent first) and the file `proof_image`.  The body is parsed
+    as it streams in and the image goes straight to the blob store.
+    """
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > MAX_PROOF_IMAGE_BYTES + MAX_FORM_FIELD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Image larger than {MAX_PROOF_IMAGE_BYTES} bytes")
+
+    form = StreamingForm(request.headers.get("content-type"), "proof_image")
+    student = None
+    try:
+        async for chunk in request.stream():
+            await run_in_threadpool(form.write, chunk)  # parsing + file writes, off the loop
+            # check the student as soon as the file starts, not after reading it
+            if form.file_started and student is None:
+                if not form.fields.get("shid"):  # fields after the file would mean a useless 404
+                    raise HTTPException(status_code=400, detail="Send the shid field before proof_image")
+                async with async_pool.connection() as conn:
+                    student = await aresolve_student(conn, form.fields["shid"])
+        proof_blob = await run_in_threadpool(form.finish)  # fsync + move into the store
+    except BaseException:
+        form.abort()
+        raise
+
+    type_ = form.fields.get("type")
+    description = form.fields.get("description")
+    if not (form.fields.get("shid") and type_ and description and proof_blob):
+        raise HTTPException(status_code=400, detail="shid, type, description and proof_image are required")
+
+    async with async_pool.connection() as conn:
+        if student is None:
+            student = await aresolve_student(conn, form.fields["shid"])
+        cid = await _insert_complaint(conn, form.fields["shid"], student, type_, description, proof_blob)
+
+    return {"status": "success", "message": "Complaint added successfully", "cid": cid}
+
+
+class UploadStart(BaseModel):
+    shid: str
+    size: int  # total bytes the client is going to send
 
-    return {
-        "labels": [r["day"] for r in rows],
-        "totalComplaints": [r["total"] for r in rows],
-        "withdrawnComplaints": [r["withdrawn"] for r in rows]
-    }
 
-# ✅ Route that returns complaints with base64 image + prefix
-@app.get("/dashboard/{shid}")
-def get_dashboard(shid: str):
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+class UploadedComplaint(BaseModel):
+    shid: str
+    type: str
+    description: str
+    upload_id: str
 
-        # Get student info
-        cursor.execute("""
-            SELECT SID, SHID, Name, Mail, Phone, DOB, HostelID 
-            FROM Student 
-            WHERE SHID = %s
-        """, (shid,))
-        student = cursor.fetchone()
-        if not student:
-            raise HTTPException(status_code=404, detail="Student not found")
 
-        sid = student[0]
-        student_info = {
-            "sid": student[0],
-            "shid": student[1],
-            "name": student[2],
-            "mail": student[3],
-            "phone": student[4],
-            "dob": student[5],
-        }
+@app.post("/complaint/uploads", status_code=201)
+async def start_upload(data: UploadStart):
+    """Open a resumable upload; then PATCH chunks and finish with /complaint/add/upload."""
+    async with async_pool.connection() as conn:
+        await aresolve_student(conn, data.shid)
+    upload_id = await run_in_threadpool(sessions.create, data.shid, data.size)
+    return {"upload_id": upload_id, "offset": 0, "size": data.size}
 
-        # Hostel & Warden info (optional)
-        cursor.execute("""
-            SELECT H.Name, H.Location, W.Name, W.Phone 
-            FROM Hostel H
-            JOIN Warden W ON H.WID = W.WID
-            WHERE H.HID = %s
-        """, (student[6],))
-        hostel = cursor.fetchone()
-        student_info["hostel"] = {
-            "name": hostel[0],
-            "location": hostel[1]
-        }
-        student_info["warden"] = {
-            "name": hostel[2],
-            "phone": hostel[3]
-        }
 
-        # Complaints info
-        cursor.execute("""
-            SELECT Type, Description, Status, Created_at, ProofImage 
-            FROM Complaint 
-            WHERE SID = %s
-            ORDER BY Created_at DESC
-            LIMIT 5
-        """, (sid,))
-        complaints = cursor.fetchall()
-
-        recent_complaints = []
-        for c in complaints:
-            image_data = c[4]
-            if image_data:
-                # Add proper prefix for frontend display
-                image_src = f"data:image/png;base64,{image_data}"
-            else:
-                image_src = None
-            recent_complaints.append({
-                "type": c[0],
-                "description": c[1],
-                "status": c[2],
-                "created_at": c[3],
-                "proof_image": image_src
-            })
+@app.get("/complaint/uploads/{upload_id}")
+def upload_status(upload_id: str, response: Response):
+    """Where to resume from after a dropped connection."""
+    meta, offset = sessions.get(upload_id)
+    response.headers["Upload-Offset"] = str(offset)
+    return {"upload_id": upload_id, "offset": offset, "size": meta["size"]}
 
-        # Count totals
-        cursor.execute("SELECT COUNT(*) FROM Complaint WHERE SID = %s", (sid,))
-        total = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM Complaint WHERE SID = %s AND Status = 'Pending'", (sid,))
-        pending = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM Complaint WHERE SID = %s AND Status = 'Resolved'", (sid,))
-        resolved = cursor.fetchone()[0]
 
-        cursor.close()
-        conn.close()
+@app.patch("/complaint/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, offset: int, request: Request):
+    """Raw bytes of the next chunk; `offset` must equal the bytes already received."""
+    new_offset = await sessions.append(upload_id, offset, request.stream())
+    meta, _ = await run_in_threadpool(sessions.get, upload_id)
+    return {
+        "upload_id": upload_id,
+        "offset": new_offset,
+        "size": meta["size"],
+        "complete": new_offset == meta["size"],
+    }
+
+
+@app.post("/complaint/add/upload")
+async def add_complaint_from_upload(data: UploadedComplaint):
+    # re‑hashing the whole file takes a while: no pool connection held meanwhile
+    proof_blob = await run_in_threadpool(sessions.complete, data.upload_id, data.shid)
+    async with async_pool.connection() as conn:
+        student = await aresolve_student(conn, data.shid)
+        cid = await _insert_complaint(conn, data.shid, student, data.type, data.description, proof_blob)
+    return {"status": "success", "message": "Complaint added successfully", "cid": cid}
 
-        return {
-            "student": student_info,
-            "complaints": {
-                "recent": recent_complaints,
-                "total": total,
-                "pending": pending,
-                "resolved": resolved
-            }
-        }
 
-    except Exception as e:
-        print("❌ Error fetching dashboard:", e)
-        raise HTTPException(status_code=500, detail="Internal server error")
 from fastapi import APIRouter, HTTPException
 import base64
 
-@app.get("/fetch_complaint/{shid}")
-def fetch_complaints_by_shid(shid: str):
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Get SID from SHID
-        cursor.execute("SELECT SID FROM Student WHERE SHID = %s", (shid,))
-        student = cursor.fetchone()
-        if not student:
-            raise HTTPException(status_code=404, detail="Student not found")
+def student_complaints_query(sid, filters, page):
+    """(sql, params) for one page of a student's complaints, newest first."""
+    clauses, params = filters.where(complaint="c", student=None)
+    seek, seek_params = page.keyset(["c.Created_at", "c.CID"], casts=["::timestamp", ""])
+    if seek:
+        clauses.append(seek)
+        params += seek_params
+    # legacy base64 only for rows not migrated yet
+    sql = f"""
+        SELECT c.CID, c.Type, c.Description, c.Status, c.Created_at,
+               CASE WHEN c.ProofStatus = 'invalid' THEN NULL ELSE c.ProofBlob END, c.ProofThumb,
+               CASE WHEN c.ProofBlob IS NULL THEN c.ProofImage END,
+               COALESCE(c.WithdrawCount, 0), COALESCE(c.IsWithdrawn, FALSE)
+        FROM Complaint c
+        WHERE {" AND ".join(["c.SID = %s"] + clauses)}
+        ORDER BY c.Created_at DESC, c.CID DESC
+        LIMIT %s
+    """
+    return sql, [sid] + params + [page.fetch]
 
-        sid = student[0]
 
-        # Fetch complaints with necessary fields
-        cursor.execute("""
-            SELECT CID, Type, Description, Status, Created_at, ProofImage, 
-                   COALESCE(WithdrawCount, 0), COALESCE(IsWithdrawn, FALSE)
-            FROM Complaint 
-            WHERE SID = %s 
-            ORDER BY Created_at DESC
-        """, (sid,))
+@app.get("/fetch_complaint/{shid}")
+@cached("student:{shid}")
+def fetch_complaints_by_shid(
+    shid: str,
+    filters: ComplaintFilters = Depends(),
+    page: Page = Depends(),
+    conn=Depends(get_db_connection),
+):
+    # newest first, keyset‑paginated on (Created_at, CID); follow next_cursor
+    cursor = conn.cursor()
+    try:
+        sid = resolve_student(conn, shid).sid
+        cursor.execute(*student_complaints_query(sid, filters, page))
 
+        rows, next_cursor = page.result(cursor.fetchall(), lambda r: (r[4], r[0]))
         complaints = []
-        for row in cursor.fetchall():
-            cid, type_, desc, status, created_at, proof_image, withdraw_count, is_withdrawn = row
+        for row in rows:
+            (cid, type_, desc, status, created_at, proof_blob, proof_thumb,
+             legacy_image, withdraw_count, is_withdrawn) = row
 
-            # Convert binary image to base64 data URL if exists
-            image_data = None
-            if proof_image:
-                image_data = f"data:image/png;base64,{proof_image.strip()}"
+            # Thumbnail URL by default (full size in proof_full); legacy rows inline
+            image_data = proof_url(proof_thumb or proof_blob)
+            if not image_data and legacy_image:
+                image_data = f"data:image/png;base64,{legacy_image.strip()}"
 
             complaints.append({
                 "cid": cid,
@@ -415,11 +513,15 @@ def fetch_complaints_by_shid(shid: str):
                 "status": status,
                 "created_at": created_at,
                 "proof_image": image_data,
+                "proof_full": proof_url(proof_blob) or image_data,
                 "withdraw_count": withdraw_count,
                 "is_withdrawn": is_withdrawn,
             })
 
-        return {"complaints": complaints}
+        return {"complaints": complaints, "next_cursor": next_cursor}
+
+    except HTTPException:
+        raise
 
     except Exception as e:
         print("❌ Error in fetch_complaints_by_shid:", e)
@@ -427,7 +529,28 @@ def fetch_complaints_by_shid(shid: str):
 
     finally:
         cursor.close()
-        conn.close()
+
+
+# ✅ Proof images are immutable (named by their hash) → cache them forever
+@app.get("/complaint/proof/{digest}")
+def get_proof_image(digest: str, request: Request):
+    if not is_digest(digest):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    path = store.path(digest)
+    try:
+        with open(path, "rb") as fh:
+            media_type = sniff_content_type(fh.read(16))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    # FileResponse streams the file in chunks instead of loading it into memory
+    return FileResponse(path, media_type=media_type, headers=headers)
 
 
 from fastapi import APIRouter, HTTPException
@@ -439,8 +562,17 @@ class WithdrawRequest(BaseModel):
     shid: str
     cid: int
 
+
+# lock the row so two concurrent withdraws can't both pass the checks
+WITHDRAW_LOCK_SQL = """
+    SELECT WithdrawCount, IsWithdrawn
+    FROM Complaint
+    WHERE CID = %s AND SID = %s
+    FOR UPDATE
+"""
+
 @app.post("/complaint/withdraw")
-async def withdraw_complaint(req: Request):
+async def withdraw_complaint(req: Request, conn=Depends(get_async_connection)):
     body = await req.json()
     print("📦 Raw JSON Received:", body)
 
@@ -450,35 +582,21 @@ async def withdraw_complaint(req: Request):
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid input format")
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    async with conn.transaction():
+        sid = (await aresolve_student(conn, data.shid)).sid
 
-    try:
-        cursor.execute("SELECT SID FROM Student WHERE SHID = %s", (data.shid,))
-        student = cursor.fetchone()
-        if not student:
-            raise HTTPException(status_code=404, detail="Student not found")
-
-        sid = student[0]
-
-        cursor.execute("""
-            SELECT WithdrawCount, IsWithdrawn 
-            FROM Complaint 
-            WHERE CID = %s AND SID = %s
-        """, (data.cid, sid))
-        complaint = cursor.fetchone()
+        cur = await conn.execute(WITHDRAW_LOCK_SQL, (data.cid, sid))
+        complaint = await cur.fetchone()
         if not complaint:
             raise HTTPException(status_code=404, detail="Complaint not found")
 
-        withdraw_count, is_withdrawn = complaint
-
-        if is_withdrawn:
+        if complaint["iswithdrawn"]:
             raise HTTPException(status_code=400, detail="Complaint already withdrawn")
 
-        if withdraw_count >= 3:
+        if complaint["withdrawcount"] >= 3:
             raise HTTPException(status_code=400, detail="Withdraw limit exceeded (Max 3 times)")
 
-        cursor.execute("""
+        await conn.execute("""
             UPDATE Complaint
             SET Status = 'Withdrawn',
                 WithdrawCount = WithdrawCount + 1,
@@ -486,13 +604,8 @@ async def withdraw_complaint(req: Request):
             WHERE CID = %s AND SID = %s
         """, (data.cid, sid))
 
-        conn.commit()
-
-        return {"status": "success", "message": "Complaint withdrawn successfully"}
-
-    finally:
-        cursor.close()
-        conn.close()
+    _complaints_changed(data.shid)
+    return {"status": "success", "message": "Complaint withdrawn successfully"}
 
 
 
@@ -502,14 +615,10 @@ async def withdraw_complaint(req: Request):
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from email.message import EmailMessage
 import psycopg2
 from psycopg2.extras import RealDictCursor
-import smtplib
-import ssl
 import os
 from dotenv import load_dotenv
-from passlib.hash import bcrypt  # for password hashing
 
 # ✅ Load environment variables
 load_dotenv()
@@ -538,11 +647,12 @@ from fastapi import HTTPException
 import traceback  # Optional: for debugging
 
 @app.post("/auth/forgot-password")
-def forgot_password(request: ForgetPasswordRequest, preview: bool = False):
+def forgot_password(
+    request: ForgetPasswordRequest, preview: bool = False, conn=Depends(get_db_connection)
+):
     shid = request.shid
 
     try:
-        conn = get_db_connection()
         cur = conn.cursor(cursor_factory=RealDictCursor)
 
         # Check SHID exists in both tables
@@ -563,14 +673,13 @@ def forgot_password(request: ForgetPasswordRequest, preview: bool = False):
         if preview:
             return {"name": user_name, "email": user_email}
 
-        # Email sending
+        # ✅ Queued in this transaction; the outbox thread sends it (no SMTP in the request)
         reset_link = f"{os.environ.get('VITE_API_BASE_URL', 'http://localhost:5173')}/reset-password/{shid}"
 
-        msg = EmailMessage()
-        msg["Subject"] = "🔐 Password Reset Request – Hostel Management System"
-        msg["From"] = "khanmkj96@gmail.com"
-        msg["To"] = user_email
-        msg.set_content(
+        enqueue(
+            conn,
+            user_email,
+            "🔐 Password Reset Request – Hostel Management System",
             f"""
 Dear {user_name},
 
@@ -583,13 +692,9 @@ If this wasn't you, ignore this message.
 
 Regards,  
 Hostel Management System Team
-"""
+""",
         )
-
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as smtp:
-            smtp.login("khanmkj96@gmail.com", "axid glzi nbmi eloy")
-            smtp.send_message(msg)
+        conn.commit()
 
         return {"message": f"📨 Reset link sent to {user_email}"}
 
@@ -600,18 +705,13 @@ Hostel Management System Team
     except Exception as e:
         print("Internal server error:", traceback.format_exc())  # Optional for debugging
         raise HTTPException(status_code=500, detail="❌ Something went wrong. Please try again.")
-        
-    finally:
-        if conn:
-            conn.close()
 
 
 
 # ✅ Endpoint: Reset Password
 @app.post("/auth/reset-password")
-def reset_password(request: ResetPasswordRequest):
+def reset_password(request: ResetPasswordRequest, conn=Depends(get_db_connection)):
     try:
-        conn = get_db_connection()
         cur = conn.cursor()
 
         # Check if SHID exists
@@ -620,7 +720,7 @@ def reset_password(request: ResetPasswordRequest):
             raise HTTPException(status_code=404, detail="User not found")
 
         # Hash password
-        hashed_pw = bcrypt.hash(request.new_password)
+        hashed_pw = hasher.hash_sync(request.new_password)
 
         # Update password
         cur.execute("UPDATE userauth SET pswd = %s WHERE shid = %s", (hashed_pw, request.shid))
@@ -628,10 +728,9 @@ def reset_password(request: ResetPasswordRequest):
 
         return {"message": "Password reset successful"}
 
+    except (HTTPException, HasherBusy):
+        raise
+
     except Exception as e:
         print("Password reset error:", e)
         raise HTTPException(status_code=500, detail="Internal server error")
-
-    finally:
-        if conn:
-            conn.close()
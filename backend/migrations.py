@@ -0,0 +1,684 @@
+# migrations.py — ordered, versioned schema migrations
+#
+# Every schema change is appended to MIGRATIONS as (version, name, statements)
+# and never edited once shipped.  `migrate()` applies whatever a database has
+# not seen yet, each migration in its own transaction, and records it in
+# schema_migrations — so a live database is upgraded in place, nothing is
+# dropped, and running it twice is a no‑op.
+#
+# Statements are written idempotently (IF NOT EXISTS / OR REPLACE) as well,
+# because databases built by the old `db.py` already have some of them
+# without the bookkeeping row.
+#
+#   python migrations.py           # apply pending migrations
+#   python migrations.py status    # list applied / pending versions
+import sys
+
+# any constant works, it only has to be the same for every process
+MIGRATION_LOCK_ID = 7_340_901
+
+MIGRATIONS = [
+    (1, "baseline tables", [
+        """
+        CREATE TABLE IF NOT EXISTS Hostel (
+            HID SERIAL PRIMARY KEY,
+            Name VARCHAR(100),
+            Location VARCHAR(100),
+            NumberOfRooms INT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS Warden (
+            WID SERIAL PRIMARY KEY,
+            Name VARCHAR(100),
+            Mail VARCHAR(100),
+            Phone VARCHAR(20),
+            Password VARCHAR(100),
+            HID INT REFERENCES Hostel(HID) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS Room (
+            RID SERIAL PRIMARY KEY,
+            RoomNumber VARCHAR(20),
+            Capacity INT,
+            HID INT REFERENCES Hostel(HID)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS Student (
+            SID SERIAL PRIMARY KEY,
+            Name VARCHAR(100),
+            Phone VARCHAR(20),
+            Mail VARCHAR(100),
+            DOB DATE,
+            HID INT REFERENCES Hostel(HID),
+            SHID VARCHAR(50) UNIQUE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS UserAuth (
+            UID SERIAL PRIMARY KEY,
+            SHID VARCHAR(50) REFERENCES Student(SHID),
+            PSWD VARCHAR(100)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS Complaint (
+            CID SERIAL PRIMARY KEY,
+            SID INT REFERENCES Student(SID),
+            Type VARCHAR(100),
+            Created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            Status VARCHAR(50) DEFAULT 'Pending',
+            Description TEXT,
+            ProofImage TEXT,
+            WithdrawCount INT DEFAULT 0,
+            IsWithdrawn BOOLEAN DEFAULT FALSE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS Admin (
+            AID         SERIAL PRIMARY KEY,
+            Email       VARCHAR(150) UNIQUE NOT NULL,
+            Password    VARCHAR(100)        NOT NULL,
+            Name        VARCHAR(100),
+            Created_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+
+    (2, "proof images in the blob store", [
+        "ALTER TABLE Complaint ADD COLUMN IF NOT EXISTS ProofBlob CHAR(64)",    # sha256 of the image
+        "ALTER TABLE Complaint ADD COLUMN IF NOT EXISTS ProofThumb CHAR(64)",   # sha256 of its thumbnail
+        # pending | ready | invalid  (images.py)
+        "ALTER TABLE Complaint ADD COLUMN IF NOT EXISTS ProofStatus VARCHAR(20) DEFAULT 'pending'",
+    ]),
+
+    (3, "keyset pagination indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_complaint_created ON Complaint (Created_at DESC, CID DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_complaint_sid_created ON Complaint (SID, Created_at DESC, CID DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_complaint_status_created ON Complaint (Status, Created_at DESC, CID DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_complaint_type_created ON Complaint (Type, Created_at DESC, CID DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_student_hid ON Student (HID, SID)",
+        "CREATE INDEX IF NOT EXISTS idx_warden_hid ON Warden (HID, WID)",
+    ]),
+
+    # per‑student complaint counters, kept current by a trigger on Complaint
+    # so the dashboard reads four numbers instead of counting the history
+    (4, "per-student complaint counters", [
+        """
+        CREATE TABLE IF NOT EXISTS StudentComplaintStats (
+            SID       INT PRIMARY KEY REFERENCES Student(SID) ON DELETE CASCADE,
+            Total     INT NOT NULL DEFAULT 0,
+            Pending   INT NOT NULL DEFAULT 0,
+            Resolved  INT NOT NULL DEFAULT 0,
+            Withdrawn INT NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE OR REPLACE FUNCTION complaint_stats_apply(p_sid INT, p_status TEXT, p_withdrawn BOOLEAN, p_sign INT)
+        RETURNS void AS $$
+        BEGIN
+            IF p_sid IS NULL THEN
+                RETURN;
+            END IF;
+            INSERT INTO StudentComplaintStats AS s (SID, Total, Pending, Resolved, Withdrawn)
+            VALUES (
+                p_sid,
+                p_sign,
+                CASE WHEN p_status = 'Pending'  THEN p_sign ELSE 0 END,
+                CASE WHEN p_status = 'Resolved' THEN p_sign ELSE 0 END,
+                CASE WHEN p_withdrawn           THEN p_sign ELSE 0 END
+            )
+            ON CONFLICT (SID) DO UPDATE SET
+                Total     = s.Total     + EXCLUDED.Total,
+                Pending   = s.Pending   + EXCLUDED.Pending,
+                Resolved  = s.Resolved  + EXCLUDED.Resolved,
+                Withdrawn = s.Withdrawn + EXCLUDED.Withdrawn;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION complaint_stats_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM complaint_stats_apply(OLD.SID, OLD.Status, COALESCE(OLD.IsWithdrawn, FALSE), -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM complaint_stats_apply(NEW.SID, NEW.Status, COALESCE(NEW.IsWithdrawn, FALSE), 1);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS complaint_stats ON Complaint",
+        """
+        CREATE TRIGGER complaint_stats
+        AFTER INSERT OR DELETE OR UPDATE OF SID, Status, IsWithdrawn ON Complaint
+        FOR EACH ROW EXECUTE FUNCTION complaint_stats_trigger()
+        """,
+        # count what an existing database already holds
+        """
+        INSERT INTO StudentComplaintStats (SID, Total, Pending, Resolved, Withdrawn)
+        SELECT SID,
+               COUNT(*),
+               COUNT(*) FILTER (WHERE Status = 'Pending'),
+               COUNT(*) FILTER (WHERE Status = 'Resolved'),
+               COUNT(*) FILTER (WHERE IsWithdrawn)
+        FROM   Complaint
+        WHERE  SID IS NOT NULL
+        GROUP  BY SID
+        ON CONFLICT (SID) DO NOTHING
+        """,
+    ]),
+
+    (5, "hot-path and partial indexes", [
+        # logins and password resets look credentials up by SHID / Mail
+        "CREATE INDEX IF NOT EXISTS idx_userauth_shid ON UserAuth (SHID)",
+        "CREATE INDEX IF NOT EXISTS idx_warden_mail ON Warden (Mail)",
+        "CREATE INDEX IF NOT EXISTS idx_room_hid ON Room (HID)",
+        # pending complaints are a small, hot slice (admin count, overdue list)
+        """
+        CREATE INDEX IF NOT EXISTS idx_complaint_pending
+        ON Complaint (Created_at, CID) WHERE Status = 'Pending'
+        """,
+        # a student's live (not withdrawn) complaints
+        """
+        CREATE INDEX IF NOT EXISTS idx_complaint_sid_active
+        ON Complaint (SID, Created_at DESC, CID DESC) WHERE NOT IsWithdrawn
+        """,
+    ]),
+
+    # complaint counts per (creation day, hostel, student, type, current status)
+    # — trend endpoints (trends.py) read only this, never Complaint itself.
+    # A student's rows always carry their current hostel.
+    (6, "daily complaint rollups", [
+        """
+        CREATE TABLE IF NOT EXISTS ComplaintDaily (
+            Day    DATE         NOT NULL,
+            SID    INT          NOT NULL REFERENCES Student(SID) ON DELETE CASCADE,
+            HID    INT          NOT NULL,
+            Type   VARCHAR(100) NOT NULL,
+            Status VARCHAR(50)  NOT NULL,
+            Total  INT          NOT NULL DEFAULT 0,
+            PRIMARY KEY (SID, Day, Type, Status)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_daily_hid_day ON ComplaintDaily (HID, Day)",
+        "CREATE INDEX IF NOT EXISTS idx_daily_day ON ComplaintDaily (Day)",
+        """
+        CREATE OR REPLACE FUNCTION complaint_daily_apply(p_sid INT, p_created TIMESTAMP, p_type TEXT, p_status TEXT, p_sign INT)
+        RETURNS void AS $$
+        BEGIN
+            IF p_sid IS NULL THEN
+                RETURN;
+            END IF;
+            INSERT INTO ComplaintDaily AS d (Day, SID, HID, Type, Status, Total)
+            SELECT COALESCE(p_created, CURRENT_TIMESTAMP)::date, p_sid, COALESCE(s.HID, 0),
+                   COALESCE(p_type, ''), COALESCE(p_status, ''), p_sign
+            FROM   Student s WHERE s.SID = p_sid
+            ON CONFLICT (SID, Day, Type, Status) DO UPDATE SET Total = d.Total + EXCLUDED.Total;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION complaint_daily_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM complaint_daily_apply(OLD.SID, OLD.Created_at, OLD.Type, OLD.Status, -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM complaint_daily_apply(NEW.SID, NEW.Created_at, NEW.Type, NEW.Status, 1);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS complaint_daily ON Complaint",
+        """
+        CREATE TRIGGER complaint_daily
+        AFTER INSERT OR DELETE OR UPDATE OF SID, Created_at, Type, Status ON Complaint
+        FOR EACH ROW EXECUTE FUNCTION complaint_daily_trigger()
+        """,
+        # a student changing hostel takes their history along
+        """
+        CREATE OR REPLACE FUNCTION complaint_daily_student_moved() RETURNS trigger AS $$
+        BEGIN
+            UPDATE ComplaintDaily SET HID = COALESCE(NEW.HID, 0) WHERE SID = NEW.SID;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS complaint_daily_student_moved ON Student",
+        """
+        CREATE TRIGGER complaint_daily_student_moved
+        AFTER UPDATE OF HID ON Student
+        FOR EACH ROW WHEN (OLD.HID IS DISTINCT FROM NEW.HID)
+        EXECUTE FUNCTION complaint_daily_student_moved()
+        """,
+        """
+        INSERT INTO ComplaintDaily (Day, SID, HID, Type, Status, Total)
+        SELECT c.Created_at::date, c.SID, COALESCE(s.HID, 0),
+               COALESCE(c.Type, ''), COALESCE(c.Status, ''), COUNT(*)
+        FROM   Complaint c JOIN Student s ON s.SID = c.SID
+        GROUP  BY 1, 2, 3, 4, 5
+        ON CONFLICT (SID, Day, Type, Status) DO NOTHING
+        """,
+    ]),
+
+    # row changes → NOTIFY hostel_changes (bus.py) so every worker can drop
+    # its cached copies and relay push events.  Bulk statements set
+    # `app.bulk_changes = on` locally and send one summary notification
+    # themselves instead of one per row.
+    (7, "change notifications", [
+        """
+        CREATE OR REPLACE FUNCTION notify_change() RETURNS trigger AS $$
+        DECLARE
+            rec     RECORD;
+            payload JSONB;
+        BEGIN
+            IF current_setting('app.bulk_changes', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP = 'DELETE' THEN rec := OLD; ELSE rec := NEW; END IF;
+
+            payload := jsonb_build_object('table', lower(TG_TABLE_NAME), 'op', lower(TG_OP));
+            IF TG_TABLE_NAME = 'complaint' THEN
+                payload := payload || jsonb_build_object(
+                    'cid', rec.CID, 'status', rec.Status, 'type', rec.Type,
+                    'shid', (SELECT SHID FROM Student WHERE SID = rec.SID),
+                    'hid',  (SELECT HID  FROM Student WHERE SID = rec.SID));
+                IF TG_OP = 'UPDATE' THEN
+                    payload := payload || jsonb_build_object('old_status', OLD.Status);
+                    IF OLD.SID IS DISTINCT FROM NEW.SID THEN
+                        payload := payload || jsonb_build_object(
+                            'old_shid', (SELECT SHID FROM Student WHERE SID = OLD.SID));
+                    END IF;
+                END IF;
+            ELSIF TG_TABLE_NAME = 'student' THEN
+                payload := payload || jsonb_build_object('sid', rec.SID, 'shid', rec.SHID, 'hid', rec.HID);
+                IF TG_OP = 'UPDATE' AND OLD.SHID IS DISTINCT FROM NEW.SHID THEN
+                    payload := payload || jsonb_build_object('old_shid', OLD.SHID);
+                END IF;
+            ELSIF TG_TABLE_NAME = 'warden' THEN
+                payload := payload || jsonb_build_object('wid', rec.WID, 'hid', rec.HID);
+            ELSIF TG_TABLE_NAME = 'hostel' THEN
+                payload := payload || jsonb_build_object('hid', rec.HID);
+            END IF;
+
+            PERFORM pg_notify('hostel_changes', payload::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS notify_change ON Complaint",
+        "CREATE TRIGGER notify_change AFTER INSERT OR UPDATE OR DELETE ON Complaint "
+        "FOR EACH ROW EXECUTE FUNCTION notify_change()",
+        "DROP TRIGGER IF EXISTS notify_change ON Student",
+        "CREATE TRIGGER notify_change AFTER INSERT OR UPDATE OR DELETE ON Student "
+        "FOR EACH ROW EXECUTE FUNCTION notify_change()",
+        "DROP TRIGGER IF EXISTS notify_change ON Warden",
+        "CREATE TRIGGER notify_change AFTER INSERT OR UPDATE OR DELETE ON Warden "
+        "FOR EACH ROW EXECUTE FUNCTION notify_change()",
+        "DROP TRIGGER IF EXISTS notify_change ON Hostel",
+        "CREATE TRIGGER notify_change AFTER INSERT OR UPDATE OR DELETE ON Hostel "
+        "FOR EACH ROW EXECUTE FUNCTION notify_change()",
+    ]),
+
+    # full‑text search (GET /admin/complaints/search).  Postgres keeps the
+    # generated column in step with Type / Description on every write; the
+    # type is weighted above the description when ranking.
+    (8, "complaint full-text search", [
+        """
+        ALTER TABLE Complaint ADD COLUMN IF NOT EXISTS SearchVector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', COALESCE(Type, '')), 'A') ||
+            setweight(to_tsvector('english', COALESCE(Description, '')), 'B')
+        ) STORED
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_complaint_search ON Complaint USING GIN (SearchVector)",
+    ]),
+
+    # near‑duplicate clusters (dedup.py): each complaint's MinHash signature,
+    # its LSH buckets, and the cluster it joined
+    (9, "near-duplicate complaint clusters", [
+        "ALTER TABLE Complaint ADD COLUMN IF NOT EXISTS MinHash INT[]",
+        "ALTER TABLE Complaint ADD COLUMN IF NOT EXISTS ClusterID INT",
+        "CREATE INDEX IF NOT EXISTS idx_complaint_cluster ON Complaint (ClusterID) WHERE ClusterID IS NOT NULL",
+        """
+        CREATE TABLE IF NOT EXISTS ComplaintBucket (
+            Bucket BIGINT NOT NULL,
+            CID    INT    NOT NULL REFERENCES Complaint(CID) ON DELETE CASCADE,
+            PRIMARY KEY (Bucket, CID)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_bucket_cid ON ComplaintBucket (CID)",
+        # index complaint p_cid (MinHash already stored) under p_buckets and
+        # join it to the cluster of its most similar open neighbour
+        """
+        CREATE OR REPLACE FUNCTION complaint_cluster_assign(
+            p_cid INT, p_scope BIGINT, p_buckets BIGINT[], p_threshold REAL, p_window_days INT
+        ) RETURNS INT AS $$
+        DECLARE
+            sig       INT[];
+            best      RECORD;
+            v_cluster INT;
+        BEGIN
+            -- one complaint of a hostel × type at a time, so two simultaneous
+            -- duplicates cannot both miss each other
+            PERFORM pg_advisory_xact_lock(p_scope);
+            SELECT MinHash INTO sig FROM Complaint WHERE CID = p_cid;
+            IF sig IS NULL THEN
+                RETURN NULL;
+            END IF;
+
+            INSERT INTO ComplaintBucket (Bucket, CID)
+            SELECT DISTINCT unnest(p_buckets), p_cid
+            ON CONFLICT DO NOTHING;
+
+            SELECT c.CID, c.ClusterID,
+                   (SELECT COUNT(*) FILTER (WHERE x = y) FROM unnest(c.MinHash, sig) AS u (x, y))::real
+                       / cardinality(sig) AS similarity
+            INTO   best
+            FROM   Complaint c
+            WHERE  c.CID IN (SELECT b.CID FROM ComplaintBucket b WHERE b.Bucket = ANY (p_buckets))
+              AND  c.CID <> p_cid
+              AND  c.Created_at >= NOW() - p_window_days * INTERVAL '1 day'
+              AND  NOT COALESCE(c.IsWithdrawn, FALSE)
+              AND  c.Status NOT IN ('Resolved', 'Rejected', 'Withdrawn')
+            ORDER  BY similarity DESC, c.CID
+            LIMIT  1;
+            IF NOT FOUND OR best.similarity < p_threshold THEN
+                RETURN NULL;
+            END IF;
+
+            v_cluster := COALESCE(best.ClusterID, best.CID);
+            UPDATE Complaint SET ClusterID = v_cluster
+            WHERE  CID IN (p_cid, best.CID) AND ClusterID IS DISTINCT FROM v_cluster;
+            RETURN v_cluster;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+    ]),
+
+    # mail queued by requests, sent by the outbox thread (outbox.py)
+    (10, "email outbox", [
+        """
+        CREATE TABLE IF NOT EXISTS EmailOutbox (
+            ID          BIGSERIAL    PRIMARY KEY,
+            Recipient   VARCHAR(254) NOT NULL,
+            Subject     TEXT         NOT NULL,
+            Body        TEXT         NOT NULL,
+            Status      VARCHAR(10)  NOT NULL DEFAULT 'pending',  -- pending | sent | failed
+            Attempts    INT          NOT NULL DEFAULT 0,
+            NextAttempt TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            LastError   TEXT,
+            Created_at  TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            Sent_at     TIMESTAMP
+        )
+        """,
+        # claiming due mail and the queue‑depth stats only ever look at unsent rows
+        "CREATE INDEX IF NOT EXISTS idx_outbox_unsent ON EmailOutbox (Status, NextAttempt, ID) WHERE Status <> 'sent'",
+    ]),
+    (11, "overdue escalation", [
+        # response deadline per hostel and/or complaint type; NULL = any.
+        # The most specific row wins: hostel+type, hostel, type, the default.
+        """
+        CREATE TABLE IF NOT EXISTS SlaThreshold (
+            ID    SERIAL       PRIMARY KEY,
+            HID   INT          REFERENCES Hostel(HID) ON DELETE CASCADE,
+            Type  VARCHAR(100),
+            Hours INT          NOT NULL CHECK (Hours > 0)
+        )
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_sla_scope ON SlaThreshold ((COALESCE(HID, 0)), (COALESCE(Type, '')))",
+        """
+        INSERT INTO SlaThreshold (HID, Type, Hours) VALUES (NULL, NULL, 72)
+        ON CONFLICT DO NOTHING
+        """,
+        # one row per complaint that went past its deadline: never escalated twice
+        """
+        CREATE TABLE IF NOT EXISTS ComplaintEscalation (
+            CID          INT       PRIMARY KEY REFERENCES Complaint(CID) ON DELETE CASCADE,
+            HID          INT,
+            Hours        INT       NOT NULL,
+            Due_at       TIMESTAMP NOT NULL,
+            Escalated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            Digests      INT       NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_escalation_hid_due ON ComplaintEscalation (HID, Due_at, CID)",
+        # how far each background job has got
+        """
+        CREATE TABLE IF NOT EXISTS SchedulerState (
+            Name       VARCHAR(50) PRIMARY KEY,
+            Watermark  TIMESTAMP,
+            Updated_at TIMESTAMP   NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (12, "shared rate limit buckets", [
+        # token buckets shared by all workers (ratelimit.py, RATE_LIMIT_STORE=postgres);
+        # losing them in a crash only forgives a few attempts, so skip the WAL
+        """
+        CREATE UNLOGGED TABLE IF NOT EXISTS RateLimitBucket (
+            Key        VARCHAR(300) PRIMARY KEY,
+            Tokens     REAL         NOT NULL,
+            Updated_at TIMESTAMP    NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_ratelimit_updated ON RateLimitBucket (Updated_at)",
+        # take one token from p_key's bucket: 0 when allowed, else seconds
+        # until a token is back.  One clock (the server's) for every worker.
+        """
+        CREATE OR REPLACE FUNCTION rate_limit_take(p_key VARCHAR, p_capacity REAL, p_rate REAL)
+        RETURNS REAL AS $$
+        DECLARE
+            v_now    TIMESTAMP := clock_timestamp();
+            v_tokens REAL;
+        BEGIN
+            INSERT INTO RateLimitBucket (Key, Tokens, Updated_at) VALUES (p_key, p_capacity, v_now)
+            ON CONFLICT (Key) DO NOTHING;
+
+            SELECT LEAST(p_capacity, Tokens + EXTRACT(EPOCH FROM v_now - Updated_at) * p_rate)
+            INTO   v_tokens
+            FROM   RateLimitBucket WHERE Key = p_key
+            FOR UPDATE;
+
+            IF v_tokens < 1 THEN
+                RETURN (1 - v_tokens) / p_rate;
+            END IF;
+            UPDATE RateLimitBucket SET Tokens = v_tokens - 1, Updated_at = v_now WHERE Key = p_key;
+            RETURN 0;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+    ]),
+    (13, "cluster candidates as an inlinable SQL function", [
+        # the near‑duplicate lookup of complaint_cluster_assign on its own: a
+        # single‑SELECT, STABLE SQL function is inlined into the calling
+        # query, so benchmarks/check_query_plans.py can EXPLAIN the real thing
+        """
+        CREATE OR REPLACE FUNCTION complaint_cluster_candidates(
+            p_cid INT, p_sig INT[], p_buckets BIGINT[], p_window_days INT
+        ) RETURNS TABLE (cid INT, clusterid INT, similarity REAL) AS $$
+            SELECT c.CID, c.ClusterID,
+                   (SELECT COUNT(*) FILTER (WHERE x = y) FROM unnest(c.MinHash, p_sig) AS u (x, y))::real
+                       / cardinality(p_sig)
+            FROM   Complaint c
+            WHERE  c.CID IN (SELECT b.CID FROM ComplaintBucket b WHERE b.Bucket = ANY (p_buckets))
+              AND  c.CID <> p_cid
+              AND  c.Created_at >= NOW() - p_window_days * INTERVAL '1 day'
+              AND  NOT COALESCE(c.IsWithdrawn, FALSE)
+              AND  c.Status NOT IN ('Resolved', 'Rejected', 'Withdrawn')
+            ORDER  BY 3 DESC, c.CID
+            LIMIT  1
+        $$ LANGUAGE sql STABLE
+        """,
+        """
+        CREATE OR REPLACE FUNCTION complaint_cluster_assign(
+            p_cid INT, p_scope BIGINT, p_buckets BIGINT[], p_threshold REAL, p_window_days INT
+        ) RETURNS INT AS $$
+        DECLARE
+            sig       INT[];
+            best      RECORD;
+            v_cluster INT;
+        BEGIN
+            -- one complaint of a hostel × type at a time, so two simultaneous
+            -- duplicates cannot both miss each other
+            PERFORM pg_advisory_xact_lock(p_scope);
+            SELECT MinHash INTO sig FROM Complaint WHERE CID = p_cid;
+            IF sig IS NULL THEN
+                RETURN NULL;
+            END IF;
+
+            INSERT INTO ComplaintBucket (Bucket, CID)
+            SELECT DISTINCT unnest(p_buckets), p_cid
+            ON CONFLICT DO NOTHING;
+
+            SELECT * INTO best FROM complaint_cluster_candidates(p_cid, sig, p_buckets, p_window_days);
+            IF NOT FOUND OR best.similarity < p_threshold THEN
+                RETURN NULL;
+            END IF;
+
+            v_cluster := COALESCE(best.clusterid, best.cid);
+            UPDATE Complaint SET ClusterID = v_cluster
+            WHERE  CID IN (p_cid, best.cid) AND ClusterID IS DISTINCT FROM v_cluster;
+            RETURN v_cluster;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+    ]),
+    (14, "change notifications carry their send time", [
+        # `ts` (epoch seconds, when the row changed) lets each worker report
+        # how long a notification took to reach it (/admin/stats/bus)
+        """
+        CREATE OR REPLACE FUNCTION notify_change() RETURNS trigger AS $$
+        DECLARE
+            rec     RECORD;
+            payload JSONB;
+        BEGIN
+            IF current_setting('app.bulk_changes', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP = 'DELETE' THEN rec := OLD; ELSE rec := NEW; END IF;
+
+            payload := jsonb_build_object('table', lower(TG_TABLE_NAME), 'op', lower(TG_OP),
+                                          'ts', extract(epoch FROM clock_timestamp()));
+            IF TG_TABLE_NAME = 'complaint' THEN
+                payload := payload || jsonb_build_object(
+                    'cid', rec.CID, 'status', rec.Status, 'type', rec.Type,
+                    'shid', (SELECT SHID FROM Student WHERE SID = rec.SID),
+                    'hid',  (SELECT HID  FROM Student WHERE SID = rec.SID));
+                IF TG_OP = 'UPDATE' THEN
+                    payload := payload || jsonb_build_object('old_status', OLD.Status);
+                    IF OLD.SID IS DISTINCT FROM NEW.SID THEN
+                        payload := payload || jsonb_build_object(
+                            'old_shid', (SELECT SHID FROM Student WHERE SID = OLD.SID));
+                    END IF;
+                END IF;
+            ELSIF TG_TABLE_NAME = 'student' THEN
+                payload := payload || jsonb_build_object('sid', rec.SID, 'shid', rec.SHID, 'hid', rec.HID);
+                IF TG_OP = 'UPDATE' AND OLD.SHID IS DISTINCT FROM NEW.SHID THEN
+                    payload := payload || jsonb_build_object('old_shid', OLD.SHID);
+                END IF;
+            ELSIF TG_TABLE_NAME = 'warden' THEN
+                payload := payload || jsonb_build_object('wid', rec.WID, 'hid', rec.HID);
+            ELSIF TG_TABLE_NAME = 'hostel' THEN
+                payload := payload || jsonb_build_object('hid', rec.HID);
+            END IF;
+
+            PERFORM pg_notify('hostel_changes', payload::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+    ]),
+]
+
+
+def _ensure_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            Version    INT PRIMARY KEY,
+            Name       VARCHAR(200) NOT NULL,
+            Applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(conn):
+    with conn.cursor() as cur:
+        _ensure_table(cur)
+        cur.execute("SELECT Version FROM schema_migrations")
+        versions = {row[0] for row in cur.fetchall()}
+    conn.commit()
+    return versions
+
+
+def migrate(conn, log=print):
+    """
+    Apply pending migrations in order and return the versions applied.
+    A session advisory lock serialises concurrent runs (several workers
+    booting at once): the others wait, then find nothing left to do.
+    """
+    conn.autocommit = False
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+    conn.commit()
+
+    applied = []
+    try:
+        done = applied_versions(conn)
+        for version, name, statements in MIGRATIONS:
+            if version in done:
+                continue
+            try:
+                with conn.cursor() as cur:
+                    for statement in statements:
+                        cur.execute(statement)
+                    cur.execute(
+                        "INSERT INTO schema_migrations (Version, Name) VALUES (%s, %s)",
+                        (version, name),
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                log(f"❌ migration {version:03d} ({name}) failed")
+                raise
+            applied.append(version)
+            log(f"✔ applied migration {version:03d}: {name}")
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+        conn.commit()
+    return applied
+
+
+def status(conn):
+    done = applied_versions(conn)
+    return [(version, name, version in done) for version, name, _ in MIGRATIONS]
+
+
+def main(argv):
+    from db import connect
+
+    command = argv[1] if len(argv) > 1 else "migrate"
+    conn = connect()
+    try:
+        if command == "migrate":
+            if not migrate(conn):
+                print("✔ Schema is up to date")
+        elif command == "status":
+            for version, name, done in status(conn):
+                print(f"{'✔' if done else '·'} {version:03d}  {name}")
+        else:
+            print("usage: python migrations.py [migrate|status]")
+            return 2
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,297 @@
+# outbox.py — e‑mail outbox: requests queue mail, a background thread sends it
+#
+# Requests never talk to the mail server.  `enqueue()` inserts the message
+# into EmailOutbox inside the caller's transaction (a rolled back request
+# sends nothing) and pokes the change bus; each worker's `mailer` thread
+#   * wakes on that notification, or every OUTBOX_POLL_SECONDS,
+#   * claims up to OUTBOX_BATCH due messages with FOR UPDATE SKIP LOCKED —
+#     two workers never take the same message — leasing them for
+#     OUTBOX_LEASE_SECONDS, so a worker that dies mid‑batch only delays them,
+#   * sends the batch over ONE logged‑in SMTP connection that stays open
+#     between batches (closed after OUTBOX_SMTP_IDLE_SECONDS idle, reopened
+#     when the server drops it),
+#   * marks each message sent, or due again after an exponential backoff
+#     with jitter.  A permanent refusal (5xx) or OUTBOX_MAX_ATTEMPTS
+#     attempts leave it `failed`, with the last error kept.
+#
+# The server comes from SMTP_HOST / SMTP_PORT / SMTP_SECURITY (ssl | starttls
+# | none) / SMTP_USER / SMTP_PASSWORD / MAIL_FROM; point them at a local
+# stand‑in to try it out (benchmarks/check_outbox.py).  Nothing defaults to a
+# real server or account: without SMTP_HOST (and a sender, MAIL_FROM or
+# SMTP_USER) the mailer does not start and queued mail waits in EmailOutbox
+# until a worker that has them runs.  It logs in only when SMTP_USER is set,
+# so an unauthenticated local relay works too.
+import os
+import random
+import smtplib
+import ssl
+import threading
+import time
+from collections import deque
+from email.message import EmailMessage
+
+from psycopg2.extras import execute_values
+
+from bus import CHANNEL, bus
+from db import pool
+
+SMTP_HOST = os.environ.get("SMTP_HOST", "")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "465"))
+SMTP_SECURITY = os.environ.get("SMTP_SECURITY", "ssl")
+SMTP_USER = os.environ.get("SMTP_USER", "")
+SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD", "")
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", "30"))
+MAIL_FROM = os.environ.get("MAIL_FROM", SMTP_USER)
+
+OUTBOX_BATCH = int(os.environ.get("OUTBOX_BATCH", "50"))
+OUTBOX_POLL_SECONDS = float(os.environ.get("OUTBOX_POLL_SECONDS", "30"))
+OUTBOX_LEASE_SECONDS = int(os.environ.get("OUTBOX_LEASE_SECONDS", "300"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_SECONDS = float(os.environ.get("OUTBOX_BACKOFF_SECONDS", "30"))
+OUTBOX_BACKOFF_MAX_SECONDS = float(os.environ.get("OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+OUTBOX_SMTP_IDLE_SECONDS = float(os.environ.get("OUTBOX_SMTP_IDLE_SECONDS", "60"))
+
+_WAKE = '{"table":"outbox","op":"insert"}'  # bus message: something was queued
+
+_CLAIM = """
+    UPDATE EmailOutbox o
+    SET    Attempts = o.Attempts + 1, NextAttempt = NOW() + %s * INTERVAL '1 second'
+    WHERE  o.ID IN (
+        SELECT ID FROM EmailOutbox
+        WHERE  Status = 'pending' AND NextAttempt <= NOW()
+        ORDER  BY NextAttempt, ID
+        LIMIT  %s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING o.ID, o.Recipient, o.Subject, o.Body, o.Attempts
+"""
+
+
+def enqueue(conn, recipient, subject, body):
+    """Queue a message in the caller's (psycopg2) transaction; it goes out after commit."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO EmailOutbox (Recipient, Subject, Body) VALUES (%s, %s, %s) RETURNING ID",
+            (recipient, subject, body),
+        )
+        message_id = cur.fetchone()[0]
+        cur.execute("SELECT pg_notify(%s, %s)", (CHANNEL, _WAKE))
+    return message_id
+
+
+def _server_down(error):
+    """The server (or our login) is the problem, not one message."""
+    if isinstance(error, (smtplib.SMTPConnectError, smtplib.SMTPServerDisconnected,
+                          smtplib.SMTPAuthenticationError)):
+        return True
+    # SMTPException is an OSError too; a plain OSError is the network
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def _backoff(attempts):
+    delay = min(OUTBOX_BACKOFF_MAX_SECONDS, OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)  # spread retries of one outage apart
+
+
+def _permanent(error):
+    """A 5xx answer about this message (not about our login) won't change on retry."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if _server_down(error):
+        return False
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+class Mailer:
+    """The sending thread, its SMTP connection and counters for /admin/stats/outbox."""
+
+    def __init__(self):
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._smtp = None
+        self._smtp_used = 0.0
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=10_000)  # monotonic time of each recent send
+        self._stats = {"sent": 0, "retried": 0, "failed": 0, "batches": 0,
+                       "connections": 0, "errors": 0, "send_seconds": 0.0}
+
+    # ── lifecycle ─────────────────────────────────────────
+    def start(self):
+        if not (SMTP_HOST and MAIL_FROM):
+            print("⚠️ Outbox mailer not started: set SMTP_HOST and MAIL_FROM (or SMTP_USER)")
+            return
+        if self._thread is None:
+            bus.on("outbox", lambda _message: self.wake())
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wake(self):
+        """Thread‑safe: look for due messages now."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                claimed = self.run_once()
+            except Exception as e:  # database away: try again at the next poll
+                claimed = 0
+                self._count("errors")
+                print("❌ Outbox batch failed:", e)
+            if claimed < OUTBOX_BATCH:
+                if self._smtp is not None and time.monotonic() - self._smtp_used > OUTBOX_SMTP_IDLE_SECONDS:
+                    self._close()
+                self._wake.wait(min(OUTBOX_POLL_SECONDS, OUTBOX_SMTP_IDLE_SECONDS))
+        self._close()
+
+    # ── one batch ─────────────────────────────────────────
+    def run_once(self):
+        """Claim and send one batch; returns how many messages were claimed."""
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(_CLAIM, (OUTBOX_LEASE_SECONDS, OUTBOX_BATCH))
+                batch = cur.fetchall()
+            conn.commit()
+        if not batch:
+            return 0
+
+        sent, retry = [], []  # retry: (id, delay seconds, error, final)
+        down = None  # once the server is unreachable, don't wait on it for every message
+        for message_id, recipient, subject, body, attempts in batch:
+            started = time.perf_counter()
+            error = down or self._send(recipient, subject, body)
+            with self._lock:
+                self._stats["send_seconds"] += time.perf_counter() - started
+            if _server_down(error):
+                down = error
+            if error is None:
+                sent.append(message_id)
+                continue
+            final = _permanent(error) or attempts >= OUTBOX_MAX_ATTEMPTS
+            retry.append((message_id, 0 if final else _backoff(attempts), repr(error)[:500], final))
+
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                if sent:
+                    cur.execute(
+                        "UPDATE EmailOutbox SET Status = 'sent', Sent_at = NOW(), LastError = NULL "
+                        "WHERE ID = ANY(%s)",
+                        (sent,),
+                    )
+                if retry:
+                    execute_values(cur, """
+                        UPDATE EmailOutbox o
+                        SET    NextAttempt = NOW() + v.delay * INTERVAL '1 second',
+                               LastError   = v.error,
+                               Status      = CASE WHEN v.final THEN 'failed' ELSE 'pending' END
+                        FROM   (VALUES %s) AS v (id, delay, error, final)
+                        WHERE  o.ID = v.id
+                    """, retry, template="(%s, %s::float8, %s, %s)")
+            conn.commit()
+
+        now = time.monotonic()
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["sent"] += len(sent)
+            self._stats["failed"] += sum(1 for r in retry if r[3])
+            self._stats["retried"] += sum(1 for r in retry if not r[3])
+            self._recent.extend([now] * len(sent))
+        return len(batch)
+
+    def _send(self, recipient, subject, body):
+        """Send one message; returns None or the error."""
+        msg = EmailMessage()
+        msg["Subject"] = subject
+        msg["From"] = MAIL_FROM
+        msg["To"] = recipient
+        msg.set_content(body)
+        for reconnect in (False, True):  # the server may have dropped an idle connection
+            try:
+                self._connection().send_message(msg)
+                self._smtp_used = time.monotonic()
+                return None
+            except smtplib.SMTPServerDisconnected as e:
+                self._close()
+                if reconnect:
+                    return e
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused) as e:
+                return e  # smtplib already RSET the transaction; the connection is fine
+            except (smtplib.SMTPException, OSError) as e:
+                self._close()
+                return e
+
+    # ── SMTP connection ───────────────────────────────────
+    def _connection(self):
+        if self._smtp is None:
+            if SMTP_SECURITY == "ssl":
+                smtp = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT,
+                                        context=ssl.create_default_context())
+            else:
+                smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+                if SMTP_SECURITY == "starttls":
+                    smtp.starttls(context=ssl.create_default_context())
+            try:
+                if SMTP_USER:
+                    smtp.login(SMTP_USER, SMTP_PASSWORD)
+            except BaseException:
+                smtp.close()
+                raise
+            self._smtp = smtp
+            self._smtp_used = time.monotonic()
+            self._count("connections")
+        return self._smtp
+
+    def _close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._smtp.close()
+            self._smtp = None
+
+    # ── stats ─────────────────────────────────────────────
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self, conn):
+        """Queue depth (all workers, from the table) plus this worker's counters."""
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT COUNT(*) FILTER (WHERE Status = 'pending'),
+                       COUNT(*) FILTER (WHERE Status = 'pending' AND NextAttempt <= NOW()),
+                       COUNT(*) FILTER (WHERE Status = 'failed'),
+                       EXTRACT(EPOCH FROM NOW() - MIN(Created_at) FILTER (WHERE Status = 'pending'))
+                FROM   EmailOutbox WHERE Status <> 'sent'
+            """)
+            pending, due, failed, oldest = cur.fetchone()
+        conn.commit()
+
+        now = time.monotonic()
+        with self._lock:
+            s = dict(self._stats)
+            last_minute = sum(1 for t in self._recent if now - t <= 60)
+        send_seconds = s.pop("send_seconds")
+        return {
+            "queue": {"pending": pending, "due": due, "failed": failed,
+                      "oldest_pending_seconds": round(float(oldest), 1) if oldest is not None else None},
+            "worker": {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "connected": self._smtp is not None,
+                **s,
+                "sent_last_minute": last_minute,
+                "avg_send_ms": round(send_seconds / s["sent"] * 1000, 1) if s["sent"] else 0.0,
+            },
+        }
+
+
+mailer = Mailer()
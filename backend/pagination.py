@@ -0,0 +1,122 @@
+# pagination.py — keyset (cursor) pagination + shared list filters
+#
+# OFFSET n makes Postgres walk and throw away n rows, so page 500 costs 500×
+# page 1.  Keyset pagination remembers the sort key of the last row instead
+# and asks for rows strictly after it — `WHERE (Created_at, CID) < (…, …)` —
+# which an index on the sort columns answers by seeking straight there.
+#
+# The cursor handed to clients is opaque (base64 of the last row's key) so
+# we can change its contents without breaking anyone.
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Optional
+
+from fastapi import HTTPException, Query
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+class Page:
+    """
+    Query parameters shared by every list endpoint (`limit`, `cursor`).
+    `keyset()` builds the WHERE fragment for the requested sort key and
+    `result()` trims the extra row we fetched to learn whether there is more.
+    """
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+    def keyset(self, columns, descending=True, casts=None):
+        """`(col1, col2) < (%s, %s)` for the cursor, or (None, []) on page 1."""
+        if not self.cursor:
+            return None, []
+        values = decode_cursor(self.cursor, len(columns))
+        casts = casts or [""] * len(columns)
+        op = "<" if descending else ">"
+        placeholders = ", ".join(f"%s{cast}" for cast in casts)
+        return f"({', '.join(columns)}) {op} ({placeholders})", values
+
+    @property
+    def fetch(self):
+        return self.limit + 1
+
+    def result(self, rows, key):
+        """Returns (rows, next_cursor); `key(row)` gives the row's sort key."""
+        if len(rows) <= self.limit:
+            return rows, None
+        rows = rows[: self.limit]
+        return rows, encode_cursor(key(rows[-1]))
+
+
+class ComplaintFilters:
+    """Server‑side filters for complaint lists (and exports / search later on)."""
+
+    def __init__(
+        self,
+        status: Optional[str] = None,
+        hid: Optional[int] = Query(None, description="hostel id"),
+        type: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        cluster_id: Optional[int] = Query(None, description="near-duplicate cluster (dedup.py)"),
+    ):
+        self.status = status
+        self.hid = hid
+        self.type = type
+        self.created_from = created_from
+        self.created_to = created_to
+        self.cluster_id = cluster_id
+
+    def where(self, complaint="c", student="s"):
+        """
+        Return (list_of_sql_conditions, params) using the given table aliases.
+        Pass student=None when Student isn't joined (hid is then ignored).
+        """
+        clauses, params = [], []
+        if self.status:
+            clauses.append(f"{complaint}.Status = %s")
+            params.append(self.status)
+        if self.hid is not None and student:
+            clauses.append(f"{student}.HID = %s")
+            params.append(self.hid)
+        if self.type:
+            clauses.append(f"{complaint}.Type = %s")
+            params.append(self.type)
+        if self.created_from:
+            clauses.append(f"{complaint}.Created_at >= %s")
+            params.append(self.created_from)
+        if self.created_to:
+            clauses.append(f"{complaint}.Created_at < %s")
+            params.append(self.created_to)
+        if self.cluster_id is not None:
+            clauses.append(f"{complaint}.ClusterID = %s")
+            params.append(self.cluster_id)
+        return clauses, params
+
+
+def where_sql(clauses):
+    return ("WHERE " + " AND ".join(clauses)) if clauses else ""
@@ -0,0 +1,136 @@
+# principal.py — SHID → (SID, HID) without a query per request
+#
+# Student routes are addressed by SHID, but every table keys on SID, so each
+# of them used to open with `SELECT SID FROM Student WHERE SHID = %s`.  The
+# mapping almost never changes: it is kept here in a bounded LRU map and
+# dropped when it does —
+#   * admin update / delete of a student calls `principals.invalidate(shid)`,
+#   * any other Student change (another worker, psql) arrives via bus.py.
+# Unknown SHIDs are not cached, so a newly added student resolves at once.
+#
+# `current_student` resolves the logged‑in student from the session, for
+# routes that should not trust a SHID from the URL.
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from fastapi import HTTPException, Request
+
+from db_async import async_pool
+
+PRINCIPAL_CACHE_SIZE = int(os.environ.get("PRINCIPAL_CACHE_SIZE", "50000"))
+PRINCIPAL_TTL = float(os.environ.get("PRINCIPAL_TTL", "600"))
+
+Principal = namedtuple("Principal", "shid sid hid")
+
+LOOKUP_SQL = "SELECT SID, HID FROM Student WHERE SHID = %s"
+
+
+class PrincipalCache:
+    """Thread‑safe TTL + LRU map from SHID to Principal."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # shid → (principal, expires)
+        self._generation = 0           # bumped on every invalidation
+        self._stats = {"hits": 0, "misses": 0, "invalidated": 0, "evictions": 0}
+
+    def get(self, shid):
+        with self._lock:
+            cached = self._entries.get(shid)
+            if cached is None or cached[1] < time.monotonic():
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(shid)
+            self._stats["hits"] += 1
+            return cached[0]
+
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def put(self, principal, generation):
+        """Store a looked‑up principal unless an invalidation raced the lookup."""
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[principal.shid] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(principal.shid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, *shids):
+        with self._lock:
+            self._generation += 1
+            for shid in shids:
+                if self._entries.pop(shid, None) is not None:
+                    self._stats["invalidated"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                **self._stats,
+                "hit_ratio": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+
+principals = PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_TTL)
+
+
+def _not_found():
+    return HTTPException(status_code=404, detail="Student not found")
+
+
+def resolve_student(conn, shid):
+    """Principal for `shid` on a psycopg2 connection; 404 if there is no such student."""
+    principal = principals.get(shid)
+    if principal is None:
+        generation = principals.generation()
+        with conn.cursor() as cur:
+            cur.execute(LOOKUP_SQL, (shid,))
+            row = cur.fetchone()
+        if not row:
+            raise _not_found()
+        principal = Principal(shid, row[0], row[1])
+        principals.put(principal, generation)
+    return principal
+
+
+async def _alookup(conn, shid):
+    generation = principals.generation()
+    cur = await conn.execute(LOOKUP_SQL, (shid,))
+    row = await cur.fetchone()
+    if not row:
+        raise _not_found()
+    principal = Principal(shid, row["sid"], row["hid"])
+    principals.put(principal, generation)
+    return principal
+
+
+async def aresolve_student(conn, shid):
+    """Same as resolve_student, on an async (dict‑row) connection."""
+    return principals.get(shid) or await _alookup(conn, shid)
+
+
+async def current_student(request: Request):
+    """Dependency: the logged‑in student (401 without a student session)."""
+    shid = request.session.get("user")
+    if not shid:
+        raise HTTPException(status_code=401, detail="Not logged in")
+    principal = principals.get(shid)
+    if principal is None:  # only borrow a connection on a miss
+        async with async_pool.connection() as conn:
+            principal = await _alookup(conn, shid)
+    return principal
@@ -0,0 +1,251 @@
+# ratelimit.py — token‑bucket admission control for the sign‑in endpoints
+#
+# Login, sign‑up and password reset each cost a bcrypt hash or a queued
+# e‑mail; one scripted client could keep every core hashing or flood the
+# outbox.  `RateLimitMiddleware` sits in front of the whole app and, for
+# the routes in RULES only,
+#   * reads the (small) JSON body to find the account being tried,
+#   * takes one token from the client IP's bucket and one from the
+#     account's (N requests per S seconds, bursts of up to N),
+#   * answers 429 with Retry-After when either is empty — before routing,
+#     sessions, a pool connection or a hash.
+#
+# Buckets live in each worker's memory (bounded LRU, RATE_LIMIT_MAX_KEYS).
+# With several workers set RATE_LIMIT_STORE=postgres: a request the local
+# bucket lets through is then also charged to the bucket all workers share
+# (RateLimitBucket, rate_limit_take() from migration 012).  The local
+# bucket has seen a subset of the shared one's traffic, so it is never
+# emptier: requests it rejects need no round trip.  If the database can't
+# be reached the local decision stands.
+#
+# Limits are "N/S" strings: RATE_LIMIT_LOGIN_PER_IP, RATE_LIMIT_LOGIN_PER_ACCOUNT,
+# RATE_LIMIT_RESET_PER_IP, RATE_LIMIT_RESET_PER_ACCOUNT.  Behind a reverse
+# proxy list its address in RATE_LIMIT_TRUSTED_PROXIES so X-Forwarded-For
+# is believed.
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from starlette.responses import JSONResponse
+
+from db_async import async_pool
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_STORE = os.environ.get("RATE_LIMIT_STORE", "memory")  # memory | postgres
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_MAX_BODY = int(os.environ.get("RATE_LIMIT_MAX_BODY", "16384"))
+RATE_LIMIT_PRUNE_SECONDS = float(os.environ.get("RATE_LIMIT_PRUNE_SECONDS", "300"))
+RATE_LIMIT_TRUSTED_PROXIES = frozenset(
+    p.strip() for p in os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", "").split(",") if p.strip()
+)
+
+
+class Limit(NamedTuple):
+    capacity: float  # burst size
+    rate: float      # tokens back per second
+
+    @classmethod
+    def parse(cls, spec):
+        """'10/60' → 10 requests per 60 seconds, bursts of up to 10."""
+        count, seconds = spec.split("/")
+        return cls(float(count), float(count) / float(seconds))
+
+
+# a hostel behind one NAT address signs in at once, so the IP limits are generous;
+# the account limits are what stops password guessing
+POLICIES = {
+    "login": (Limit.parse(os.environ.get("RATE_LIMIT_LOGIN_PER_IP", "120/60")),
+              Limit.parse(os.environ.get("RATE_LIMIT_LOGIN_PER_ACCOUNT", "10/300"))),
+    "reset": (Limit.parse(os.environ.get("RATE_LIMIT_RESET_PER_IP", "20/3600")),
+              Limit.parse(os.environ.get("RATE_LIMIT_RESET_PER_ACCOUNT", "3/3600"))),
+}
+
+
+class Rule(NamedTuple):
+    policy: str
+    scope: str   # namespace of the account field (student SHID, warden mail, …)
+    field: str   # JSON body field naming the account
+
+
+RULES = {
+    ("POST", "/login"): Rule("login", "student", "shid"),
+    ("POST", "/userauth"): Rule("login", "student", "shid"),
+    ("POST", "/auth/warden/login"): Rule("login", "warden", "mail"),
+    ("POST", "/auth/admin/login"): Rule("login", "admin", "email"),
+    ("POST", "/auth/forgot-password"): Rule("reset", "student", "shid"),
+}
+
+
+class MemoryBuckets:
+    """Token buckets of one worker; the least recently used are dropped first."""
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key → [tokens, monotonic time]
+        self._lock = threading.Lock()
+
+    def take(self, key, limit):
+        """0.0 when a token was taken, else seconds until one is back."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [limit.capacity, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)  # forgetting a bucket refills it: the lenient side
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(limit.capacity, bucket[0] + (now - bucket[1]) * limit.rate)
+                bucket[1] = now
+            if bucket[0] < 1:
+                return (1 - bucket[0]) / limit.rate
+            bucket[0] -= 1
+            return 0.0
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class PostgresBuckets:
+    """The buckets every worker shares (migration 012)."""
+
+    def __init__(self):
+        self._pruned = time.monotonic()
+        self._refill_seconds = max(l.capacity / l.rate for pair in POLICIES.values() for l in pair)
+
+    async def take(self, key, limit):
+        async with async_pool.connection() as conn:
+            cur = await conn.execute(
+                "SELECT rate_limit_take(%s, %s::real, %s::real) AS wait", (key, limit.capacity, limit.rate)
+            )
+            wait = (await cur.fetchone())["wait"]
+            if time.monotonic() - self._pruned > RATE_LIMIT_PRUNE_SECONDS:
+                # a bucket idle for its whole refill time is full: same as no row
+                self._pruned = time.monotonic()
+                await conn.execute(
+                    "DELETE FROM RateLimitBucket WHERE Updated_at < NOW() - %s * INTERVAL '1 second'",
+                    (self._refill_seconds,),
+                )
+        return float(wait)
+
+
+def client_ip(scope):
+    peer = (scope.get("client") or ("unknown", 0))[0]
+    if peer not in RATE_LIMIT_TRUSTED_PROXIES:
+        return peer
+    for name, value in scope.get("headers", ()):
+        if name == b"x-forwarded-for":
+            # the right‑most address our proxies didn't add is the client
+            for hop in reversed([h.strip() for h in value.decode("latin-1").split(",")]):
+                if hop and hop not in RATE_LIMIT_TRUSTED_PROXIES:
+                    return hop
+    return peer
+
+
+def _account(body, field) -> Optional[str]:
+    try:
+        value = json.loads(body).get(field)
+    except (ValueError, AttributeError):
+        return None  # not a JSON object: the route answers 422 anyway
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return value.strip().lower()[:200]
+
+
+class RateLimiter:
+    def __init__(self):
+        self.memory = MemoryBuckets(RATE_LIMIT_MAX_KEYS)
+        self.shared = PostgresBuckets() if RATE_LIMIT_STORE == "postgres" else None
+        self._lock = threading.Lock()
+        self._stats = {"allowed": 0, "rejected_ip": 0, "rejected_account": 0, "shared_errors": 0}
+
+    async def check(self, rule, ip, account):
+        """Seconds to wait, or 0.0 when the request may go on."""
+        ip_limit, account_limit = POLICIES[rule.policy]
+        keys = [(f"{rule.policy}:ip:{ip}", ip_limit, "rejected_ip")]
+        if account is not None:
+            keys.append((f"{rule.policy}:{rule.scope}:{account}", account_limit, "rejected_account"))
+
+        for key, limit, counter in keys:
+            wait = self.memory.take(key, limit)
+            if not wait and self.shared is not None:
+                try:
+                    wait = await self.shared.take(key, limit)
+                except Exception as e:  # shared store away: the local bucket decides
+                    self._count("shared_errors")
+                    print("❌ Shared rate limit store failed:", e)
+            if wait:
+                self._count(counter)
+                return wait
+        self._count("allowed")
+        return 0.0
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._stats)
+        return {
+            "enabled": RATE_LIMIT_ENABLED,
+            "store": "postgres" if self.shared is not None else "memory",
+            "local_keys": len(self.memory),
+            "limits": {name: {"per_ip": f"{ip.capacity:g}/{ip.capacity / ip.rate:g}s",
+                              "per_account": f"{acct.capacity:g}/{acct.capacity / acct.rate:g}s"}
+                       for name, (ip, acct) in POLICIES.items()},
+            **counters,
+        }
+
+
+limiter = RateLimiter()
+
+
+class RateLimitMiddleware:
+    """Pure ASGI: 429s are sent without touching the app behind it."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        rule = RULES.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if rule is None or not RATE_LIMIT_ENABLED:
+            return await self.app(scope, receive, send)
+
+        # auth bodies are a few dozen bytes; read it here and hand it on
+        chunks, size, more = [], 0, True
+        while more:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > RATE_LIMIT_MAX_BODY:
+                return await JSONResponse({"detail": "Request body too large"}, status_code=413)(scope, receive, send)
+            chunks.append(chunk)
+            more = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        wait = await limiter.check(rule, client_ip(scope), _account(body, rule.field))
+        if wait:
+            retry_after = max(1, math.ceil(wait))
+            return await JSONResponse(
+                {"detail": f"Too many attempts, try again in {retry_after} s"},
+                status_code=429,
+                headers={"Retry-After": str(retry_after)},
+            )(scope, receive, send)
+
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, replay, send)
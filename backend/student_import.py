@@ -0,0 +1,271 @@
+# student_import.py — admission‑season bulk onboarding from a CSV upload
+#
+#   POST /admin/students/import        (body: the CSV itself, text/csv)
+#
+#   shid,name,phone,mail,dob,hid,password
+#   KHA1ID101,Asha K,9876543210,asha@example.com,2005-04-01,2,initial-pass
+#
+# Only `shid` and `name` are required; an empty cell leaves the stored value
+# alone, so the same file format also updates existing students (matched on
+# SHID).  With a `password` cell the student's login is created or reset.
+#
+#   * the body is parsed as it arrives, one batch of IMPORT_BATCH_ROWS rows
+#     at a time; each batch is validated and its passwords start hashing on
+#     the bulk hashing pool right away, so bcrypt overlaps the upload,
+#   * once the upload is complete, ONE connection COPYs every valid row into
+#     a temporary staging table and upserts Student / UserAuth from it in a
+#     single transaction — no per‑row round trips,
+#   * rows that fail (bad field, unknown hostel, SHID repeated in the file)
+#     are skipped and reported by row number; the rest are imported.
+#     `?dry_run=true` runs everything and rolls back.
+#
+# Per‑row change notifications are switched off for the transaction; one
+# summary notification tells every worker to drop its cached student data.
+import asyncio
+import codecs
+import csv
+import os
+from datetime import date
+
+import psycopg
+from fastapi import APIRouter, HTTPException, Request
+
+from bus import CHANNEL, bulk_message
+from cache import response_cache
+from db_async import async_pool
+from hashing import hasher
+from principal import principals
+
+IMPORT_BATCH_ROWS = int(os.environ.get("IMPORT_BATCH_ROWS", "1000"))
+IMPORT_MAX_ROWS = int(os.environ.get("IMPORT_MAX_ROWS", "50000"))
+IMPORT_MAX_BYTES = int(os.environ.get("IMPORT_MAX_BYTES", str(20 * 1024 * 1024)))
+IMPORT_MAX_ERRORS = 1000  # reported; the rest are only counted
+
+COLUMNS = ("shid", "name", "phone", "mail", "dob", "hid", "password")
+REQUIRED = ("shid", "name")
+_LIMITS = {"shid": 50, "name": 100, "phone": 20, "mail": 100, "password": 72}
+
+router = APIRouter(tags=["Admin"])
+
+
+class CsvRecords:
+    """
+    Turns body chunks into complete CSV records.  A newline inside a quoted
+    field does not end a record, so multi‑line cells survive chunk borders.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._tail = ""       # text after the last newline seen
+        self._open = []       # lines of a record whose quote is still open
+        self._quoted = False
+
+    def feed(self, chunk, final=False):
+        lines = (self._tail + self._decoder.decode(chunk, final)).split("\n")
+        self._tail = "" if final else lines.pop()
+        records = []
+        for line in lines:
+            self._open.append(line)
+            if line.count('"') % 2:
+                self._quoted = not self._quoted
+            if not self._quoted:
+                record = "\n".join(self._open)
+                self._open = []
+                if record.strip():
+                    records.append(record)
+        return records
+
+
+def _validate(row):
+    """Cleaned values for one CSV row (None for empty cells) and its problems."""
+    values, problems = {}, []
+    for column in COLUMNS:
+        value = (row.get(column) or "").strip() or None
+        if value is None and column in REQUIRED:
+            problems.append(f"{column} is required")
+        elif value is not None and column in _LIMITS and len(value) > _LIMITS[column]:
+            problems.append(f"{column} longer than {_LIMITS[column]} characters")
+        values[column] = value
+
+    if values["mail"] and "@" not in values["mail"]:
+        problems.append("mail is not an e-mail address")
+    if values["dob"]:
+        try:
+            values["dob"] = date.fromisoformat(values["dob"])
+        except ValueError:
+            problems.append("dob must be YYYY-MM-DD")
+    if values["hid"]:
+        try:
+            values["hid"] = int(values["hid"])
+        except ValueError:
+            problems.append("hid must be a number")
+    return values, problems
+
+
+class _Report:
+    def __init__(self):
+        self.rows = 0
+        self.failed = 0
+        self.errors = []
+
+    def fail(self, row, shid, problems):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"row": row, "shid": shid, "errors": problems})
+
+
+async def _parse(request, report):
+    """
+    Stream the body into validated (row, values) pairs.  A batch's passwords
+    start hashing as soon as the batch is complete — the password value is
+    then a Future of its hash.
+    """
+    records, header, staged, pending, received = CsvRecords(), None, [], [], 0
+
+    def flush():
+        passwords = [values["password"] for _, values in pending if values["password"]]
+        hashes = iter(hasher.hash_many(passwords))
+        for row, values in pending:
+            values["password"] = next(hashes) if values["password"] else None
+            staged.append((row, values))
+        pending.clear()
+
+    def take(lines):
+        nonlocal header
+        for fields in csv.reader(lines):
+            if header is None:
+                header = [f.strip().lower() for f in fields]
+                unknown = sorted(set(header) - set(COLUMNS))
+                missing = sorted(set(REQUIRED) - set(header))
+                if unknown or missing:
+                    raise HTTPException(status_code=400, detail=(
+                        f"CSV columns must be among {', '.join(COLUMNS)} "
+                        f"(unknown: {unknown}, missing: {missing})"))
+                continue
+            report.rows += 1
+            if report.rows > IMPORT_MAX_ROWS:
+                raise HTTPException(status_code=413, detail=f"More than {IMPORT_MAX_ROWS} rows")
+            values, problems = _validate(dict(zip(header, fields)))
+            if len(fields) != len(header):
+                problems.append(f"expected {len(header)} fields, got {len(fields)}")
+            if problems:
+                report.fail(report.rows, values["shid"], problems)
+                continue
+            pending.append((report.rows, values))
+            if len(pending) >= IMPORT_BATCH_ROWS:
+                flush()
+
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > IMPORT_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"CSV larger than {IMPORT_MAX_BYTES} bytes")
+        take(records.feed(chunk))
+    take(records.feed(b"", final=True))
+    if header is None:
+        raise HTTPException(status_code=400, detail="Empty CSV")
+    flush()
+    return staged
+
+
+async def _load(conn, staged, report, dry_run):
+    """COPY the staged rows and upsert them; returns (inserted, updated SHIDs, logins set)."""
+    async with conn.transaction():
+        await conn.execute("SET LOCAL app.bulk_changes = 'on'")
+        await conn.execute("""
+            CREATE TEMP TABLE student_import (
+                RowNo INT PRIMARY KEY,
+                SHID  VARCHAR(50)  NOT NULL,
+                Name  VARCHAR(100) NOT NULL,
+                Phone VARCHAR(20),
+                Mail  VARCHAR(100),
+                DOB   DATE,
+                HID   INT,
+                PSWD  VARCHAR(100)
+            ) ON COMMIT DROP
+        """)
+        async with conn.cursor().copy(
+            "COPY student_import (RowNo, SHID, Name, Phone, Mail, DOB, HID, PSWD) FROM STDIN"
+        ) as copy:
+            for row, v in staged:
+                await copy.write_row((row, v["shid"], v["name"], v["phone"], v["mail"], v["dob"], v["hid"], v["password"]))
+
+        # set‑based checks: unknown hostel, SHID repeated in the file (first one wins)
+        cur = await conn.execute("""
+            DELETE FROM student_import i
+            WHERE  (i.HID IS NOT NULL AND NOT EXISTS (SELECT 1 FROM Hostel h WHERE h.HID = i.HID))
+               OR  EXISTS (SELECT 1 FROM student_import d WHERE d.SHID = i.SHID AND d.RowNo < i.RowNo)
+            RETURNING i.RowNo, i.SHID,
+                      EXISTS (SELECT 1 FROM student_import d WHERE d.SHID = i.SHID AND d.RowNo < i.RowNo) AS duplicate
+        """)
+        for rejected in sorted(await cur.fetchall(), key=lambda r: r["rowno"]):
+            report.fail(rejected["rowno"], rejected["shid"], [
+                "shid appears earlier in the file" if rejected["duplicate"] else "hid is not a known hostel"])
+
+        cur = await conn.execute("""
+            INSERT INTO Student (SHID, Name, Phone, Mail, DOB, HID)
+            SELECT SHID, Name, Phone, Mail, DOB, HID FROM student_import ORDER BY RowNo
+            ON CONFLICT (SHID) DO UPDATE SET
+                Name  = EXCLUDED.Name,
+                Phone = COALESCE(EXCLUDED.Phone, Student.Phone),
+                Mail  = COALESCE(EXCLUDED.Mail,  Student.Mail),
+                DOB   = COALESCE(EXCLUDED.DOB,   Student.DOB),
+                HID   = COALESCE(EXCLUDED.HID,   Student.HID)
+            RETURNING SHID, (xmax = 0) AS inserted
+        """)
+        upserted = await cur.fetchall()
+
+        # UserAuth has no unique key on SHID: reset existing logins, then add new ones
+        cur = await conn.execute("""
+            UPDATE UserAuth u SET PSWD = i.PSWD
+            FROM   student_import i
+            WHERE  i.PSWD IS NOT NULL AND u.SHID = i.SHID
+        """)
+        logins = cur.rowcount
+        cur = await conn.execute("""
+            INSERT INTO UserAuth (SHID, PSWD)
+            SELECT i.SHID, i.PSWD FROM student_import i
+            WHERE  i.PSWD IS NOT NULL
+              AND  NOT EXISTS (SELECT 1 FROM UserAuth u WHERE u.SHID = i.SHID)
+        """)
+        logins += cur.rowcount
+
+        await conn.execute("SELECT pg_notify(%s, %s)", (CHANNEL, bulk_message("student", count=len(upserted))))
+        if dry_run:
+            raise psycopg.Rollback()
+
+    inserted = sum(1 for r in upserted if r["inserted"])
+    return inserted, [r["shid"] for r in upserted if not r["inserted"]], logins
+
+
+@router.post("/admin/students/import")
+async def import_students(request: Request, dry_run: bool = False):
+    """Create / update students (and their logins) from a CSV body."""
+    if not request.session.get("admin"):
+        raise HTTPException(status_code=401, detail="Not logged in")
+
+    report = _Report()
+    staged = await _parse(request, report)
+    # finish hashing before borrowing a connection
+    for _, values in staged:
+        if values["password"]:
+            values["password"] = await asyncio.wrap_future(values["password"])
+
+    inserted, updated, logins = 0, [], 0
+    if staged:
+        async with async_pool.connection() as conn:
+            inserted, updated, logins = await _load(conn, staged, report, dry_run)
+        if not dry_run:
+            principals.invalidate(*updated)
+            response_cache.invalidate("students", "complaints", *(f"student:{shid}" for shid in updated))
+
+    return {
+        "status": "success" if not report.failed else "partial" if inserted or updated else "failed",
+        "dry_run": dry_run,
+        "rows": report.rows,
+        "inserted": inserted,
+        "updated": len(updated),
+        "logins_set": logins,
+        "failed": report.failed,
+        "errors": sorted(report.errors, key=lambda e: e["row"]),
+        "errors_truncated": report.failed > len(report.errors),
+    }
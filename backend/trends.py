@@ -0,0 +1,165 @@
+# trends.py — complaint time series for student, hostel and campus scope
+#
+# Every series is read from ComplaintDaily (migration 006), a rollup of
+# complaint counts per creation day × hostel × student × type × status that
+# triggers keep current on every insert / status change / delete.  A
+# five‑year campus trend therefore touches at most ~1 800 days × a handful of
+# types and statuses, no matter how many complaints exist.
+#
+#   python trends.py rebuild   # recompute the rollup from Complaint (repair)
+import sys
+from datetime import date, timedelta
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from psycopg2.extras import RealDictCursor
+
+from cache import CachedRoute, cached
+from db import get_db_connection
+from fastjson import json_response
+from principal import resolve_student
+
+router = APIRouter(tags=["Analytics"], route_class=CachedRoute)
+
+MAX_TREND_DAYS = 5 * 366
+LABEL_FORMATS = {"day": "YYYY-MM-DD", "week": "IYYY-\"W\"IW", "month": "YYYY-MM"}
+
+Bucket = Literal["day", "week", "month"]
+
+# series_query() scopes
+STUDENT_SCOPE = "AND SID = %s"
+HOSTEL_SCOPE = "AND HID = %s"
+
+
+class TrendWindow:
+    """
+    Query parameters shared by the trend endpoints.  The window is either
+    `start`/`end` or the last `days` days; `bucket` groups it by day, ISO
+    week or calendar month.
+    """
+
+    def __init__(
+        self,
+        bucket: Bucket = "day",
+        days: int = Query(7, ge=1, le=MAX_TREND_DAYS),
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        type: Optional[str] = None,
+    ):
+        self.end = end or date.today()
+        self.start = start or self.end - timedelta(days=days - 1)
+        if self.start > self.end:
+            raise HTTPException(status_code=400, detail="start must not be after end")
+        if (self.end - self.start).days >= MAX_TREND_DAYS:
+            raise HTTPException(status_code=400, detail=f"Window longer than {MAX_TREND_DAYS} days")
+        self.bucket = bucket
+        self.type = type
+
+
+def series_query(window, scope_sql="", scope_params=()):
+    """
+    (sql, params): one row per bucket in the window (empty buckets included)
+    with totals split by status.  `scope_sql` narrows the rollup, e.g.
+    "AND SID = %s".
+    """
+    type_sql = "AND Type = %s" if window.type else ""
+    type_params = (window.type,) if window.type else ()
+    return (
+        f"""
+        SELECT TO_CHAR(b.bucket, %s)                         AS label,
+               COALESCE(r.total, 0)                          AS total,
+               COALESCE(r.pending, 0)                        AS pending,
+               COALESCE(r.resolved, 0)                       AS resolved,
+               COALESCE(r.withdrawn, 0)                      AS withdrawn
+        FROM generate_series(
+                 date_trunc(%s, %s::timestamp), date_trunc(%s, %s::timestamp), ('1 ' || %s)::interval
+             ) AS b(bucket)
+        LEFT JOIN (
+            SELECT date_trunc(%s, Day::timestamp)                      AS bucket,
+                   SUM(Total)                                          AS total,
+                   SUM(Total) FILTER (WHERE Status = 'Pending')        AS pending,
+                   SUM(Total) FILTER (WHERE Status = 'Resolved')       AS resolved,
+                   SUM(Total) FILTER (WHERE Status = 'Withdrawn')      AS withdrawn
+            FROM   ComplaintDaily
+            WHERE  Day BETWEEN %s AND %s {scope_sql} {type_sql}
+            GROUP  BY 1
+        ) r ON r.bucket = b.bucket
+        ORDER BY b.bucket
+        """,
+        (
+            LABEL_FORMATS[window.bucket],
+            window.bucket, window.start, window.bucket, window.end, window.bucket,
+            window.bucket, window.start, window.end, *scope_params, *type_params,
+        ),
+    )
+
+
+def _series(cur, window, scope_sql="", scope_params=()):
+    cur.execute(*series_query(window, scope_sql, scope_params))
+    rows = cur.fetchall()
+    return {
+        "bucket": window.bucket,
+        "start": window.start,
+        "end": window.end,
+        "labels": [r["label"] for r in rows],
+        "totalComplaints": [r["total"] for r in rows],
+        "pendingComplaints": [r["pending"] for r in rows],
+        "resolvedComplaints": [r["resolved"] for r in rows],
+        "withdrawnComplaints": [r["withdrawn"] for r in rows],
+    }
+
+
+# ───────────────────── ROUTES ─────────────────────
+@router.get("/analytics/student/complaint-trend/{shid}")
+@cached("student:{shid}")
+def student_trend(shid: str, window: TrendWindow = Depends(), conn=Depends(get_db_connection)):
+    sid = resolve_student(conn, shid).sid
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        return json_response(_series(cur, window, STUDENT_SCOPE, (sid,)))
+
+
+@router.get("/analytics/hostel/{hid}/complaint-trend")
+@cached("complaints", "students")
+def hostel_trend(hid: int, window: TrendWindow = Depends(), conn=Depends(get_db_connection)):
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("SELECT 1 FROM Hostel WHERE HID = %s", (hid,))
+        if not cur.fetchone():
+            raise HTTPException(status_code=404, detail="Hostel not found")
+        return json_response(_series(cur, window, HOSTEL_SCOPE, (hid,)))
+
+
+@router.get("/analytics/campus/complaint-trend")
+@cached("complaints")
+def campus_trend(window: TrendWindow = Depends(), conn=Depends(get_db_connection)):
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        return json_response(_series(cur, window))
+
+
+# ───────────────────── MAINTENANCE ─────────────────────
+def rebuild(conn):
+    """Recompute ComplaintDaily from scratch in one transaction."""
+    with conn.cursor() as cur:
+        cur.execute("LOCK TABLE Complaint IN SHARE MODE")  # hold writers off meanwhile
+        cur.execute("DELETE FROM ComplaintDaily")
+        cur.execute("""
+            INSERT INTO ComplaintDaily (Day, SID, HID, Type, Status, Total)
+            SELECT c.Created_at::date, c.SID, COALESCE(s.HID, 0),
+                   COALESCE(c.Type, ''), COALESCE(c.Status, ''), COUNT(*)
+            FROM   Complaint c JOIN Student s ON s.SID = c.SID
+            GROUP  BY 1, 2, 3, 4, 5
+        """)
+        rows = cur.rowcount
+    conn.commit()
+    return rows
+
+
+if __name__ == "__main__":
+    from db import connect
+
+    if sys.argv[1:] != ["rebuild"]:
+        sys.exit("usage: python trends.py rebuild")
+    conn = connect()
+    try:
+        print(f"✔ rebuilt ComplaintDaily ({rebuild(conn)} rows)")
+    finally:
+        conn.close()
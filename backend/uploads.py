@@ -0,0 +1,323 @@
+# uploads.py — streaming & resumable proof‑image uploads
+#
+# Two ways to get an image into the blob store without base64‑in‑JSON:
+#
+#   1. multipart/form-data, parsed chunk by chunk straight off the socket
+#      (StreamingForm) — nothing is buffered in memory, the size limit is
+#      enforced while bytes arrive.
+#   2. resumable sessions for flaky hostel Wi‑Fi (UploadSessions): create a
+#      session, PATCH chunks at an offset, ask for the current offset after a
+#      drop and carry on from there.  Progress lives in a .part file on disk,
+#      so a session survives worker restarts and works across workers.
+#
+# Everything here does blocking file I/O (writes, fsync, hashing); async
+# routes run it with run_in_threadpool so one slow upload never stalls the
+# event loop.
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+from starlette.concurrency import run_in_threadpool
+
+try:  # python-multipart ≥ 0.0.13 renamed its import package
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # pragma: no cover
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from blobstore import UPLOAD_DIR, store
+
+MAX_PROOF_IMAGE_BYTES = int(os.environ.get("MAX_PROOF_IMAGE_BYTES", str(10 * 1024 * 1024)))
+MAX_FORM_FIELD_BYTES = 64 * 1024  # text fields (shid, type, description) together
+# a lock file this old belongs to a writer that died (live writers touch it per chunk)
+UPLOAD_LOCK_STALE_SECONDS = int(os.environ.get("UPLOAD_LOCK_STALE_SECONDS", "300"))
+
+
+class UploadError(Exception):
+    """Client‑side upload problem; carries the HTTP status to answer with."""
+
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class BlobWriter:
+    """Write a blob chunk by chunk, hashing as we go; nothing is held in memory."""
+
+    def __init__(self, max_bytes=MAX_PROOF_IMAGE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._tmp = store.temp_file()
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadError(413, f"Image larger than {self.max_bytes} bytes")
+        self._hash.update(chunk)
+        self._tmp.write(chunk)
+
+    def commit(self):
+        self._tmp.flush()
+        os.fsync(self._tmp.fileno())
+        self._tmp.close()
+        return store.commit_file(self._tmp.name, self._hash.hexdigest())
+
+    def abort(self):
+        self._tmp.close()
+        try:
+            os.unlink(self._tmp.name)
+        except FileNotFoundError:
+            pass
+
+
+# ───────────────────── MULTIPART ─────────────────────
+class StreamingForm:
+    """
+    Incremental multipart/form-data parser.  Text fields are collected into
+    `fields`; the part named `file_field` is piped into a BlobWriter.
+
+    Feed it with `write(chunk)` as the request body streams in.  `file_started`
+    flips as soon as the file part begins so the caller can validate the text
+    fields (sent before the file) and bail out before reading the image.
+    """
+
+    def __init__(self, content_type, file_field, max_bytes=MAX_PROOF_IMAGE_BYTES):
+        mime, params = parse_options_header(content_type or "")
+        boundary = params.get(b"boundary")
+        if mime != b"multipart/form-data" or not boundary:
+            raise UploadError(415, "Expected multipart/form-data")
+
+        self.file_field = file_field
+        self.max_bytes = max_bytes
+        self.fields = {}
+        self.file = None          # BlobWriter once the file part starts
+        self.file_started = False
+
+        self._field_bytes = 0
+        self._header_field = b""
+        self._header_value = b""
+        self._part_headers = {}
+        self._part_name = None
+        self._part_value = []
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    # parser callbacks --------------------------------------------------
+    def _on_part_begin(self):
+        self._part_headers = {}
+        self._part_name = None
+        self._part_value = []
+
+    def _on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._part_headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _disp, options = parse_options_header(self._part_headers.get(b"content-disposition", b""))
+        self._part_name = options.get(b"name", b"").decode("utf-8", "replace")
+        if self._part_name == self.file_field:
+            if self.file is not None:
+                raise UploadError(400, f"Only one {self.file_field} allowed")
+            self.file = BlobWriter(self.max_bytes)
+            self.file_started = True
+
+    def _on_part_data(self, data, start, end):
+        if self._part_name == self.file_field:
+            self.file.write(data[start:end])
+        else:
+            self._field_bytes += end - start
+            if self._field_bytes > MAX_FORM_FIELD_BYTES:
+                raise UploadError(413, "Form fields too large")
+            self._part_value.append(data[start:end])
+
+    def _on_part_end(self):
+        if self._part_name and self._part_name != self.file_field:
+            self.fields[self._part_name] = b"".join(self._part_value).decode("utf-8", "replace")
+
+    # public -------------------------------------------------------------
+    def write(self, chunk):
+        self._parser.write(chunk)
+
+    def finish(self):
+        """Finalize parsing and store the file; returns its digest (or None)."""
+        self._parser.finalize()
+        return self.file.commit() if self.file else None
+
+    def abort(self):
+        if self.file:
+            self.file.abort()
+
+
+# ───────────────────── RESUMABLE SESSIONS ─────────────────────
+class UploadSessions:
+    """
+    A session is two files in UPLOAD_DIR: `<id>.json` (owner + declared size)
+    and `<id>.part` (the bytes received so far).  The .part file's length *is*
+    the resume offset, so there is no separate state to keep consistent.
+
+    Only one request at a time may write or complete a session: an in‑process
+    set guards this worker, an O_EXCL `<id>.lock` file the others.  A second
+    concurrent PATCH gets 409 and resumes from the offset the first left.
+    """
+
+    def __init__(self, directory, max_bytes=MAX_PROOF_IMAGE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._busy = set()
+        self._busy_lock = threading.Lock()
+
+    @staticmethod
+    def _key(upload_id):
+        try:
+            return uuid.UUID(upload_id).hex
+        except ValueError:
+            raise UploadError(404, "Upload not found")
+
+    def _paths(self, upload_id):
+        base = os.path.join(self.directory, self._key(upload_id))
+        return base + ".json", base + ".part"
+
+    def _lock_path(self, upload_id):
+        return os.path.join(self.directory, self._key(upload_id) + ".lock")
+
+    def acquire(self, upload_id):
+        """Take the session's lock or raise 409 (blocking: file I/O)."""
+        key = self._key(upload_id)
+        with self._busy_lock:
+            if key in self._busy:
+                raise UploadError(409, "Another request is writing this upload")
+            self._busy.add(key)
+        lock_path = self._lock_path(upload_id)
+        for _attempt in range(2):
+            try:
+                os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) < UPLOAD_LOCK_STALE_SECONDS:
+                        break
+                    os.unlink(lock_path)  # its writer died; take over
+                except FileNotFoundError:
+                    pass  # released meanwhile: try again
+            except BaseException:
+                self._release_local(key)
+                raise
+        self._release_local(key)
+        raise UploadError(409, "Another request is writing this upload")
+
+    def release(self, upload_id):
+        try:
+            os.unlink(self._lock_path(upload_id))
+        except FileNotFoundError:
+            pass
+        self._release_local(self._key(upload_id))
+
+    def _release_local(self, key):
+        with self._busy_lock:
+            self._busy.discard(key)
+
+    def create(self, shid, size):
+        if size <= 0:
+            raise UploadError(400, "size must be positive")
+        if size > self.max_bytes:
+            raise UploadError(413, f"Image larger than {self.max_bytes} bytes")
+
+        os.makedirs(self.directory, exist_ok=True)
+        upload_id = uuid.uuid4().hex
+        meta_path, part_path = self._paths(upload_id)
+        open(part_path, "wb").close()
+        with open(meta_path, "w") as fh:
+            json.dump({"shid": shid, "size": size, "created": time.time()}, fh)
+        return upload_id
+
+    def get(self, upload_id):
+        """Return (meta, offset) or raise 404."""
+        meta_path, part_path = self._paths(upload_id)
+        try:
+            with open(meta_path) as fh:
+                meta = json.load(fh)
+            return meta, os.path.getsize(part_path)
+        except FileNotFoundError:
+            raise UploadError(404, "Upload not found")
+
+    async def append(self, upload_id, offset, chunks):
+        """
+        Append an async stream of chunks at `offset` (must equal what we already
+        have).  Whatever arrives before a disconnect stays on disk, so the client
+        resumes from the new offset.  Returns the offset after the write.
+        """
+        _meta_path, part_path = self._paths(upload_id)
+        await run_in_threadpool(self.acquire, upload_id)
+        try:
+            # checked under the lock: a PATCH that finished meanwhile moved the offset
+            meta, current = await run_in_threadpool(self.get, upload_id)
+            if offset != current:
+                raise UploadError(409, f"Offset mismatch, resume from {current}")
+            fh = await run_in_threadpool(open, part_path, "ab")
+            try:
+                async for chunk in chunks:
+                    current += len(chunk)
+                    if current > meta["size"]:
+                        raise UploadError(413, "More data than the declared size")
+                    await run_in_threadpool(self._write, fh, chunk, upload_id)
+            finally:
+                await run_in_threadpool(self._close, fh)
+        finally:
+            await run_in_threadpool(self.release, upload_id)
+        return current
+
+    def _write(self, fh, chunk, upload_id):
+        fh.write(chunk)
+        os.utime(self._lock_path(upload_id))  # still alive: not stale
+
+    @staticmethod
+    def _close(fh):
+        fh.flush()
+        os.fsync(fh.fileno())
+        fh.close()
+
+    def complete(self, upload_id, shid):
+        """
+        Move a fully received upload into the blob store; returns the digest.
+        Blocking (re‑hashes the whole file): call it via run_in_threadpool.
+        """
+        meta, _offset = self.get(upload_id)
+        if meta["shid"] != shid:
+            raise UploadError(404, "Upload not found")
+        self.acquire(upload_id)
+        try:
+            meta, offset = self.get(upload_id)
+            if offset != meta["size"]:
+                raise UploadError(409, f"Upload incomplete ({offset}/{meta['size']} bytes)")
+
+            meta_path, part_path = self._paths(upload_id)
+            digest = hashlib.sha256()
+            with open(part_path, "rb") as fh:
+                for block in iter(lambda: fh.read(1024 * 1024), b""):
+                    digest.update(block)
+            blob = store.commit_file(part_path, digest.hexdigest())
+            os.unlink(meta_path)
+        finally:
+            self.release(upload_id)
+        return blob
+
+
+sessions = UploadSessions(UPLOAD_DIR)
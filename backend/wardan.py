@@ -1,7 +1,12 @@
-from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
-import bcrypt
 from db import get_db_connection
+from db_async import get_async_connection
+from hashing import hasher
+from cache import response_cache
+from admin import ComplaintBulkStatusUpdate, apply_bulk_status
+from dedup import list_clusters
+from fastjson import json_response
 
 router = APIRouter()
 
@@ -19,15 +24,14 @@ class WardenLogin(BaseModel):
 
 # -------------------- SIGNUP --------------------
 @router.post("/auth/warden/signup")
-def warden_signup(details: WardenSignup):
-    conn = get_db_connection()
+def warden_signup(details: WardenSignup, conn=Depends(get_db_connection)):
     cur = conn.cursor()
 
     cur.execute("SELECT * FROM Warden WHERE Mail = %s", (details.mail,))
     if cur.fetchone():
         raise HTTPException(status_code=400, detail="Warden with this email already exists")
 
-    hashed_pw = bcrypt.hashpw(details.password.encode(), bcrypt.gensalt()).decode()
+    hashed_pw = hasher.hash_sync(details.password)
 
     cur.execute("""
         INSERT INTO Warden (Name, Mail, Phone, Password, HID)
@@ -36,38 +40,43 @@ def warden_signup(details: WardenSignup):
 
     conn.commit()
     cur.close()
-    conn.close()
+    response_cache.invalidate("wardens")
 
     return {"status": "success", "message": "Warden registered successfully"}
 
 # -------------------- LOGIN --------------------
 @router.post("/auth/warden/login")
-def warden_login(credentials: WardenLogin, request: Request, response: Response):
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    cur.execute("""
+async def warden_login(
+    credentials: WardenLogin,
+    request: Request,
+    response: Response,
+    conn=Depends(get_async_connection),
+):
+    cur = await conn.execute("""
         SELECT WID, Name, Phone, HID, Password FROM Warden 
         WHERE Mail = %s
     """, (credentials.mail,))
-    warden = cur.fetchone()
-    cur.close()
-    conn.close()
+    warden = await cur.fetchone()
 
     if not warden:
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
-    wid, name, phone, hid, hashed_password = warden
-
-    if not bcrypt.checkpw(credentials.password.encode(), hashed_password.encode()):
+    # bcrypt is CPU‑bound → hashing pool, off the event loop
+    ok, new_hash = await hasher.verify_and_update(credentials.password, warden["password"])
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    if new_hash:  # seeded plaintext / weaker hash → upgrade in place
+        await conn.execute(
+            "UPDATE Warden SET Password = %s WHERE WID = %s AND Password = %s",
+            (new_hash, warden["wid"], warden["password"]),
+        )
 
     # ✅ Store session
     request.session["warden"] = {
-        "wid": wid,
-        "name": name,
-        "phone": phone,
-        "hid": hid
+        "wid": warden["wid"],
+        "name": warden["name"],
+        "phone": warden["phone"],
+        "hid": warden["hid"]
     }
 
     return {
@@ -89,3 +98,31 @@ def get_profile(request: Request):
     if not warden:
         raise HTTPException(status_code=401, detail="Not logged in")
     return {"warden": warden}
+
+# -------------------- BULK STATUS --------------------
+@router.put("/warden/complaints/status")
+def warden_bulk_status(payload: ComplaintBulkStatusUpdate, request: Request, conn=Depends(get_db_connection)):
+    """E.g. "all WiFi complaints in my hostel are fixed" — limited to the warden's hostel."""
+    warden = request.session.get("warden")
+    if not warden:
+        raise HTTPException(status_code=401, detail="Not logged in")
+    if payload.hid is not None and payload.hid != warden["hid"]:
+        raise HTTPException(status_code=403, detail="Not your hostel")
+    payload.hid = warden["hid"]
+
+    cids = apply_bulk_status(conn, payload)
+    return {"status": "success", "new_status": payload.status, "updated": len(cids), "cids": cids}
+
+
+@router.get("/warden/complaints/clusters")
+def warden_clusters(
+    request: Request,
+    open_only: bool = True,
+    limit: int = Query(100, ge=1, le=500),
+    conn=Depends(get_db_connection),
+):
+    """Near‑duplicate complaint groups in the warden's hostel, largest first."""
+    warden = request.session.get("warden")
+    if not warden:
+        raise HTTPException(status_code=401, detail="Not logged in")
+    return json_response({"clusters": list_clusters(conn, ["s.HID = %s"], [warden["hid"]], limit, open_only)})
@@ -3,7 +3,7 @@
     • horizontal timeline modal
     • icon tool‑tips + confirm prompt
 ------------------------------------------------------------------*/
-import React, { useEffect, useMemo, useRef, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import axios from "axios";
 import {
   FaChevronLeft,
@@ -19,7 +19,9 @@ import AdminSidebar from "../components/AdminSidebar";
 
 /* ───── constants ───── */
 const PAGE_SIZE = 12;
-const OVERDUE_DAYS = 3;
+const FIRST_PAGE = 50; // the server's default page size
+const MAX_PAGE = 500; // the most it returns per request
+const OVERDUE_DAYS = 3; // until the server says otherwise (threshold_days)
 const TABLE_HEIGHT = "75vh";
 const STATUS_COLORS = {
   Pending: "text-yellow-600",
@@ -36,7 +38,9 @@ const AdminComplaints = () => {
 
   const [summary, setSummary] = useState([]);
   const [overdue, setOverdue] = useState([]);
+  const [overdueDays, setOverdueDays] = useState(OVERDUE_DAYS);
   const [complaints, setComplaints] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [selected, setSelected] = useState(null);
 
   const [statusFilter, setStatusFilter] = useState("All");
@@ -50,18 +54,52 @@ const AdminComplaints = () => {
 
   const api = import.meta.env.VITE_API_BASE_URL;
 
+  /* the status filter runs on the server, over every complaint
+     (read through a ref: the live‑update handler outlives this render) */
+  const statusRef = useRef(statusFilter);
+  statusRef.current = statusFilter;
+  const listParams = (extra = {}) => ({
+    ...(statusRef.current === "All" ? {} : { status: statusRef.current }),
+    ...extra,
+  });
+
+  /* rows on screen (first page + every "Load more"); a refresh reloads
+     all of them, not just page one */
+  const loadedRef = useRef(0);
+  loadedRef.current = complaints.length;
+
+  /* the first `count` complaints for the current filter, following next_cursor */
+  const fetchComplaints = async (count) => {
+    const rows = [];
+    let cursor = null;
+    do {
+      const { data } = await axios.get(`${api}/admin/complaints`, {
+        params: listParams({
+          limit: Math.min(MAX_PAGE, Math.max(count - rows.length, 1)),
+          ...(cursor ? { cursor } : {}),
+        }),
+        withCredentials: true,
+      });
+      rows.push(...data.complaints);
+      cursor = data.next_cursor;
+    } while (cursor && rows.length < count);
+    return { rows, cursor };
+  };
+
   /* fetch data */
-  const fetchAll = async () => {
+  const fetchAll = async ({ quiet = false } = {}) => {
     try {
-      setLoading(true);
-      const [{ data: s }, { data: o }, { data: c }] = await Promise.all([
+      if (!quiet) setLoading(true);
+      const [{ data: s }, { data: o }, c] = await Promise.all([
         axios.get(`${api}/admin/complaints/summary`, { withCredentials: true }),
         axios.get(`${api}/admin/complaints/overdue`, { withCredentials: true }),
-        axios.get(`${api}/admin/complaints`, { withCredentials: true }),
+        fetchComplaints(Math.max(loadedRef.current, FIRST_PAGE)),
       ]);
       setSummary(s.summary);
       setOverdue(o.overdue);
-      setComplaints(c.complaints);
+      setOverdueDays(o.threshold_days);
+      setComplaints(c.rows);
+      setNextCursor(c.cursor);
     } catch {
       setError("Failed to load complaints.");
     } finally {
@@ -72,18 +110,67 @@ const AdminComplaints = () => {
     fetchAll();
   }, []);
 
-  /* derived table rows */
-  const filtered = useMemo(
-    () =>
-      statusFilter === "All"
-        ? complaints
-        : complaints.filter((c) => c.status === statusFilter),
-    [complaints, statusFilter]
-  );
+  /* a new filter starts again from the first page */
+  const firstRender = useRef(true);
+  useEffect(() => {
+    if (firstRender.current) {
+      firstRender.current = false;
+      return;
+    }
+    setPage(0);
+    (async () => {
+      try {
+        const { rows, cursor } = await fetchComplaints(FIRST_PAGE);
+        setComplaints(rows);
+        setNextCursor(cursor);
+      } catch {
+        alert("Failed to load complaints");
+      }
+    })();
+  }, [statusFilter]);
+
+  /* live updates: the server pushes complaint events, we refresh quietly
+     (bursts are coalesced; unchanged lists come back as cheap 304s) */
   useEffect(() => {
-    if (page > Math.floor(filtered.length / PAGE_SIZE)) setPage(0);
-  }, [filtered, page]);
-  const rows = filtered.slice(page * PAGE_SIZE, (page + 1) * PAGE_SIZE);
+    const source = new EventSource(`${api}/events/admin`, {
+      withCredentials: true,
+    });
+    let timer;
+    const refresh = () => {
+      clearTimeout(timer);
+      timer = setTimeout(() => fetchAll({ quiet: true }), 300);
+    };
+    [
+      "complaint.created",
+      "complaint.withdrawn",
+      "complaint.status",
+      "reset",
+    ].forEach((type) => source.addEventListener(type, refresh));
+    return () => {
+      clearTimeout(timer);
+      source.close();
+    };
+  }, []);
+
+  /* server pages are keyset‑paginated: append the next one on demand */
+  const loadMore = async () => {
+    try {
+      const { data } = await axios.get(`${api}/admin/complaints`, {
+        params: listParams({ cursor: nextCursor }),
+        withCredentials: true,
+      });
+      setComplaints((p) => [...p, ...data.complaints]);
+      setNextCursor(data.next_cursor);
+    } catch {
+      alert("Failed to load more complaints");
+    }
+  };
+
+  /* derived table rows (already filtered by the server) */
+  useEffect(() => {
+    if (page > Math.floor(complaints.length / PAGE_SIZE)) setPage(0);
+  }, [complaints, page]);
+  const rows = complaints.slice(page * PAGE_SIZE, (page + 1) * PAGE_SIZE);
 
   /* handlers */
   const updateStatus = async (cid, newStatus) => {
@@ -188,23 +275,28 @@ const AdminComplaints = () => {
                 </tbody>
               </table>
             </div>
-            {filtered.length > PAGE_SIZE && (
+            {complaints.length > PAGE_SIZE && (
               <Paginator
                 page={page}
-                total={filtered.length}
+                total={complaints.length}
                 onPrev={() => setPage((p) => Math.max(0, p - 1))}
                 onNext={() =>
                   setPage((p) =>
-                    p + 1 < filtered.length / PAGE_SIZE ? p + 1 : p
+                    p + 1 < complaints.length / PAGE_SIZE ? p + 1 : p
                   )
                 }
               />
             )}
+            {nextCursor && (
+              <div className="flex justify-center pb-4">
+                <NavBtn onClick={loadMore}>Load more</NavBtn>
+              </div>
+            )}
           </div>
         </section>
 
         {/* 2️⃣ OVERDUE */}
-        <OverdueSection overdue={overdue} />
+        <OverdueSection overdue={overdue} days={overdueDays} />
 
         {/* 3️⃣ SUMMARY SLIDER */}
         <section className="mt-12">
@@ -320,11 +412,15 @@ const DetailsModal = ({ complaint, onClose }) => {
           value={complaint.description || "—"}
           isLong
         />
-        {complaint.proofimage && (
+        {(complaint.proof_full_url || complaint.proofimage) && (
           <div>
             <h4 className="font-medium mb-2">Proof</h4>
             <img
-              src={`data:image/*;base64,${complaint.proofimage}`}
+              src={
+                complaint.proof_full_url
+                  ? `${import.meta.env.VITE_API_BASE_URL}${complaint.proof_full_url}`
+                  : `data:image/*;base64,${complaint.proofimage}`
+              }
               alt="proof"
               className="w-full rounded"
             />
@@ -349,12 +445,12 @@ const SummaryCard = ({ hostel_name, hid, total, pending, resolved, overdue }) =>
   </div>
 );
 
-const OverdueSection = ({ overdue }) => (
+const OverdueSection = ({ overdue, days }) => (
   <section>
     <h2 className="text-2xl font-semibold mb-4 flex items-center gap-2 text-red-600">
       <FaExclamationTriangle /> Overdue&nbsp;({overdue.length})
       <span className="text-sm text-gray-500 font-normal">
-        &nbsp;(&gt; {OVERDUE_DAYS} days)
+        &nbsp;(&gt; {days} days)
       </span>
     </h2>
     {overdue.length === 0 ? (
@@ -1,7 +1,7 @@
 /*  src/pages/AdminUsers.jsx
     Left‑aligned, extra‑wide “Manage Users” table
 ------------------------------------------------------------------*/
-import React, { useEffect, useMemo, useState } from "react";
+import React, { useEffect, useState } from "react";
 import axios from "axios";
 import {
   FaEdit,
@@ -30,43 +30,70 @@ const AdminUsers = () => {
   const [search, setSearch] = useState("");
   const [hostelFilter, setHostelFilter] = useState("all");
   const [page, setPage] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [hostels, setHostels] = useState([]);
 
   const api = import.meta.env.VITE_API_BASE_URL;
 
-  /* fetch */
+  /* search + hostel filter run on the server, over every student */
+  const listParams = (extra = {}) => ({
+    ...(search.trim() ? { q: search.trim() } : {}),
+    ...(hostelFilter === "all" ? {} : { hid: hostelFilter }),
+    ...extra,
+  });
+
+  /* fetch: hostels once; students again from the first page whenever
+     a filter changes (typing is debounced) */
+  useEffect(() => {
+    axios
+      .get(`${api}/admin/hostels`, { withCredentials: true })
+      .then(({ data }) => setHostels(data.hostels))
+      .catch(() => setHostels([]));
+  }, []);
+
   useEffect(() => {
-    (async () => {
+    let cancelled = false;
+    const timer = setTimeout(async () => {
       try {
         const { data } = await axios.get(`${api}/admin/students`, {
+          params: listParams(),
           withCredentials: true,
         });
+        if (cancelled) return;
         setStudents(data.students);
+        setNextCursor(data.next_cursor);
+        setPage(0);
       } catch {
-        setError("Failed to load students.");
+        if (!cancelled) setError("Failed to load students.");
       } finally {
-        setLoading(false);
+        if (!cancelled) setLoading(false);
       }
-    })();
-  }, []);
+    }, loading ? 0 : 300);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [search, hostelFilter]);
 
-  /* search + filter */
-  const filtered = useMemo(() => {
-    const t = search.toLowerCase();
-    return students
-      .filter(
-        (s) =>
-          s.name.toLowerCase().includes(t) ||
-          s.mail.toLowerCase().includes(t) ||
-          s.phone.includes(t)
-      )
-      .filter((s) => (hostelFilter === "all" ? true : s.hostel_name === hostelFilter));
-  }, [students, search, hostelFilter]);
+  /* server pages are keyset‑paginated: append the next one on demand */
+  const loadMore = async () => {
+    try {
+      const { data } = await axios.get(`${api}/admin/students`, {
+        params: listParams({ cursor: nextCursor }),
+        withCredentials: true,
+      });
+      setStudents((p) => [...p, ...data.students]);
+      setNextCursor(data.next_cursor);
+    } catch {
+      alert("Failed to load more students");
+    }
+  };
 
   useEffect(() => {
-    if (page > Math.floor(filtered.length / PAGE_SIZE)) setPage(0);
-  }, [filtered, page]);
+    if (page > Math.floor(students.length / PAGE_SIZE)) setPage(0);
+  }, [students, page]);
 
-  const rows = filtered.slice(page * PAGE_SIZE, (page + 1) * PAGE_SIZE);
+  const rows = students.slice(page * PAGE_SIZE, (page + 1) * PAGE_SIZE);
 
   /* helpers */
   const startEdit = (s) => {
@@ -101,7 +128,10 @@ const AdminUsers = () => {
     }
   };
 
-  const hostelNames = ["all", ...new Set(students.map((s) => s.hostel_name))];
+  const hostelOptions = [
+    { value: "all", label: "All Hostels" },
+    ...hostels.map((h) => ({ value: String(h.hid), label: h.name })),
+  ];
 
   if (loading)
     return <ScreenMsg text="Loading users…" pulse />;
@@ -120,7 +150,7 @@ const AdminUsers = () => {
           <SearchBox value={search} onChange={setSearch} />
           <HostelFilter
             value={hostelFilter}
-            options={hostelNames}
+            options={hostelOptions}
             onChange={setHostelFilter}
           />
         </div>
@@ -186,22 +216,27 @@ const AdminUsers = () => {
             </div>
 
             {/* pagination */}
-            {filtered.length > PAGE_SIZE && (
+            {students.length > PAGE_SIZE && (
               <div className="flex items-center justify-between px-4 py-3">
                 <NavBtn disabled={page === 0} onClick={() => setPage((p) => Math.max(0, p - 1))}>
                   <FaChevronLeft /> Prev
                 </NavBtn>
                 <span className="text-sm">
-                  Page {page + 1} of {Math.ceil(filtered.length / PAGE_SIZE)}
+                  Page {page + 1} of {Math.ceil(students.length / PAGE_SIZE)}
                 </span>
                 <NavBtn
-                  disabled={page + 1 >= filtered.length / PAGE_SIZE}
-                  onClick={() => setPage((p) => (p + 1 < filtered.length / PAGE_SIZE ? p + 1 : p))}
+                  disabled={page + 1 >= students.length / PAGE_SIZE}
+                  onClick={() => setPage((p) => (p + 1 < students.length / PAGE_SIZE ? p + 1 : p))}
                 >
                   Next <FaChevronRight />
                 </NavBtn>
               </div>
             )}
+            {nextCursor && (
+              <div className="flex justify-center pb-4">
+                <NavBtn onClick={loadMore}>Load more</NavBtn>
+              </div>
+            )}
           </div>
         </div>
       </main>
@@ -269,8 +304,8 @@ const HostelFilter = ({ value, options, onChange }) => (
       className="w-full pl-10 pr-4 py-2 border rounded-lg shadow-sm focus:outline-none"
     >
       {options.map((h) => (
-        <option key={h} value={h}>
-          {h === "all" ? "All Hostels" : h}
+        <option key={h.value} value={h.value}>
+          {h.label}
         </option>
       ))}
     </select>
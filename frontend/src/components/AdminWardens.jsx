@@ -49,16 +49,32 @@ const AdminWardens = () => {
 
   const api = import.meta.env.VITE_API_BASE_URL;
 
+  /* every warden, following next_cursor (a few per hostel, so the search
+     and hostel filter below can run on the full list) */
+  const fetchAllWardens = async () => {
+    const all = [];
+    let cursor = null;
+    do {
+      const { data } = await axios.get(`${api}/admin/wardens`, {
+        params: { limit: 500, ...(cursor ? { cursor } : {}) },
+        withCredentials: true,
+      });
+      all.push(...data.wardens);
+      cursor = data.next_cursor;
+    } while (cursor);
+    return all;
+  };
+
   /* ───────── initial fetch ───────── */
   useEffect(() => {
     (async () => {
       try {
-        const [{ data: wData }, { data: aData }] = await Promise.all([
-          axios.get(`${api}/admin/wardens`, { withCredentials: true }),
-          axios.get(`${api}/admin/analytics`, { withCredentials: true }),
+        const [allWardens, { data: hData }] = await Promise.all([
+          fetchAllWardens(),
+          axios.get(`${api}/admin/hostels`, { withCredentials: true }),
         ]);
-        setWardens(wData.wardens);
-        setHostels(aData.hostels);
+        setWardens(allWardens);
+        setHostels(hData.hostels);
       } catch {
         setError("Failed to load wardens.");
       } finally {
@@ -77,6 +77,7 @@ const UserAuth = () => {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ shid, pswd }),
+        credentials: "include", // keep the session cookie: /me/events needs it
       });
 
       const data = await response.json();
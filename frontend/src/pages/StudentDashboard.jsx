@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import { motion } from "framer-motion";
 import {
   FaChartBar,
@@ -11,6 +11,8 @@ import {
 import { MdDashboard } from "react-icons/md";
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL;
+const FIRST_PAGE = 50; // the server's default page size
+const MAX_PAGE = 500; // the most it returns per request
 
 const Sidebar = ({ onSelect, active }) => {
   const [dropdownOpen, setDropdownOpen] = useState(false);
@@ -95,6 +97,29 @@ const StudentDashboard = () => {
   const [data, setData] = useState(null);
   const [activeTab, setActiveTab] = useState("dashboard");
 
+  /* how many complaints are on screen (first page + every "Load more"),
+     read by refreshes that outlive this render */
+  const loadedRef = useRef(0);
+  loadedRef.current = data?.recent?.length ?? 0;
+
+  /* the first `count` complaints, newest first, following next_cursor
+     (a refresh reloads everything on screen, not just page one) */
+  const fetchComplaints = async (shid, count) => {
+    const complaints = [];
+    let cursor = null;
+    do {
+      const params = new URLSearchParams({
+        limit: String(Math.min(MAX_PAGE, Math.max(count - complaints.length, 1))),
+      });
+      if (cursor) params.set("cursor", cursor);
+      const res = await fetch(`${API_BASE_URL}/fetch_complaint/${shid}?${params}`);
+      const page = await res.json();
+      complaints.push(...page.complaints);
+      cursor = page.next_cursor;
+    } while (cursor && complaints.length < count);
+    return { complaints, nextCursor: cursor };
+  };
+
   const fetchData = () => {
     const shid = localStorage.getItem("shid");
     if (!shid) return;
@@ -102,24 +127,40 @@ const StudentDashboard = () => {
     fetch(`${API_BASE_URL}/dashboard/${shid}`)
       .then((res) => res.json())
       .then((resData) => {
-        setData((prev) => ({ ...prev, student: resData.student }));
+        // counts come from the server — the complaint list below is paginated
+        setData((prev) => ({
+          ...prev,
+          student: resData.student,
+          counts: resData.complaints,
+        }));
         localStorage.setItem("studentName", resData.student.name);
       })
       .catch(console.error);
 
-    fetch(`${API_BASE_URL}/fetch_complaint/${shid}`)
+    fetchComplaints(shid, Math.max(loadedRef.current, FIRST_PAGE))
+      .then(({ complaints, nextCursor }) => {
+        setData((prev) => ({
+          ...prev,
+          recent: complaints,
+          nextCursor,
+        }));
+      })
+      .catch(console.error);
+  };
+
+  const loadMore = () => {
+    const shid = localStorage.getItem("shid");
+    fetch(
+      `${API_BASE_URL}/fetch_complaint/${shid}?cursor=${encodeURIComponent(
+        data.nextCursor
+      )}`
+    )
       .then((res) => res.json())
       .then((resData) => {
         setData((prev) => ({
           ...prev,
-          complaints: {
-            total: resData.complaints.length,
-            pending: resData.complaints.filter((c) => c.status === "Pending")
-              .length,
-            resolved: resData.complaints.filter((c) => c.status === "Resolved")
-              .length,
-            recent: resData.complaints,
-          },
+          recent: [...prev.recent, ...resData.complaints],
+          nextCursor: resData.next_cursor,
         }));
       })
       .catch(console.error);
@@ -129,6 +170,23 @@ const StudentDashboard = () => {
     fetchData();
   }, []);
 
+  /* status changes are pushed by the server — no polling; the stream is
+     tied to the login session, not to a SHID anyone could put in a URL */
+  useEffect(() => {
+    const shid = localStorage.getItem("shid");
+    if (!shid) return;
+    const source = new EventSource(`${API_BASE_URL}/me/events`, {
+      withCredentials: true,
+    });
+    [
+      "complaint.created",
+      "complaint.withdrawn",
+      "complaint.status",
+      "reset",
+    ].forEach((type) => source.addEventListener(type, fetchData));
+    return () => source.close();
+  }, []);
+
   const handleWithdraw = async (cid) => {
     const confirm = window.confirm(
       "Are you sure you want to withdraw this complaint?"
@@ -174,7 +232,13 @@ const StudentDashboard = () => {
 
   if (!data) return <div className="p-8 text-center">Loading...</div>;
 
-  const { student, complaints } = data;
+  const { student, counts, recent = [], nextCursor } = data;
+  const complaints = {
+    total: counts?.total ?? 0,
+    pending: counts?.pending ?? 0,
+    resolved: counts?.resolved ?? 0,
+    recent,
+  };
 
   return (
     <div className="flex flex-col lg:flex-row min-h-screen">
@@ -278,7 +342,11 @@ const StudentDashboard = () => {
                             Proof Image:
                           </p>
                           <img
-                            src={comp.proof_image}
+                            src={
+                              comp.proof_image.startsWith("/")
+                                ? `${API_BASE_URL}${comp.proof_image}`
+                                : comp.proof_image
+                            }
                             alt="Proof"
                             className="max-w-xs rounded border"
                           />
@@ -311,6 +379,16 @@ const StudentDashboard = () => {
                   </li>
                 ))}
               </ul>
+              {nextCursor && (
+                <div className="flex justify-center mt-6">
+                  <button
+                    onClick={loadMore}
+                    className="bg-blue-600 hover:bg-blue-700 text-white px-4 py-2 rounded"
+                  >
+                    Load more
+                  </button>
+                </div>
+              )}
             </div>
           )}
 
@@ -332,28 +410,19 @@ const StudentDashboard = () => {
                     return;
                   }
 
-                  const toBase64 = (file) =>
-                    new Promise((resolve, reject) => {
-                      const reader = new FileReader();
-                      reader.readAsDataURL(file);
-                      reader.onload = () =>
-                        resolve(reader.result.split(",")[1]);
-                      reader.onerror = (error) => reject(error);
-                    });
+                  // text fields first, file last: the server checks the
+                  // SHID before it starts streaming the image to disk
+                  const formData = new FormData();
+                  formData.append("shid", shid);
+                  formData.append("type", type);
+                  formData.append("description", description);
+                  formData.append("proof_image", imageFile);
 
                   try {
-                    const proof_image = await toBase64(imageFile);
-
-                    const res = await fetch(`${API_BASE_URL}/complaint/add`, {
-                      method: "POST",
-                      headers: { "Content-Type": "application/json" },
-                      body: JSON.stringify({
-                        shid,
-                        type,
-                        description,
-                        proof_image,
-                      }),
-                    });
+                    const res = await fetch(
+                      `${API_BASE_URL}/complaint/add/multipart`,
+                      { method: "POST", body: formData }
+                    );
 
                     const result = await res.json();
                     alert(result.message || "Complaint submitted.");